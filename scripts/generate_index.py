@@ -7,6 +7,8 @@ from pyrogram import Client
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.rate_limiter import get_limiter
+from src.manifest_parser import load_manifest
 
 # Load env
 folder_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -28,54 +30,16 @@ INDEX_STATE_FILE = os.path.join(STORAGE_DIR, "channel_index_info.json")
 
 def parse_manifest():
     """Reads manifest and returns structured data: [ {course, section, index, title, url} ]"""
-    videos = []
-    if not os.path.exists(MANIFEST_FILE):
-        return videos
-
-    current_course = "Unknown"
-    current_section = "General"
-    
-    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line: continue
-            
-            if line.startswith("# === "):
-                content = line.replace("# === ", "").split(" ===")[0]
-                if "(" in content:
-                    current_course = content.split("(")[0].strip()
-                else:
-                    current_course = content
-                current_section = "General"
-            elif line.startswith("## --- "):
-                current_section = line.replace("## --- ", "").replace(" ---", "").strip()
-            elif " | " in line:
-                # Video line, check for # [DONE]
-                clean = line.replace("# [DONE] ", "")
-                parts = clean.split(" | ")
-                if len(parts) >= 3:
-                    # Index | Title | URL OR Index | Section | Title | URL
-                    # We assume Index | Title | URL based on scraper default
-                    # But scraper has `if vid_section... write section` logic?
-                    # Let's check parts.
-                    vid_idx = parts[0]
-                    vid_url = parts[-1]
-                    
-                    if len(parts) == 4:
-                         # Index | Section | Title | URL
-                         vid_title = parts[2]
-                         vid_section_inline = parts[1] # Override current section?
-                    else:
-                         vid_title = parts[1]
-                    
-                    videos.append({
-                        "course": current_course,
-                        "section": current_section,
-                        "index": vid_idx,
-                        "title": vid_title,
-                        "url": vid_url
-                    })
-    return videos
+    return [
+        {
+            "course": e.course,
+            "section": e.section,
+            "index": e.index,
+            "title": e.title,
+            "url": e.url
+        }
+        for e in load_manifest(MANIFEST_FILE).active()
+    ]
 
 def load_history():
     if os.path.exists(UPLOAD_HISTORY_FILE):
@@ -182,6 +146,9 @@ async def main():
             print(f"❌ Could not connect to channel: {e}")
             return
 
+        # Flood protection: shared pacing + FloodWait handling
+        limiter = get_limiter()
+
         # 1. Update TOP messages
         new_top_ids = []
         for i, text in enumerate(blocks):
@@ -189,23 +156,22 @@ async def main():
             if i < len(state['top_ids']):
                 msg_id = state['top_ids'][i]
                 try:
-                    await app.edit_message_text(chat.id, msg_id, text)
+                    await limiter.run("user", chat.id, lambda: app.edit_message_text(chat.id, msg_id, text), action="edit")
                     print(f"   ✏️ Updated Top Msg {msg_id}")
                 except Exception as e:
                     print(f"   ⚠️ Failed to edit Top Msg {msg_id}: {e}")
                     # If edit failed (deleted?), send new?
                     # Assuming strict preservation of IDs is preferred, but if gone, we must send new.
-                    msg = await app.send_message(chat.id, text)
+                    msg = await limiter.run("user", chat.id, lambda: app.send_message(chat.id, text))
                     msg_id = msg.id
                     print(f"   ➕ Sent Replacment Top Msg {msg_id}")
             else:
                 # New message needed
-                msg = await app.send_message(chat.id, text)
+                msg = await limiter.run("user", chat.id, lambda: app.send_message(chat.id, text))
                 msg_id = msg.id
                 print(f"   ➕ Sent New Top Msg {msg_id}")
             
             new_top_ids.append(msg_id)
-            await asyncio.sleep(2) # Flood protection
             
         state['top_ids'] = new_top_ids
         
@@ -220,10 +186,9 @@ async def main():
         
         new_bottom_ids = []
         for text in blocks:
-             msg = await app.send_message(chat.id, text)
+             msg = await limiter.run("user", chat.id, lambda: app.send_message(chat.id, text))
              new_bottom_ids.append(msg.id)
              print(f"   ➕ Sent New Bottom Msg {msg.id}")
-             await asyncio.sleep(2)
              
         state['bottom_ids'] = new_bottom_ids
         
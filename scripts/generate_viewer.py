@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import re
 import urllib.parse
@@ -6,6 +7,11 @@ import shutil
 from pathlib import Path
 from bs4 import BeautifulSoup
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.manifest_parser import load_manifest
+from src.media_index import get_media_index
+from src.fuzzy_matcher import TrigramIndex
+
 STORAGE_DIR = ".storage"
 ARCHIVE_DIR = os.path.join(STORAGE_DIR, "course_archive")
 VIEWER_DIR = os.path.join(STORAGE_DIR, "viewer")
@@ -23,7 +29,7 @@ def _sanitize_path(name):
     return sanitized.lower().strip('_')
 
 def get_html_map():
-    html_map = {}
+    html_map = TrigramIndex()
     if not os.path.exists(ARCHIVE_DIR): return html_map
     for root, dirs, files in os.walk(ARCHIVE_DIR):
         f_name = None
@@ -36,7 +42,7 @@ def get_html_map():
             p, gp = os.path.basename(root), os.path.basename(os.path.dirname(root))
             keys = [p.lower(), _sanitize_path(p), f"{gp.lower()}/{p.lower()}", _sanitize_path(f"{gp}/{p}")]
             for k in keys:
-                if k: html_map[k] = path
+                html_map.add(k, path)
     return html_map
 
 def get_url_to_path_map():
@@ -51,43 +57,24 @@ def get_url_to_path_map():
                     if "course_url" in meta: scraped_map[w_url] = meta["course_url"]
         except: pass
 
-    if os.path.exists(MANIFEST_FILE):
-        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                if "|" in line and not line.startswith("#"):
-                    parts = [p.strip() for p in line.split("|")]
-                    m_url = parts[-1]
-                    raw_name = parts[1] if parts[0].isdigit() and len(parts) >= 3 else parts[0]
-                    slug = _sanitize_path(raw_name)
-                    local_path = html_lookup.get(slug)
-                    if not local_path:
-                        for k, v in html_lookup.items():
-                            if slug in k or k in slug: local_path = v; break
-                    if local_path:
-                        url_to_local[m_url] = local_path
-                        url_to_local[urllib.parse.urlparse(m_url).path] = local_path
-                        if m_url in scraped_map:
-                            k_url = scraped_map[m_url]
-                            url_to_local[k_url] = local_path
-                            url_to_local[urllib.parse.urlparse(k_url).path] = local_path
+    for entry in load_manifest(MANIFEST_FILE).active():
+        m_url = entry.url
+        slug = _sanitize_path(entry.title)
+        local_path = html_lookup.best(slug)
+        if local_path:
+            url_to_local[m_url] = local_path
+            url_to_local[urllib.parse.urlparse(m_url).path] = local_path
+            if m_url in scraped_map:
+                k_url = scraped_map[m_url]
+                url_to_local[k_url] = local_path
+                url_to_local[urllib.parse.urlparse(k_url).path] = local_path
     return url_to_local
 
 def parse_manifest():
-    if not os.path.exists(MANIFEST_FILE): return {}
-    courses, cur_c, cur_s = {}, "Other", "General"
-    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith("# ==="): cur_c, cur_s = line.strip("# = ").strip(), "General"
-            elif line.startswith("## ---"): cur_s = line.strip("# - ").strip()
-            elif "|" in line and not line.startswith("#"):
-                p = [x.strip() for x in line.split("|")]
-                if len(p) >= 2:
-                    raw = p[1] if p[0].isdigit() and len(p) >= 3 else p[0]
-                    m_name = f"{p[0]}_{p[1]}" if p[0].isdigit() and len(p) >= 3 else p[0]
-                    if cur_c not in courses: courses[cur_c] = {}
-                    if cur_s not in courses[cur_c]: courses[cur_c][cur_s] = []
-                    courses[cur_c][cur_s].append({"title": re.sub(r'^\d+_', '', raw), "match_name": m_name, "id_num": p[0] if p[0].isdigit() else ""})
+    courses = {}
+    for e in load_manifest(MANIFEST_FILE).active():
+        courses.setdefault(e.course, {}).setdefault(e.section, []).append(
+            {"title": e.title, "match_name": e.display_name, "id_num": e.index or ""})
     return courses
 
 def generate_portal():
@@ -101,10 +88,7 @@ def generate_portal():
             li = ""
             for l in lessons:
                 slug = _sanitize_path(l["match_name"])
-                trg = html_map.get(slug)
-                if not trg:
-                    for k, v in html_map.items():
-                        if slug in k or k in slug: trg = v; break
+                trg = html_map.best(slug)
                 if trg:
                     root_rel = "/" + os.path.relpath(trg, os.getcwd())
                     safe_url = urllib.parse.quote(root_rel, safe='/')
@@ -119,20 +103,15 @@ def generate_portal():
 
 def patch_all_lessons():
     print("🔧 Restoring Multi-Drive Playback (Ghost File Purge)...")
-    v_map = {}
+    v_map = TrigramIndex()
     srch = [DOWNLOADS_DIR]
     if os.path.exists(mp := os.path.join(STORAGE_DIR, "media_paths.json")):
         try:
             with open(mp, "r") as f: srch.extend(json.load(f).get("paths", []))
         except: pass
     
-    for s in srch:
-        if not os.path.exists(s): continue
-        for r, ds, fs in os.walk(s):
-            for f in fs:
-                if f.startswith("._") or f.startswith(".DS_Store"): continue
-                if f.lower().endswith((".mp4", ".mkv", ".mov")): 
-                    v_map[f.lower()] = os.path.abspath(os.path.join(r, f))
+    for f, path in get_media_index().videos(srch, extensions=(".mp4", ".mkv", ".mov")):
+        v_map.add(_sanitize_path(os.path.splitext(f)[0]), path)
 
     link_map = get_url_to_path_map()
     v_proxy_abs = os.path.abspath(os.path.join(VIEWER_DIR, "v_proxy"))
@@ -175,13 +154,7 @@ def patch_all_lessons():
                     
                     if cont:
                         slug = _sanitize_path(os.path.basename(r))
-                        mv = None
-                        v_keys = sorted(v_map.keys(), key=len, reverse=True)
-                        for vn in v_keys:
-                            vn_slug = _sanitize_path(vn)
-                            # Robust matching: either slug contains the other, or they share a major part
-                            if slug and vn_slug and (slug in vn_slug or vn_slug in slug):
-                                mv = v_map[vn]; break
+                        mv = v_map.best(slug)
                         
                         if mv and os.path.exists(mv):
                             v_ext = os.path.splitext(mv)[1].lower()
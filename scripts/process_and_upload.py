@@ -9,6 +9,7 @@ import argparse
 import getpass
 import logging
 from pathlib import Path
+from collections import deque
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -31,8 +32,13 @@ from src.video_utils import (
     split_video_for_bot_safe as split_video_for_bot,
     split_video_for_user_safe as split_video_for_user,
     get_smart_title,
+    detect_hw_encoder,
     extract_thumbnail,
     is_video_valid,
+    probe_video,
+    stream_copy_blockers,
+    fits_size_target,
+    INTRO_SECONDS,
     SIZE_THRESHOLD_MB,
     BOT_MAX_SIZE_MB,
     USER_MAX_SIZE_MB
@@ -44,6 +50,9 @@ from src.telegram_utils import (
 )
 from src.media_resolver import list_all_videos, find_video_file
 from src.manifest_tracker import update_manifest_status, get_pending_videos, get_all_manifest_videos
+from src.manifest_parser import load_manifest
+from src.content_store import get_content_store
+from src.rate_limiter import get_limiter
 
 # Load environment variables
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -73,8 +82,11 @@ parser.add_argument("--video-dir", type=str, help="Override video directory")
 parser.add_argument("--res", type=int, choices=[720, 1080], default=720, help="Target resolution (720 or 1080, default: 720)")
 parser.add_argument("--index-offset", type=int, default=0, help="Skip N messages before starting index (default: 0)")
 parser.add_argument("--force-user", action="store_true", help="Force using user account (hybrid_account) for indexing")
+parser.add_argument("--two-pass", action="store_true", help="Two-pass encoding for size-targeted encodes (slower, closer to the size limit)")
 parser.add_argument("--dry-run", action="store_true", help="Show what would be done without actually uploading")
 parser.add_argument("--cleanup", action="store_true", help="Remove processed files after successful upload")
+parser.add_argument("--encode-workers", type=int, default=1, help="Number of videos encoded in parallel (default: 1)")
+parser.add_argument("--lookahead", type=int, default=2, help="Videos prepared ahead of the current upload (default: 2)")
 parser.add_argument("--log", type=str, metavar="FILE", help="Save logs to file (e.g., --log upload.log)")
 args = parser.parse_args()
 
@@ -103,78 +115,25 @@ MANIFEST_FILE = os.path.join(STORAGE_DIR, "downloaded_video.txt")
 
 def load_video_metadata(video_filename):
     """
-    Parses manifest to find metadata for the given video filename.
-    Handles multiple formats: 
-    - 001 | Title | URL | Course | Section
-    - 001_Title | URL
-    - 001 | Title | URL
+    Looks up manifest metadata for the given video filename (by its 3-digit index).
+    The manifest is parsed once and cached until the file changes.
     """
-    if not os.path.exists(MANIFEST_FILE):
-        return None
-        
     file_index = video_filename[:3]
     if not file_index.isdigit():
         return None
 
     try:
-        current_course = "Unknown Course"
-        current_section = "General"
-        course_video_count = 0
-        
-        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        for line in lines:
-            line = line.strip()
-            if not line: continue
-            
-            if line.startswith("# === "):
-                content = line.replace("# === ", "").split(" ===")[0]
-                if "(" in content:
-                    current_course = content.split("(")[0].strip()
-                    try:
-                        count_part = content.split("(")[-1].replace(")", "").replace(" videos", "")
-                        course_video_count = count_part.split(" of ")[-1] if " of " in count_part else count_part
-                    except: course_video_count = "?"
-                else:
-                    current_course = content
-                current_section = "General"
-                
-            elif line.startswith("## --- "):
-                current_section = line.replace("## --- ", "").replace(" ---", "").strip()
-                
-            elif "|" in line:
-                # Video Line
-                clean_line = line.replace("# [DONE] ", "").strip()
-                
-                # Check for Match (Index can be followed by | or _)
-                # Regex to match index at start
-                match = re.match(rf"^{file_index}[_|\s]", clean_line)
-                if match:
-                    # Parse using pipe delimiter
-                    parts = [p.strip() for p in clean_line.split("|")]
-                    
-                    url = ""
-                    title = ""
-                    
-                    if len(parts) >= 3:
-                        # Format: Index | Title | URL [| Course | Section]
-                        title = parts[1]
-                        url = parts[2]
-                    elif len(parts) == 2:
-                        # Format: Index_Title | URL
-                        url = parts[1]
-                        # Extract title from parts[0] which is "Index_Title"
-                        title = parts[0][len(file_index):].strip("_ ")
-                    
-                    return {
-                        "course": current_course,
-                        "section": current_section,
-                        "index": file_index,
-                        "total": course_video_count,
-                        "line_title": title,
-                        "url": url
-                    }
+        manifest = load_manifest(MANIFEST_FILE)
+        entry = manifest.find(file_index)
+        if entry:
+            return {
+                "course": entry.course,
+                "section": entry.section,
+                "index": file_index,
+                "total": manifest.course_counts.get(entry.course, 0),
+                "line_title": entry.title,
+                "url": entry.url
+            }
     except Exception as e:
         print(f"⚠️ Error parsing manifest: {e}")
         
@@ -189,29 +148,14 @@ def get_index_from_filename(filename):
 
 def load_extra_content(url):
     """
-    Loads description and links from json.
-    Handles lookup by key (video_url) or searching within entries (lesson_url matches).
+    Loads description and links for a video.
+    Handles lookup by key (video_url) or by the entries' video_url / course_url (indexed).
     """
     if not os.path.exists(CONTENT_FILE):
         return None
     try:
-        with open(CONTENT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            
-            # 1. Direct Lookup
-            if url in data:
-                return data[url]
-            
-            # 2. Search values (In case data is keyed by lesson_url)
-            for key, val in data.items():
-                if val.get('video_url') == url:
-                    return val
-                # Also try matching course_url with the input url if it's a course page
-                if val.get('course_url') == url:
-                    return val
-                    
-            return None
-    except:
+        return get_content_store(CONTENT_FILE).get(url)
+    except Exception:
         return None
 
 def unfragment_text(text):
@@ -483,6 +427,402 @@ if not os.path.exists(video_dir):
     print(f"⚠️ Video directory not found: {video_dir}")
     # os.makedirs(video_dir) # Maybe don't create it, user should provide content.
 
+def choose_size_target(probe, bot_available):
+    """Bot limit when the whole video fits it at a decent bitrate (single upload via bot), else the user limit."""
+    duration = (probe['duration'] if probe else 0) + (INTRO_SECONDS if args.intro else 0)
+    if bot_available and fits_size_target(duration, BOT_MAX_SIZE_MB, args.res):
+        return BOT_MAX_SIZE_MB
+    return USER_MAX_SIZE_MB
+
+async def prepare_video(i, total_files, m_video, physical_videos, bot_available):
+    """
+    Encode stage of the upload pipeline.
+    Builds the caption, processes the video and extracts its thumbnail.
+    Runs ahead of the uploader, so nothing here may talk to Telegram.
+    Returns a job dict whose 'status' is 'ready', 'failed', 'halt' or 'skip'.
+    """
+    idx = m_video['index']
+    job = {'position': i, 'idx': idx, 'title': m_video['title'], 'status': 'failed'}
+
+    # CRITICAL: Next video MUST exist (the uploader halts when it reaches this job)
+    if idx not in physical_videos:
+        job['status'] = 'halt'
+        return job
+
+    filename, input_path = physical_videos[idx]
+
+    title = get_smart_title(input_path)  # Use smart title (metadata preference)
+    job.update(filename=filename, title=title)
+    
+    # 🔄 DRY-RUN MODE: Just show what would be done
+    if args.dry_run:
+        file_size_mb = os.path.getsize(input_path) / (1024 * 1024)
+        print(f"[DRY-RUN] {idx} - {title}")
+        print(f"   📁 Source: {filename}")
+        print(f"   📏 Size: {file_size_mb:.2f}MB")
+        source_probe = probe_video(input_path)
+        size_target = choose_size_target(source_probe, bot_available)
+        blockers = stream_copy_blockers(source_probe, args.res, size_target)
+        if blockers:
+            print(f"   🔄 Would re-encode (target ≤{size_target}MB): {', '.join(blockers)}")
+        else:
+            print(f"   ⚡ Would stream copy (source already meets targets){' + cached intro' if args.intro else ''}")
+        job['status'] = 'skip'
+        return job
+    
+    # Load Rich Metadata
+    meta = load_video_metadata(filename)
+    caption = title
+    full_desc = ""
+    need_overflow = False
+    overflow_text = ""
+    
+    if meta:
+        # HEADER (Professional Bold Format)
+        header_parts = [f"**{meta['course']}**"]
+        if meta['section'] and meta['section'] != "General":
+            header_parts.append(f"**{meta['section']}**")
+        
+        final_title = meta['line_title'] if meta['line_title'] else title
+        header_parts.append(f"**{meta['index']} - {final_title}**")
+        
+        caption = "\n".join(header_parts) + "\n\n"
+        
+        # Add Extra Content (Description + Links)
+        extra = load_extra_content(meta['url'])
+        if extra:
+            desc = extra.get('description', '')
+            
+            # --- ROBUST COMMENT STRIPPING (Telegram Output Only) ---
+            desc = re.split(r'(?i)Comments\s*\n\s*\d+', desc)[0]
+            desc = re.split(r'(?i)Post Comment', desc)[0]
+            desc = re.split(r'(?i)\n\d+\s+Comments', desc)[0]
+            desc = re.split(r'(?m)^\d+ (minutes|hours|days|weeks|months) ago', desc)[0]
+            desc = re.split(r'(?m)^REPLY\s*\n', desc)[0]
+            desc = desc.strip()
+            
+            # Process Links: Inline first
+            remaining_links = []
+            if extra.get('links'):
+                for link in extra['links']:
+                    url = link['url']
+                    orig_text = link['text']
+                    
+                    # Clean anchor text for matching
+                    match_text = re.sub(r'(?i):\s*CLICK\s*HERE', '', orig_text)
+                    match_text = re.sub(r'(?i)CLICK\s*HERE', '', match_text).strip(": ")
+                    
+                    if not match_text: match_text = "Link"
+                    
+                    # Clean description matching (ignore common bullet differences)
+                    # Website might have blue bullets, scraper might have • or . or - 
+                    clean_desc = re.sub(r'^[•·*.\-]\s+', '', desc, flags=re.MULTILINE)
+                    
+                    # Searching for original casing and common variations
+                    if match_text.lower() in clean_desc.lower():
+                        # Match in original description
+                        pattern = re.compile(rf"(?i)(?:[•·*.\-]\s*)?{re.escape(match_text)}", re.IGNORECASE)
+                        if pattern.search(desc):
+                            desc = pattern.sub(f"• [{match_text}]({url})", desc)
+                            continue # Successfully inlined, don't add to header
+                    
+                    remaining_links.append(link)
+            
+            # 🔗 LINKS Header (Only for those not inlined)
+            if remaining_links:
+                caption += "🔗 **Links:**\n"
+                for link in remaining_links:
+                    link_text = link['text']
+                    link_text = re.sub(r'(?i):\s*CLICK\s*HERE', '', link_text)
+                    link_text = re.sub(r'(?i)CLICK\s*HERE', '', link_text)
+                    link_text = link_text.strip(": ")
+                    if not link_text: link_text = "Link"
+                    caption += f"• [{link_text}]({link['url']})\n"
+                caption += "\n"
+            
+            # 📝 INFO (The updated description with inline links)
+            if desc:
+                # Clean labels, spacing
+                desc = re.sub(r'(?i)CLICK\s*HERE\s*:?\s*', '', desc)
+                
+                # Deduplicate Title & Section: If desc contains the title or section title, clean it up
+                clean_title = final_title.lower().strip()
+                clean_section = meta['section'].lower().strip() if meta.get('section') else ""
+                
+                desc_lines = desc.split('\n')
+                new_desc_lines = []
+                skipped_header = False
+                
+                for line in desc_lines:
+                    line_lower = line.lower().strip()
+                    if not line_lower:
+                        new_desc_lines.append(line)
+                        continue
+                        
+                    # Check if line duplicates title OR section title
+                    is_dup = (clean_title in line_lower or line_lower in clean_title) or \
+                             (clean_section and (clean_section in line_lower or line_lower in clean_section))
+                    
+                    if not skipped_header and is_dup and len(line_lower) > 3:
+                        # Skip this line but only once for title and once for section if needed
+                        # For simplicity, skip any line at the top that matches
+                        continue
+                    else:
+                        # Once we hit a non-header line, stop skipping
+                        skipped_header = True
+                        new_desc_lines.append(line)
+                
+                desc = "\n".join(new_desc_lines).strip(" :- \n\r")
+
+                desc = unfragment_text(desc)
+                desc = format_description_markdown(desc)  # ✅ Make headers bold
+                desc = re.sub(r'\n{3,}', '\n\n', desc).strip()
+                
+                # Save cleaned description for splitting later
+                full_desc = desc
+    else:
+        # Fallback for when no metadata is found
+        caption = f"**{title}**"
+        full_desc = ""
+
+
+    print(f"{'='*60}")
+    print(f"[{i}/{total_files}] Processing: {title}")
+    print(f"📄 Generated Caption Preview:\n{caption[:200]}...")
+    if meta:
+        print(f"   ℹ️ Metadata: {meta['course']} | {meta['section']}")
+    print(f"{'='*60}")
+    
+    if not os.path.exists(input_path):
+        print(f"❌ Input file not found")
+        return job
+    
+    # Check if already processed
+    processed_files = []
+    
+    output_path = os.path.join(output_dir, filename)
+    
+    processing_needed = True
+    if os.path.exists(output_path):
+        # Processed files are temporary: probe fresh, keep them out of the cache
+        probe = probe_video(output_path, use_cache=False)
+        curr_h = probe['height'] if probe else 0
+        valid = probe is not None and is_video_valid(output_path, use_cache=False)
+        
+        # Check validity AND resolution (don't reuse if it's high-res 4K when we want 720)
+        if valid and (curr_h <= args.res + 50): # +50 for small variations
+            print(f"✅ Pre-processed file exists and resolution is correct ({curr_h}p): {output_path}")
+            processing_needed = False
+            processed_files = [output_path]
+        else:
+            reason = f"wrong resolution ({curr_h}p)" if valid else "invalid/corrupted"
+            print(f"⚠️ Pre-processed file is {reason}. Re-processing...")
+            try: os.remove(output_path)
+            except: pass
+        
+        # Decide upload method for existing file
+        if not processing_needed:
+            file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+            upload_method = decide_upload_method(file_size_mb)
+            if upload_method == 'bot' and not bot_available:
+                upload_method = 'user'
+            print(f"🎯 Selected method (Existing): {'Bot' if upload_method == 'bot' else 'User Account'}")
+
+    if processing_needed:
+        # Encode straight to a size budget: short videos land under the bot limit in one pass
+        size_target = choose_size_target(probe_video(input_path), bot_available)
+        print(f"🔄 Processing and Compressing to {args.res}p (target ≤{size_target}MB)...")
+        
+        # Step 1: Always process & compress first
+        success = await process_video_for_user(input_path, output_path, title, add_intro=args.intro, target_res=args.res,
+                                               max_size_mb=size_target, two_pass=args.two_pass)
+        
+        if success and os.path.exists(output_path):
+            # Step 2: Check size of the COMPRESSED file
+            compressed_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+            print(f"📉 Compressed Size: {compressed_size_mb:.2f}MB")
+            
+            upload_method = 'user' # Default for large files
+            
+            # Decide if we need to split based on COMPRESSED size
+            if compressed_size_mb > USER_MAX_SIZE_MB:
+                print(f"⚠️ Still larger than {USER_MAX_SIZE_MB}MB after compression. Splitting...")
+                processed_files = await split_video_for_user(output_path, output_dir, title, target_size_mb=USER_MAX_SIZE_MB, add_intro=False, target_res=args.res)
+            else:
+                # Fits in one part
+                processed_files = [output_path]
+                upload_method = decide_upload_method(compressed_size_mb)
+                if upload_method == 'bot' and not bot_available:
+                    upload_method = 'user'
+            
+            print(f"🎯 Selected method (New): {'Bot' if upload_method == 'bot' else 'User Account'}")
+        else:
+            print("❌ Processing failed.")
+            return job
+    
+    if not processed_files:
+        print(f"❌ Error in file processing")
+        return job
+        
+    # Upload Logic
+    thumb_path = os.path.join(output_dir, f"thumb_{idx}.jpg")
+    has_thumb = False
+    
+    if processed_files:
+        # Try multiple timestamps
+        print(f"🖼️ Extracting thumbnail from {os.path.basename(processed_files[0])}...")
+        has_thumb = await asyncio.to_thread(extract_thumbnail, processed_files[0], thumb_path)
+        
+        if not has_thumb:
+            print(f"❌ CRITICAL Error: Mandatory thumbnail extraction failed for {idx}.")
+            print(f"   Skipping this video to maintain professional quality.")
+            return job
+
+    # Finalize Caption and Split if needed
+    if full_desc:
+        # Standard Telegram limit for media captions is 1024 characters.
+        # Premium accounts support 2048, but we use 1024 for universal compatibility.
+        caption_limit = 1024
+        current_len = len(caption) + len("📝 **Info:**\n")
+        remaining = caption_limit - current_len - 50 # Safe margin
+
+        if len(full_desc) <= remaining:
+            caption += f"📝 **Info:**\n{full_desc}"
+        else:
+            # Smart Split
+            candidate = full_desc[:remaining]
+            last_break = candidate.rfind('\n\n')
+            if last_break < remaining * 0.5: last_break = max(candidate.rfind('. '), candidate.rfind('? '), candidate.rfind('! '))
+            if last_break < remaining * 0.5: last_break = candidate.rfind('\n')
+            if last_break < remaining * 0.5: last_break = candidate.rfind(' ')
+            if last_break > 0:
+                visible = full_desc[:last_break+1].strip()
+                overflow_text = full_desc[last_break+1:].strip()
+                caption += f"📝 **Info:**\n{visible}\n\n⬇️ **(See next message)**"
+                need_overflow = True
+            else:
+                caption += f"📝 **Info:**\n{candidate}..."
+                overflow_text = full_desc[remaining:]
+                need_overflow = True
+
+    # CRITICAL: Always validate caption before sending
+    caption = validate_caption(caption)
+    if overflow_text:
+        overflow_text = validate_caption(overflow_text)
+
+    job.update(
+        status='ready',
+        caption=caption,
+        need_overflow=need_overflow,
+        overflow_text=overflow_text,
+        processed_files=processed_files,
+        processing_needed=processing_needed,
+        upload_method=upload_method,
+        thumb_path=thumb_path,
+        has_thumb=has_thumb
+    )
+    return job
+
+async def publish_video(job, app):
+    """
+    Upload stage of the pipeline: publishes one prepared job, sends the
+    caption overflow reply and removes temporary files.
+    Returns (successful_uploads, failed_uploads).
+    """
+    ok_count = 0
+    failed_count = 0
+    filename = job['filename']
+    title = job['title']
+    caption = job['caption']
+    need_overflow = job['need_overflow']
+    overflow_text = job['overflow_text']
+    processed_files = job['processed_files']
+    processing_needed = job['processing_needed']
+    upload_method = job['upload_method']
+    thumb_path = job['thumb_path']
+    has_thumb = job['has_thumb']
+
+
+    first_msg = None
+    if upload_method == "user":
+         # User usually has 1 file
+         for f_path in processed_files:
+             msg = await upload_with_user_account(app, f_path, caption, channel_username, thumb=thumb_path if has_thumb else None)
+             if msg:
+                 if not first_msg: first_msg = msg
+                 ok_count += 1
+                 print(f"🎉 User account upload successful!")
+                 # Save History & Update Manifest
+                 idx = get_index_from_filename(filename)
+                 save_upload_history(idx, title, msg, False)
+                 # Update manifest with status
+                 msg_id = msg.id if hasattr(msg, 'id') else None
+                 update_manifest_status(idx, "UPLOADED", msg_id=msg_id)
+             else:
+                 failed_count += 1
+                 idx = get_index_from_filename(filename)
+                 update_manifest_status(idx, "FAILED")
+    else:
+         # Bot
+         for j, f_path in enumerate(processed_files):
+             part_caption = caption if len(processed_files) == 1 else f"{caption}\n(Part {j+1}/{len(processed_files)})"
+             part_caption = validate_caption(part_caption) 
+             msg = await upload_with_bot(f_path, part_caption, telegram_token, channel_id, thumb=thumb_path if has_thumb else None)
+             if msg:
+                 if not first_msg: first_msg = msg
+                 ok_count += 1
+                 print(f"🎉 Bot upload successful!")
+                 # Save History & Update Manifest
+                 if j == 0:  # Only update for first part
+                    idx = get_index_from_filename(filename)
+                    save_upload_history(idx, title, msg, True)
+                    msg_id = msg.message_id if hasattr(msg, 'message_id') else None
+                    update_manifest_status(idx, "UPLOADED", msg_id=msg_id)
+             else:
+                 failed_count += 1
+                 if j == 0:
+                    idx = get_index_from_filename(filename)
+                    update_manifest_status(idx, "FAILED")
+    
+    # ✅ SHARED: Send Overflow Message (Follow-up) if needed
+    if first_msg and need_overflow and overflow_text:
+        print("   📄 Description split. Sending remainder as reply...")
+        try:
+            # Determine message ID (Pyrogram uses .id, Bot API uses .message_id)
+            reply_id = getattr(first_msg, 'id', getattr(first_msg, 'message_id', None))
+            
+            if reply_id:
+                await get_limiter().run("user", channel_username, lambda: app.send_message(
+                    chat_id=channel_username,
+                    text=f"📄 **Continued:**\n\n{overflow_text}",
+                    reply_to_message_id=reply_id,
+                    disable_web_page_preview=True
+                ))
+                print("   ✅ Overflow message sent.")
+            else:
+                print("   ⚠️ Could not determine message ID for overflow reply.")
+        except Exception as exc:
+            print(f"   ⚠️ Failed to send overflow: {exc}")
+    
+    # Cleanup thumb
+    if has_thumb and os.path.exists(thumb_path):
+        try: os.remove(thumb_path)
+        except: pass
+    
+    # Cleanup temp files (when processing was needed OR --cleanup flag is set)
+    should_cleanup = processing_needed or args.cleanup
+    if should_cleanup and processed_files: 
+        print("🧹 Cleaning up temporary files...")
+        for f_path in processed_files:
+            try:
+                if os.path.exists(f_path):
+                    os.remove(f_path)
+                    print(f"   🗑️ Removed: {os.path.basename(f_path)}")
+            except Exception as e:
+                print(f"   ⚠️ Cleanup failed for {f_path}: {e}")
+
+    return ok_count, failed_count
+
 async def main():
     """Combined Processing and Upload Flow"""
     # Initialize local flags based on global config
@@ -589,6 +929,7 @@ async def main():
             # Check history to see if we've EVER uploaded anything to this channel via this script
             if not history_data:
                 res_count = 15
+                limiter = get_limiter()
                 print(f"🆕 First run detected! Reserving {res_count} messages for Index (Table of Contents)...")
                 for p in range(1, res_count + 1):
                     try:
@@ -598,379 +939,76 @@ async def main():
                             f"Please do not delete it to maintain the Table of Contents sequence."
                         )
                         if bot_available:
-                            await bot.send_message(chat_id=channel_id, text=placeholder_text)
+                            await limiter.run("bot", channel_id, lambda: bot.send_message(chat_id=channel_id, text=placeholder_text))
                         else:
-                            await app.send_message(chat_id=channel_username, text=placeholder_text)
+                            await limiter.run("user", channel_username, lambda: app.send_message(chat_id=channel_username, text=placeholder_text))
                         print(f"   ✅ Reserved {p}/{res_count}...")
-                        await asyncio.sleep(0.5)
                     except Exception as e:
                         print(f"   ⚠️ Failed to reserve placeholder {p}: {e}")
                 print("🏁 Index reservation complete.\n")
 
-        # 3. Iterate through manifest sequence
+        # 3. Pipeline: encoders prepare the next videos while the current one uploads.
+        # Uploads are still published strictly in manifest order.
         total_files = len(manifest_videos)
         
+        # Pick the encoder before the pipeline starts (the first run per ffmpeg
+        # build benchmarks every candidate)
+        if not args.dry_run:
+            await asyncio.to_thread(detect_hw_encoder)
+        
         pbar = None
         if not HAS_TQDM and not args.dry_run:
             print("💡 Tip: Install 'tqdm' (pip install tqdm) for a visual progress bar!")
 
-        for i, m_video in enumerate(manifest_videos, 1):
-            idx = m_video['index']
-            
-            # pbar logic removed
-            
-            # Skip if already done
-            if m_video['is_done'] or idx in history_data:
-                # print(f"⏩ {idx} already uploaded (Skipping)")
-                continue
-
-            # CRITICAL: Next video MUST exist
-            if idx not in physical_videos:
-                print(f"{'!'*60}")
-                print(f"❌ Error: File for next video ({idx}) not found!")
-                print(f"   Title: {m_video['title']}")
-                print(f"   ⚠️ Possible cause: The drive containing this file is not connected.")
-                print(f"   ⚠️ Program halted to maintain sequence in Telegram.")
-                print(f"{'!'*60}\n")
-                return # HALT
-
-            filename, input_path = physical_videos[idx]
-
-            title = get_smart_title(input_path)  # Use smart title (metadata preference)
-            
-            # 🔄 DRY-RUN MODE: Just show what would be done
-            if args.dry_run:
-                file_size_mb = os.path.getsize(input_path) / (1024 * 1024)
-                print(f"[DRY-RUN] {idx} - {title}")
-                print(f"   📁 Source: {filename}")
-                print(f"   📏 Size: {file_size_mb:.2f}MB")
-                print(f"   {'🎞️ Would add intro' if args.intro else '⚡ No intro (stream copy)'}")
-                continue
-            
-            # Load Rich Metadata
-            meta = load_video_metadata(filename)
-            caption = title
-            full_desc = ""
-            need_overflow = False
-            overflow_text = ""
-            
-            if meta:
-                # HEADER (Professional Bold Format)
-                header_parts = [f"**{meta['course']}**"]
-                if meta['section'] and meta['section'] != "General":
-                    header_parts.append(f"**{meta['section']}**")
-                
-                final_title = meta['line_title'] if meta['line_title'] else title
-                header_parts.append(f"**{meta['index']} - {final_title}**")
-                
-                caption = "\n".join(header_parts) + "\n\n"
-                
-                # Add Extra Content (Description + Links)
-                extra = load_extra_content(meta['url'])
-                if extra:
-                    desc = extra.get('description', '')
-                    
-                    # --- ROBUST COMMENT STRIPPING (Telegram Output Only) ---
-                    desc = re.split(r'(?i)Comments\s*\n\s*\d+', desc)[0]
-                    desc = re.split(r'(?i)Post Comment', desc)[0]
-                    desc = re.split(r'(?i)\n\d+\s+Comments', desc)[0]
-                    desc = re.split(r'(?m)^\d+ (minutes|hours|days|weeks|months) ago', desc)[0]
-                    desc = re.split(r'(?m)^REPLY\s*\n', desc)[0]
-                    desc = desc.strip()
-                    
-                    # Process Links: Inline first
-                    remaining_links = []
-                    if extra.get('links'):
-                        for link in extra['links']:
-                            url = link['url']
-                            orig_text = link['text']
-                            
-                            # Clean anchor text for matching
-                            match_text = re.sub(r'(?i):\s*CLICK\s*HERE', '', orig_text)
-                            match_text = re.sub(r'(?i)CLICK\s*HERE', '', match_text).strip(": ")
-                            
-                            if not match_text: match_text = "Link"
-                            
-                            # Clean description matching (ignore common bullet differences)
-                            # Website might have blue bullets, scraper might have • or . or - 
-                            clean_desc = re.sub(r'^[•·*.\-]\s+', '', desc, flags=re.MULTILINE)
-                            
-                            # Searching for original casing and common variations
-                            if match_text.lower() in clean_desc.lower():
-                                # Match in original description
-                                pattern = re.compile(rf"(?i)(?:[•·*.\-]\s*)?{re.escape(match_text)}", re.IGNORECASE)
-                                if pattern.search(desc):
-                                    desc = pattern.sub(f"• [{match_text}]({url})", desc)
-                                    continue # Successfully inlined, don't add to header
-                            
-                            remaining_links.append(link)
-                    
-                    # 🔗 LINKS Header (Only for those not inlined)
-                    if remaining_links:
-                        caption += "🔗 **Links:**\n"
-                        for link in remaining_links:
-                            link_text = link['text']
-                            link_text = re.sub(r'(?i):\s*CLICK\s*HERE', '', link_text)
-                            link_text = re.sub(r'(?i)CLICK\s*HERE', '', link_text)
-                            link_text = link_text.strip(": ")
-                            if not link_text: link_text = "Link"
-                            caption += f"• [{link_text}]({link['url']})\n"
-                        caption += "\n"
-                    
-                    # 📝 INFO (The updated description with inline links)
-                    if desc:
-                        # Clean labels, spacing
-                        desc = re.sub(r'(?i)CLICK\s*HERE\s*:?\s*', '', desc)
-                        
-                        # Deduplicate Title & Section: If desc contains the title or section title, clean it up
-                        clean_title = final_title.lower().strip()
-                        clean_section = meta['section'].lower().strip() if meta.get('section') else ""
-                        
-                        desc_lines = desc.split('\n')
-                        new_desc_lines = []
-                        skipped_header = False
-                        
-                        for line in desc_lines:
-                            line_lower = line.lower().strip()
-                            if not line_lower:
-                                new_desc_lines.append(line)
-                                continue
-                                
-                            # Check if line duplicates title OR section title
-                            is_dup = (clean_title in line_lower or line_lower in clean_title) or \
-                                     (clean_section and (clean_section in line_lower or line_lower in clean_section))
-                            
-                            if not skipped_header and is_dup and len(line_lower) > 3:
-                                # Skip this line but only once for title and once for section if needed
-                                # For simplicity, skip any line at the top that matches
-                                continue
-                            else:
-                                # Once we hit a non-header line, stop skipping
-                                skipped_header = True
-                                new_desc_lines.append(line)
-                        
-                        desc = "\n".join(new_desc_lines).strip(" :- \n\r")
+        work_items = [
+            (i, m_video) for i, m_video in enumerate(manifest_videos, 1)
+            if not (m_video['is_done'] or m_video['index'] in history_data)  # Skip if already done
+        ]
+        encode_slots = asyncio.Semaphore(max(1, args.encode_workers))
+        pending_items = iter(work_items)
+        in_flight = deque()
 
-                        desc = unfragment_text(desc)
-                        desc = format_description_markdown(desc)  # ✅ Make headers bold
-                        desc = re.sub(r'\n{3,}', '\n\n', desc).strip()
-                        
-                        # Save cleaned description for splitting later
-                        full_desc = desc
-            else:
-                # Fallback for when no metadata is found
-                caption = f"**{title}**"
-                full_desc = ""
+        async def _prepare(i, m_video):
+            async with encode_slots:
+                return await prepare_video(i, total_files, m_video, physical_videos, bot_available)
 
+        def _schedule_next():
+            item = next(pending_items, None)
+            if item:
+                in_flight.append(asyncio.create_task(_prepare(*item)))
 
-            print(f"{'='*60}")
-            print(f"[{i}/{total_files}] Processing: {title}")
-            print(f"📄 Generated Caption Preview:\n{caption[:200]}...")
-            if meta:
-                print(f"   ℹ️ Metadata: {meta['course']} | {meta['section']}")
-            print(f"{'='*60}")
-            
-            if not os.path.exists(input_path):
-                print(f"❌ Input file not found")
-                failed_count += 1
-                continue
-            
-            # Check if already processed
-            processed_files = []
-            
-            output_path = os.path.join(output_dir, filename)
-            
-            processing_needed = True
-            if os.path.exists(output_path):
-                from src.video_utils import get_video_info
-                v_info = get_video_info(output_path)
-                curr_h = v_info.get('height', 0) if v_info else 0
-                
-                # Check validity AND resolution (don't reuse if it's high-res 4K when we want 720)
-                if is_video_valid(output_path) and (curr_h <= args.res + 50): # +50 for small variations
-                    print(f"✅ Pre-processed file exists and resolution is correct ({curr_h}p): {output_path}")
-                    processing_needed = False
-                    processed_files = [output_path]
-                else:
-                    reason = f"wrong resolution ({curr_h}p)" if is_video_valid(output_path) else "invalid/corrupted"
-                    print(f"⚠️ Pre-processed file is {reason}. Re-processing...")
-                    try: os.remove(output_path)
-                    except: pass
-                
-                # Decide upload method for existing file
-                if not processing_needed:
-                    file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
-                    upload_method = decide_upload_method(file_size_mb)
-                    if upload_method == 'bot' and not bot_available:
-                        upload_method = 'user'
-                    print(f"🎯 Selected method (Existing): {'Bot' if upload_method == 'bot' else 'User Account'}")
-
-            if processing_needed:
-                print(f"🔄 Processing and Compressing to 720p...")
-                
-                # Step 1: Always process & compress first
-                success = await process_video_for_user(input_path, output_path, title, add_intro=args.intro, target_res=args.res)
-                
-                if success and os.path.exists(output_path):
-                    # Step 2: Check size of the COMPRESSED file
-                    compressed_size_mb = os.path.getsize(output_path) / (1024 * 1024)
-                    print(f"📉 Compressed Size: {compressed_size_mb:.2f}MB")
-                    
-                    upload_method = 'user' # Default for large files
-                    
-                    # Decide if we need to split based on COMPRESSED size
-                    if compressed_size_mb > USER_MAX_SIZE_MB:
-                        print(f"⚠️ Still larger than {USER_MAX_SIZE_MB}MB after compression. Splitting...")
-                        processed_files = await split_video_for_user(output_path, output_dir, title, target_size_mb=USER_MAX_SIZE_MB, add_intro=False, target_res=args.res)
-                    else:
-                        # Fits in one part
-                        processed_files = [output_path]
-                        upload_method = decide_upload_method(compressed_size_mb)
-                        if upload_method == 'bot' and not bot_available:
-                            upload_method = 'user'
-                    
-                    print(f"🎯 Selected method (New): {'Bot' if upload_method == 'bot' else 'User Account'}")
-                else:
-                    print("❌ Processing failed.")
-                    failed_count += 1
+        # Current video + N prepared ahead of it
+        for _ in range(max(0, args.lookahead) + 1):
+            _schedule_next()
+
+        try:
+            while in_flight:
+                job = await in_flight.popleft()
+                _schedule_next()
+
+                if job['status'] == 'halt':
+                    print(f"{'!'*60}")
+                    print(f"❌ Error: File for next video ({job['idx']}) not found!")
+                    print(f"   Title: {job['title']}")
+                    print(f"   ⚠️ Possible cause: The drive containing this file is not connected.")
+                    print(f"   ⚠️ Program halted to maintain sequence in Telegram.")
+                    print(f"{'!'*60}\n")
+                    return # HALT
+                if job['status'] == 'skip':
                     continue
-            
-            if not processed_files:
-                print(f"❌ Error in file processing")
-                failed_count += 1
-                continue
-                
-            # Upload Logic
-            thumb_path = os.path.join(output_dir, f"thumb_{idx}.jpg")
-            has_thumb = False
-            
-            if processed_files:
-                # Try multiple timestamps
-                print(f"🖼️ Extracting thumbnail from {os.path.basename(processed_files[0])}...")
-                has_thumb = extract_thumbnail(processed_files[0], thumb_path)
-                
-                if not has_thumb:
-                    print(f"❌ CRITICAL Error: Mandatory thumbnail extraction failed for {idx}.")
-                    print(f"   Skipping this video to maintain professional quality.")
+                if job['status'] == 'failed':
                     failed_count += 1
                     continue
 
-            # Finalize Caption and Split if needed
-            if full_desc:
-                # Standard Telegram limit for media captions is 1024 characters.
-                # Premium accounts support 2048, but we use 1024 for universal compatibility.
-                caption_limit = 1024
-                current_len = len(caption) + len("📝 **Info:**\n")
-                remaining = caption_limit - current_len - 50 # Safe margin
-
-                if len(full_desc) <= remaining:
-                    caption += f"📝 **Info:**\n{full_desc}"
-                else:
-                    # Smart Split
-                    candidate = full_desc[:remaining]
-                    last_break = candidate.rfind('\n\n')
-                    if last_break < remaining * 0.5: last_break = max(candidate.rfind('. '), candidate.rfind('? '), candidate.rfind('! '))
-                    if last_break < remaining * 0.5: last_break = candidate.rfind('\n')
-                    if last_break < remaining * 0.5: last_break = candidate.rfind(' ')
-                    if last_break > 0:
-                        visible = full_desc[:last_break+1].strip()
-                        overflow_text = full_desc[last_break+1:].strip()
-                        caption += f"📝 **Info:**\n{visible}\n\n⬇️ **(See next message)**"
-                        need_overflow = True
-                    else:
-                        caption += f"📝 **Info:**\n{candidate}..."
-                        overflow_text = full_desc[remaining:]
-                        need_overflow = True
-
-            # CRITICAL: Always validate caption before sending
-            caption = validate_caption(caption)
-            if overflow_text:
-                overflow_text = validate_caption(overflow_text)
-
-            first_msg = None
-            if upload_method == "user":
-                 # User usually has 1 file
-                 for f_path in processed_files:
-                     msg = await upload_with_user_account(app, f_path, caption, channel_username, thumb=thumb_path if has_thumb else None)
-                     if msg:
-                         if not first_msg: first_msg = msg
-                         processed_count += 1
-                         print(f"🎉 User account upload successful!")
-                         # Save History & Update Manifest
-                         idx = get_index_from_filename(filename)
-                         save_upload_history(idx, title, msg, False)
-                         # Update manifest with status
-                         msg_id = msg.id if hasattr(msg, 'id') else None
-                         update_manifest_status(idx, "UPLOADED", msg_id=msg_id)
-                     else:
-                         failed_count += 1
-                         idx = get_index_from_filename(filename)
-                         update_manifest_status(idx, "FAILED")
-            else:
-                 # Bot
-                 for j, f_path in enumerate(processed_files):
-                     part_caption = caption if len(processed_files) == 1 else f"{caption}\n(Part {j+1}/{len(processed_files)})"
-                     part_caption = validate_caption(part_caption) 
-                     msg = await upload_with_bot(f_path, part_caption, telegram_token, channel_id, thumb=thumb_path if has_thumb else None)
-                     if msg:
-                         if not first_msg: first_msg = msg
-                         processed_count += 1
-                         print(f"🎉 Bot upload successful!")
-                         # Save History & Update Manifest
-                         if j == 0:  # Only update for first part
-                            idx = get_index_from_filename(filename)
-                            save_upload_history(idx, title, msg, True)
-                            msg_id = msg.message_id if hasattr(msg, 'message_id') else None
-                            update_manifest_status(idx, "UPLOADED", msg_id=msg_id)
-                     else:
-                         failed_count += 1
-                         if j == 0:
-                            idx = get_index_from_filename(filename)
-                            update_manifest_status(idx, "FAILED")
-            
-            # ✅ SHARED: Send Overflow Message (Follow-up) if needed
-            if first_msg and need_overflow and overflow_text:
-                print("   📄 Description split. Sending remainder as reply...")
-                try:
-                    # Determine message ID (Pyrogram uses .id, Bot API uses .message_id)
-                    reply_id = getattr(first_msg, 'id', getattr(first_msg, 'message_id', None))
-                    
-                    if reply_id:
-                        await app.send_message(
-                            chat_id=channel_username,
-                            text=f"📄 **Continued:**\n\n{overflow_text}",
-                            reply_to_message_id=reply_id,
-                            disable_web_page_preview=True
-                        )
-                        print("   ✅ Overflow message sent.")
-                    else:
-                        print("   ⚠️ Could not determine message ID for overflow reply.")
-                except Exception as exc:
-                    print(f"   ⚠️ Failed to send overflow: {exc}")
-            
-            # Cleanup thumb
-            if has_thumb and os.path.exists(thumb_path):
-                try: os.remove(thumb_path)
-                except: pass
-            
-            # Cleanup temp files (when processing was needed OR --cleanup flag is set)
-            should_cleanup = processing_needed or args.cleanup
-            if should_cleanup and processed_files: 
-                print("🧹 Cleaning up temporary files...")
-                for f_path in processed_files:
-                    try:
-                        if os.path.exists(f_path):
-                            os.remove(f_path)
-                            print(f"   🗑️ Removed: {os.path.basename(f_path)}")
-                    except Exception as e:
-                        print(f"   ⚠️ Cleanup failed for {f_path}: {e}")
-
-            # Delay between videos
-            if i < total_files:
-                # Simple cooldown wait
-                delay = 48
-                print(f"⏳ Waiting {delay} seconds...")
-                await asyncio.sleep(delay)
+                # Pacing between uploads is handled by the shared rate limiter
+                ok, failed = await publish_video(job, app)
+                processed_count += ok
+                failed_count += failed
+        finally:
+            # Stop encoders that ran ahead (their ffmpeg children are killed on cancel)
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
         
         print(f"{'='*60}")
         print(f"📊 Summary:")
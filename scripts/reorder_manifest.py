@@ -5,6 +5,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.manifest_manager import ManifestManager
+from src.manifest_parser import load_manifest
 
 def reorder():
     storage_dir = ".storage"
@@ -16,29 +17,8 @@ def reorder():
 
     print(f"📂 Reading existing manifest: {manifest_path}")
     
-    # Manually parsing to avoid strict 'fresh_video' dependency of save_manifest
-    videos = []
-    with open(manifest_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"): continue
-            
-            parts = [p.strip() for p in line.split("|")]
-            if len(parts) >= 3:
-                # Format: Index | Title | URL | Course | Section
-                v = {
-                    'index': parts[0],
-                    'title': parts[1],
-                    'url': parts[2],
-                    'course_title': parts[3] if len(parts) > 3 else "Unknown Course",
-                    'section': parts[4] if len(parts) > 4 else "General",
-                    'subsection': None, # Best effort
-                    'is_done': False # We preserve status logic via save_manifest if needed, but here just valid entries
-                }
-                # Try to preserve done status from comments? 
-                # Actually ManifestManager.save_manifest is smart enough to preserve OLD status data
-                # if we pass it as "fresh" data.
-                videos.append(v)
+    # Existing entries (done/skipped status is preserved by save_manifest)
+    videos = [e.to_dict() for e in load_manifest(manifest_path).active()]
 
     if not videos:
         print("❌ No videos found in manifest to reorder.")
@@ -1,5 +1,6 @@
 
 import os
+import re
 import sys
 import asyncio
 import argparse
@@ -10,8 +11,9 @@ from dotenv import load_dotenv
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import json
 from src.media_resolver import find_video_file, list_all_videos
+from src.manifest_parser import load_manifest
+from src.content_store import get_content_store
 from src.video_utils import process_video_for_user_safe as process_video_for_user, get_smart_title
 
 # -- Helper Functions (Copied from process_and_upload to avoid import side-effects) --
@@ -21,73 +23,36 @@ CONTENT_FILE = os.path.join(STORAGE_DIR, "scraped_content.json")
 
 def load_video_metadata(video_filename):
     """
-    Parses manifest to find metadata for the given video filename.
-    Returns: (Course Title, Section Title, Index, Total Videos) or None
+    Looks up manifest metadata for the given video filename.
+    Returns: dict with course, section, index, total, line_title, url — or None
     """
-    if not os.path.exists(MANIFEST_FILE):
-        return None
-        
     file_index = video_filename[:3]
     if not file_index.isdigit():
         return None
 
     try:
-        current_course = "Unknown Course"
-        current_section = "General"
-        course_video_count = 0
-        
-        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        
-        for line in lines:
-            line = line.strip()
-            if not line: continue
-            
-            if line.startswith("# === "):
-                content = line.replace("# === ", "").split(" ===")[0]
-                if "(" in content:
-                    current_course = content.split("(")[0].strip()
-                    try:
-                        count_part = content.split("(")[-1].replace(")", "").replace(" videos", "")
-                        if "limit" in count_part:
-                             course_video_count = count_part.split(" of ")[-1]
-                        else:
-                             course_video_count = count_part
-                    except:
-                        course_video_count = "?"
-                else:
-                    current_course = content
-                current_section = "General"
-                
-            elif line.startswith("## --- "):
-                current_section = line.replace("## --- ", "").replace(" ---", "").strip()
-                
-            elif " | " in line:
-                clean_line = line.replace("# [DONE] ", "")
-                if clean_line.startswith(f"{file_index} |"):
-                    parts = clean_line.split(" | ")
-                    url = parts[2].strip() if len(parts) > 2 else ""
-                    return {
-                        "course": current_course,
-                        "section": current_section,
-                        "index": file_index,
-                        "total": course_video_count,
-                        "line_title": parts[1],
-                        "url": url
-                    }
+        manifest = load_manifest(MANIFEST_FILE)
+        entry = manifest.find(file_index)
+        if entry:
+            return {
+                "course": entry.course,
+                "section": entry.section,
+                "index": file_index,
+                "total": manifest.course_counts.get(entry.course, 0),
+                "line_title": entry.title,
+                "url": entry.url
+            }
     except Exception as e:
         print(f"⚠️ Error parsing manifest: {e}")
         
     return None
 
 def load_extra_content(url):
-    """Loads description and links from json."""
+    """Loads description and links (indexed lookup by key, video_url or course_url)."""
     if not os.path.exists(CONTENT_FILE):
         return None
     try:
-        with open(CONTENT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get(url)
+        return get_content_store(CONTENT_FILE).get(url)
     except:
         return None
 # -------------------------------------------------------------------
@@ -3,7 +3,6 @@ import sys
 import argparse
 import concurrent.futures
 from tqdm import tqdm
-import yt_dlp
 import json
 import re
 
@@ -14,6 +13,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Moved to inside scan_videos to prevent startup hang
 from src.page_archiver import archive_page
 from src.media_library import MediaLibrary
+from src.manifest_parser import load_manifest
+from src.content_store import ContentJournal
+from src.download_engine import DownloadEngine
 # from src.manifest_manager import ManifestManager # Can't use global import if it needs dynamic paths? 
 # Actually we can pass paths to ManifestManager
 
@@ -30,7 +32,7 @@ FAILED_LOG = config.get_path("failed_log")
 from src.manifest_manager import ManifestManager
 manifest_mgr = ManifestManager(storage_dir=STORAGE_DIR, manifest_filename=os.path.basename(MANIFEST_FILE))
 
-def scan_videos(limit=None, update_metadata=False, offset=0, verbose=False):
+def scan_videos(limit=None, update_metadata=False, offset=0, verbose=False, workers=None):
     print(f"🚀 Starting Phased Scan... (Offset: {offset})")
     
     # Lazy Import to prevent startup hang
@@ -58,42 +60,41 @@ def scan_videos(limit=None, update_metadata=False, offset=0, verbose=False):
     print("📥 Starting Content Extraction (Phase 2)...")
     print("-"*50)
     
+    content_journal = ContentJournal(CONTENT_FILE)
+    checkpointed = 0
+
     try:
         def on_lesson_hydrated(lesson_data):
+            nonlocal checkpointed
+            
             # 1. Archive
-            archive_page(lesson_data['course_url'], lesson_data.get('title', 'Untitled'))
+            # Reuse the HTML the scraper already fetched instead of downloading the page again
+            archive_page(lesson_data['course_url'], lesson_data.get('title', 'Untitled'), html=lesson_data.get('html'))
             
-            # 2. Metadata Database Update
+            # 2. Metadata Database Update (one appended journal line; compacted periodically)
             video_url = lesson_data.get('url')
             try:
-                 content_data = {}
-                 if os.path.exists(CONTENT_FILE):
-                     with open(CONTENT_FILE, "r", encoding="utf-8") as f:
-                         try: content_data = json.load(f)
-                         except: pass
-                 
-                 content_data[lesson_data['course_url']] = {
+                 content_journal.put(lesson_data['course_url'], {
                      "title": lesson_data.get('title'),
                      "video_url": video_url,
                      "description": lesson_data.get('description'),
                      "links": lesson_data.get('links'),
                      "archived": True
-                 }
-                 with open(CONTENT_FILE, "w", encoding="utf-8") as f:
-                     json.dump(content_data, f, indent=2, ensure_ascii=False)
-            except: pass
+                 })
+            except Exception as e:
+                 print(f"   ⚠️ Could not record content for {lesson_data.get('title')}: {e}")
 
             collected_lessons.append(lesson_data)
             
             # Incremental Save
-            # If verbose, save EVERY time for debugging. Else save every 5.
-            save_interval = 1 if verbose else 5
-            
-            if len(collected_lessons) % save_interval == 0:
-                 manifest_mgr.save_manifest(collected_lessons)
+            # If verbose, save EVERY time for debugging. Else checkpoint every 5 lessons.
+            # A checkpoint only upserts the lessons found since the previous one.
+            if verbose or len(collected_lessons) - checkpointed >= 5:
+                 manifest_mgr.checkpoint(collected_lessons[checkpointed:])
+                 checkpointed = len(collected_lessons)
 
         # Execute Extraction
-        collected_lessons = scraper.scan_content(limit=limit, offset=offset, callback=on_lesson_hydrated)
+        collected_lessons = scraper.scan_content(limit=limit, offset=offset, callback=on_lesson_hydrated, workers=workers)
         
     except FatalScraperError as e:
         print(f"\n🛑 Content Scan Stopped: {e}")
@@ -101,6 +102,7 @@ def scan_videos(limit=None, update_metadata=False, offset=0, verbose=False):
         print(f"\n❌ Error in Phase 2: {e}")
     
     # Final Save
+    content_journal.flush()
     if collected_lessons:
         manifest_mgr.save_manifest(collected_lessons)
                 
@@ -126,95 +128,21 @@ def download_videos(force=False):
             return
 
     print(f"📂 Loading manifest: {MANIFEST_FILE}")
-    videos_to_download = []
-    
-    current_course = "Unknown Course"
-    current_section = "General"
-    
-    # Regex to parse 'Index_Title' (supports '001_Title' and '039_1_Title')
-    index_title_pattern = re.compile(r"^(\d+(?:_\d+)?)_(.*)$")
-
-    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line: continue
-            
-            # Context Tracking
-            if line.startswith("# === "):
-                current_course = line.replace("# === ", "").replace(" ===", "").strip()
-                current_section = "General" # Reset section on new course
-                continue
-            if line.startswith("## --- "):
-                current_section = line.replace("## --- ", "").replace(" ---", "").strip()
-                continue
-            if line.startswith("#"): continue
-            
-            parts = [p.strip() for p in line.split("|")]
-            
-            parts = [p.strip() for p in line.split("|")]
-            
-            # --- Smart Parse: Find URL ---
-            url_idx = -1
-            for i, p in enumerate(parts):
-                if p.startswith("http"):
-                    url_idx = i
-                    break
-            
-            if url_idx == -1: continue # No URL found
-            
-            url = parts[url_idx]
-            
-            # --- Extract Metadata (Course/Section) ---
-            # Default to context
-            vid_course = current_course
-            vid_section = current_section
-            
-            # If explicit columns exist AFTER the URL
-            if len(parts) > url_idx + 1:
-                vid_course = parts[url_idx+1]
-            if len(parts) > url_idx + 2:
-                vid_section = parts[url_idx+2]
-
-            # --- Extract Index & Title ---
-            # Everything BEFORE the URL
-            pre_url_parts = parts[:url_idx]
-            
-            index_str = "999"
-            title = "Unknown"
-            
-            if pre_url_parts:
-                first = pre_url_parts[0]
-                # Check for pure index: "001" or "039_4"
-                if re.match(r"^\d+(?:_\d+)?$", first) and len(pre_url_parts) > 1:
-                    # Format: Index | Title
-                    index_str = first
-                    title = " - ".join(pre_url_parts[1:])
-                else:
-                    # Format: Index_Title (or just Title)
-                    # Try to split Index_Title
-                    match = index_title_pattern.match(first)
-                    if match:
-                        index_str = match.group(1)
-                        t_prefix = match.group(2)
-                        # Append any other cols (e.g. Index_Prefix | Suffix)
-                        if len(pre_url_parts) > 1:
-                            title = t_prefix + " - " + " - ".join(pre_url_parts[1:])
-                        else:
-                            title = t_prefix
-                    else:
-                        # Fallback: No index found in first part
-                        # e.g. "Just a Title"
-                        title = " - ".join(pre_url_parts)
-
-            videos_to_download.append({
-                "index": index_str,
-                "title": title,
-                "url": url,
-                "course": vid_course,
-                "section": vid_section
-            })
-
-    total_videos = len(videos_to_download)
+    manifest = load_manifest(MANIFEST_FILE)
+
+    def pending_videos():
+        # Done ([DONE]) and hand-commented entries are not downloaded again
+        for e in manifest.entries:
+            if not e.is_done and not e.skipped:
+                yield {
+                    "index": e.index or "999",
+                    "title": e.title,
+                    "url": e.url,
+                    "course": e.course,
+                    "section": e.section
+                }
+
+    total_videos = sum(1 for _ in pending_videos())
     print(f"⬇️ Queued {total_videos} videos for download to {OUTPUT_DIR}")
 
     if total_videos == 0:
@@ -225,42 +153,68 @@ def download_videos(force=False):
     media_lib = MediaLibrary()
     media_lib.build_index()
 
+    # Concurrency caps, fragment parallelism and bandwidth cap (config 'download')
+    engine = DownloadEngine()
+    stats = engine.stats
+    stats.total = total_videos
+
     success_count = 0
     fail_count = 0
     failed_items = []
-    max_workers = 3
-
+    max_workers = engine.max_concurrent
+    # Streaming submission: only a bounded window of jobs exists at any time
+    max_in_flight = max_workers * 2
+
+    def run_job(vid):
+        stats.job_started()
+        # Per-video bar only while the download is actually running
+        pbar = tqdm(total=100, desc=f"{vid['index']} {vid['title'][:15]}...", unit="%", leave=False)
+        return _download_single(
+            vid['url'],
+            vid['title'],
+            vid['index'],
+            vid.get('course', 'Unknown'),
+            vid.get('section', 'General'),
+            pbar,
+            force,
+            media_lib,
+            engine
+        )
+
+    videos = pending_videos()
     with tqdm(total=total_videos, desc="Overall Progress", unit="file") as total_pbar:
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {}
-            for vid in videos_to_download:
-                pbar = tqdm(total=100, desc=f"{vid['index']} {vid['title'][:15]}...", unit="MB", leave=False)
-                future = executor.submit(
-                        _download_single, 
-                        vid['url'], 
-                        vid['title'], 
-                        vid['index'],
-                        vid.get('course', 'Unknown'),
-                        vid.get('section', 'General'),
-                        pbar,
-                        force,
-                        media_lib
-                    )
-                futures[future] = vid
-
-            for future in concurrent.futures.as_completed(futures):
-                vid = futures[future]
-                try:
-                    res = future.result()
+            in_flight = {}
+
+            def submit_next():
+                vid = next(videos, None)
+                if vid is not None:
+                    in_flight[executor.submit(run_job, vid)] = vid
+
+            for _ in range(max_in_flight):
+                submit_next()
+
+            while in_flight:
+                finished, _ = concurrent.futures.wait(in_flight, timeout=1, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    vid = in_flight.pop(future)
+                    try:
+                        res = future.result()
+                    except Exception:
+                        res = False
                     if res:
                          success_count += 1
-                         manifest_mgr.mark_video_completed(vid['index'])
+                         manifest_mgr.mark_video_completed(vid['index'], url=vid['url'])
                     else:
                          fail_count += 1
                          failed_items.append(vid)
-                except:
-                    fail_count += 1
-                    failed_items.append(vid)
+                    stats.job_finished(bool(res))
+                    total_pbar.update(1)
+                    submit_next()
+                total_pbar.set_postfix_str(stats.summary(), refresh=True)
+    
+    # [DONE] marks are batched; write the final state to the text manifest
+    manifest_mgr.flush()
     
     print("\n" + "="*50)
     print(f"🎉  Download Batch Finished!")
@@ -284,7 +238,7 @@ def _sanitize_folder_name(name):
     sanitized = re.sub(r'-+', '-', sanitized)
     return sanitized[:60]
 
-def _download_single(video_url, title, index_str, course, section, pbar, force=False, media_lib=None):
+def _download_single(video_url, title, index_str, course, section, pbar, force=False, media_lib=None, engine=None):
     # 1. Start Smart Skip (Library Check)
     if media_lib and not force:
         existing_path = media_lib.find_file(title)
@@ -293,6 +247,9 @@ def _download_single(video_url, title, index_str, course, section, pbar, force=F
              pbar.update(100)
              pbar.close()
              return True
+        similar = media_lib.find_similar(title)
+        if similar:
+             tqdm.write(f"   🔎 Similar title in library: {os.path.basename(similar[0])} ({similar[1]:.0%}) - downloading anyway")
     
     # 2. Output Path Prep
     course_dir = os.path.join(OUTPUT_DIR, _sanitize_folder_name(course))
@@ -311,21 +268,11 @@ def _download_single(video_url, title, index_str, course, section, pbar, force=F
         pbar.close()
         return True
 
-    # 4. Download
-    ydl_opts = {
-        "outtmpl": output_path,
-        "format": "bestvideo+bestaudio/best",
-        "merge_output_format": "mp4",
-        "progress_hooks": [lambda d: _update_progress(d, pbar)],
-        "quiet": True,
-        "no_warnings": True,
-        "overwrites": force,
-        "retries": 10
-    }
-    
+    # 4. Download (resumes a partial file left by an interrupted run)
+    engine = engine or DownloadEngine()
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([video_url])
+        engine.download(video_url, output_path, force=force,
+                        progress_hooks=[lambda d: _update_progress(d, pbar)])
         return True
     except Exception as e:
         tqdm.write(f"\n❌ Error {filename}: {e}")
@@ -347,12 +294,11 @@ def _update_progress(d, pbar):
 
 def archive_manifest_pages():
     if not os.path.exists(MANIFEST_FILE): return
-    urls = []
-    with open(MANIFEST_FILE, 'r') as f:
-        for line in f:
-            if '|' in line and not line.strip().startswith('#'):
-                parts = line.split('|')
-                if len(parts) >= 3: urls.append({'url': parts[2].strip(), 'title': parts[1].strip()})
+    urls = [
+        {'url': e.url, 'title': e.title}
+        for e in load_manifest(MANIFEST_FILE).entries
+        if not e.is_done and not e.skipped
+    ]
     
     print(f"📋 Archiving {len(urls)} pages...")
     for item in urls:
@@ -368,23 +314,16 @@ def calculate_next_index(manifest_path, course, section):
     last_index_in_section = None
     max_global_index = 0
     
-    with open(manifest_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if "|" not in line or line.strip().startswith("#"): continue
-            parts = [p.strip() for p in line.split("|")]
-            if len(parts) < 5: continue
-            
-            idx = parts[0]
-            c = parts[3]
-            s = parts[4]
-            
-            # Global max tracker (for purely new sections)
-            if idx.isdigit():
-                 max_global_index = max(max_global_index, int(idx))
-            
-            # Match Course and Section
-            if c == course and s == section:
-                last_index_in_section = idx
+    for e in load_manifest(manifest_path).active():
+        idx = e.index or ""
+        
+        # Global max tracker (for purely new sections); '999' marks unnumbered entries
+        if e.number and idx != "999":
+             max_global_index = max(max_global_index, int(e.number))
+        
+        # Match Course and Section
+        if e.course == course and e.section == section:
+            last_index_in_section = idx
 
     if last_index_in_section:
         # If last index was '039' or '039_3', we want next sub-index
@@ -476,7 +415,7 @@ def process_single_url(url, verbose=False, download=True):
         archive_dir = os.path.join(target_base, f"{sanitized_title}_Assets")
         
         print(f"   📦 Archiving to: {archive_dir}")
-        archive_report = archive_page(url, title, output_dir=archive_dir)
+        archive_report = archive_page(url, title, output_dir=archive_dir, html=details.get('html'))
         
         # Save Metadata
         if archive_report.get('success'):
@@ -611,6 +550,7 @@ def main():
     parser.add_argument("--update-metadata", action="store_true", help="Rescan URLs")
     parser.add_argument("--visible", action="store_true", help="Run browser in visible mode")
     parser.add_argument("--offset", type=int, default=0, help="Start offset")
+    parser.add_argument("--workers", type=int, help="Parallel browsers for lesson hydration (default: config scraper.hydration_workers)")
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose mode")
     
     args = parser.parse_args()
@@ -622,7 +562,7 @@ def main():
     if args.url:
         process_single_url(args.url, verbose=args.verbose)
     elif args.scan:
-        scan_videos(limit=args.limit, update_metadata=args.update_metadata, offset=args.offset, verbose=args.verbose)
+        scan_videos(limit=args.limit, update_metadata=args.update_metadata, offset=args.offset, verbose=args.verbose, workers=args.workers)
     elif args.download:
         download_videos(force=args.force)
     elif args.archive:
@@ -1,5 +1,6 @@
 # update_captions.py
 import os
+import sys
 import re
 import json
 import asyncio
@@ -12,6 +13,10 @@ from pyrogram import Client
 from pyrogram.errors import RPCError, ChatAdminRequired
 from pyrogram.enums import ChatType, ParseMode
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.rate_limiter import get_limiter
+from src.manifest_parser import load_manifest
+
 # =========================== Env & Config ===========================
 load_dotenv()
 
@@ -64,35 +69,11 @@ def clean_caption(caption: str) -> str:
 def load_manifest_hierarchy() -> Dict[str, Dict[str, str]]:
     """Returns {index: {'course': ..., 'section': ...}}"""
     manifest_path = os.path.join(".storage", "downloaded_video.txt")
-    if not os.path.exists(manifest_path):
-        return {}
-    
-    hierarchy = {}
-    current_course = "Unknown Course"
-    current_section = "General"
-    
     try:
-        with open(manifest_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line: continue
-                if line.startswith("# === "):
-                    current_course = line.replace("# === ", "").split(" ===")[0].strip()
-                    if "(" in current_course:
-                        current_course = current_course.split("(")[0].strip()
-                elif line.startswith("## --- "):
-                    current_section = line.replace("## --- ", "").replace(" ---", "").strip()
-                elif "|" in line:
-                    idx_part = line.split("|")[0].strip()
-                    if idx_part.startswith("# [DONE] "):
-                        idx_part = idx_part.replace("# [DONE] ", "").strip()
-                    # Catch index like 001
-                    m = re.match(r'^(\d{3})', idx_part)
-                    if m:
-                         hierarchy[m.group(1)] = {"course": current_course, "section": current_section}
-    except:
-        pass
-    return hierarchy
+        manifest = load_manifest(manifest_path)
+    except Exception:
+        return {}
+    return {num: {"course": e.course, "section": e.section} for num, e in manifest.by_number.items()}
 
 def create_numbered_caption(number: int, original_caption: str) -> str:
     title = clean_caption(original_caption or "")
@@ -137,6 +118,10 @@ def create_pyrogram_client(force_user=False) -> Client:
         # Use the same session as the uploader for consistency
         return Client("hybrid_account", api_id=API_ID, api_hash=API_HASH)
 
+def get_client_kind(app: Client) -> str:
+    """Rate-limiter key for this client: 'bot' or 'user'."""
+    return "bot" if getattr(app, "bot_token", None) else "user"
+
 def is_channel_like(t) -> bool:
     try:
         return t in (ChatType.CHANNEL, ChatType.SUPERGROUP)
@@ -294,6 +279,8 @@ def plan_numbering_by_files(videos, files_sorted: List[Tuple[Path, datetime]]):
 # =========================== Apply updates ===========================
 async def apply_updates(app: Client, chat_id: int, planned, dry_run=True):
     ok, fail = 0, 0
+    limiter = get_limiter()
+    client_kind = get_client_kind(app)
     print(f"\n{'🔄 Dry run (No changes)' if dry_run else '📝 Applying updates'} | Count: {len(planned)}")
     for i, item in enumerate(planned, start=1):
         mid = item["message_id"]
@@ -308,18 +295,15 @@ async def apply_updates(app: Client, chat_id: int, planned, dry_run=True):
             ok += 1
             continue
         try:
-            await app.edit_message_caption(chat_id, mid, newc, parse_mode=ParseMode.HTML)
+            # Paced by the shared limiter; FloodWait errors are waited out and retried there
+            await limiter.run(client_kind, chat_id, lambda: app.edit_message_caption(chat_id, mid, newc, parse_mode=ParseMode.HTML), action="edit")
             ok += 1
-            await asyncio.sleep(0.7)
         except ChatAdminRequired:
             print("  ❌ Admin privileges required to edit messages in this channel.")
             fail += 1
         except RPCError as e:
             print(f"  ❌ Error: {e}")
             fail += 1
-            if "FLOOD" in str(e).upper():
-                print("  ⏳ Pausing for 30 seconds...")
-                await asyncio.sleep(30)
         except Exception as e:
             print(f"  ❌ Unexpected error: {e}")
             fail += 1
@@ -388,6 +372,8 @@ async def create_index_posts(app: Client, chat_id: int, planned, title="📚 Vid
             print(f"⚠️ Error fetching placeholders: {e}")
 
     placeholder_idx = 0
+    limiter = get_limiter()
+    client_kind = get_client_kind(app)
 
     def format_line(item):
         display_name = item.get("display_name")
@@ -434,7 +420,7 @@ async def create_index_posts(app: Client, chat_id: int, planned, title="📚 Vid
                     print("   👉 I will not overwrite your video files. Please provide enough text placeholders.")
                     return False # Signal to stop
 
-                await app.edit_message_text(chat_id, target_mid, chunk, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+                await limiter.run(client_kind, chat_id, lambda: app.edit_message_text(chat_id, target_mid, chunk, parse_mode=ParseMode.HTML, disable_web_page_preview=True), action="edit")
                 print(f"   📝 Updated Index Post #{target_mid} ({placeholder_idx + 1}/{len(placeholders)})")
                 placeholder_idx += 1
             except Exception as e:
@@ -447,7 +433,7 @@ async def create_index_posts(app: Client, chat_id: int, planned, title="📚 Vid
                 # Increment index so we don't spam "would send" too much? No, it's fine.
                 placeholder_idx += 1 
             else:
-                msg = await app.send_message(chat_id, chunk, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+                msg = await limiter.run(client_kind, chat_id, lambda: app.send_message(chat_id, chunk, parse_mode=ParseMode.HTML, disable_web_page_preview=True))
                 print(f"   🆕 Sent new Index Post #{msg.id}")
                 target_mid = msg.id
 
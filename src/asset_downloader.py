@@ -0,0 +1,154 @@
+"""
+Asset downloader — concurrent image/attachment fetching for page_archiver
+
+Downloads run in a thread pool over one pooled session, with a cap per host.
+Bodies are streamed to disk in chunks while being hashed, then kept once in
+the content-addressed BlobStore and hardlinked into each page, so:
+  - a URL already fetched in this run is linked without a request,
+  - a known URL is revalidated with a conditional GET (304 = relink the blob),
+  - identical content from different URLs is stored once.
+"""
+import os
+import hashlib
+import threading
+import concurrent.futures
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlparse
+
+from .http_client import get_session
+from .blob_store import BlobStore
+
+MAX_WORKERS = 8
+PER_HOST_LIMIT = 4
+CHUNK_SIZE = 64 * 1024
+# Fixed pool of per-URL locks (striped by hash), so memory does not grow with the URLs seen
+URL_LOCK_STRIPES = 64
+
+
+@dataclass
+class AssetJob:
+    url: str
+    dest: str
+    timeout: float = 30
+    skip_existing: bool = False
+
+
+@dataclass
+class AssetResult:
+    url: str
+    dest: str
+    ok: bool
+    status: str                 # downloaded | unchanged | reused | deduped | exists | failed
+    error: Optional[str] = None
+    sha256: Optional[str] = None
+
+
+class AssetDownloader:
+    """Thread-pooled downloader with per-host limits; see module docstring."""
+
+    def __init__(self, store=None, session=None, max_workers=MAX_WORKERS, per_host=PER_HOST_LIMIT):
+        if store is None:
+            from .config import get_path
+            store = BlobStore(get_path("blob_store_dir"))
+        self.store = store
+        self.session = session or get_session()
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+        self._url_locks = [threading.Lock() for _ in range(URL_LOCK_STRIPES)]
+        self._fetched = {}      # url -> sha256, for this downloader's lifetime
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def _url_lock(self, url):
+        # Two URLs sharing a stripe just serialize; a download holds only one lock
+        return self._url_locks[hash(url) % len(self._url_locks)]
+
+    def download_all(self, jobs):
+        """Runs all jobs concurrently; results are returned in job order."""
+        if not jobs:
+            return []
+        workers = max(1, min(self.max_workers, len(jobs)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.download, jobs))
+
+    def download(self, job):
+        try:
+            # Same URL twice at once (e.g. one logo on several pages) -> fetch once
+            with self._url_lock(job.url):
+                return self._download(job)
+        except Exception as e:
+            return AssetResult(job.url, job.dest, False, "failed", str(e))
+
+    def _download(self, job):
+        if job.skip_existing and os.path.exists(job.dest):
+            return AssetResult(job.url, job.dest, True, "exists")
+
+        sha256 = self._fetched.get(job.url)
+        if sha256 and self.store.blob_path(sha256):
+            self.store.link(sha256, job.dest)
+            return AssetResult(job.url, job.dest, True, "reused", sha256=sha256)
+
+        known = self.store.lookup_url(job.url)
+        headers = {}
+        if known:
+            if known["etag"]:
+                headers["If-None-Match"] = known["etag"]
+            if known["last_modified"]:
+                headers["If-Modified-Since"] = known["last_modified"]
+
+        tmp_file = self.store.temp_path()
+        with self._host_slot(job.url):
+            response = self.session.get(job.url, timeout=job.timeout, headers=headers, stream=True)
+            try:
+                if response.status_code == 304 and known:
+                    self.store.link(known["sha256"], job.dest)
+                    self._fetched[job.url] = known["sha256"]
+                    return AssetResult(job.url, job.dest, True, "unchanged", sha256=known["sha256"])
+                response.raise_for_status()
+                sha256, size = self._stream_to_file(response, tmp_file)
+            finally:
+                response.close()
+
+        ext = os.path.splitext(urlparse(job.url).path)[1]
+        _, is_new = self.store.add(tmp_file, sha256, size, ext)
+        self.store.map_url(job.url, sha256, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        self.store.link(sha256, job.dest)
+        self._fetched[job.url] = sha256
+        return AssetResult(job.url, job.dest, True, "downloaded" if is_new else "deduped", sha256=sha256)
+
+    @staticmethod
+    def _stream_to_file(response, path):
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return digest.hexdigest(), size
+
+
+_downloader = None
+_downloader_lock = threading.Lock()
+
+def get_downloader():
+    """Shared downloader on the shared auth-cookie session (keeps its per-run URL memo)."""
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = AssetDownloader()
+        return _downloader
@@ -0,0 +1,135 @@
+"""
+Blob store — content-addressed storage for archived page assets
+
+Every downloaded asset is stored once under .storage/blobs/<aa>/<sha256><ext>
+and pages get hardlinks to it (a copy when hardlinks are not possible, e.g.
+across filesystems). A SQLite table maps each original URL to its blob along
+with the HTTP validators, so re-archiving a page only revalidates URLs and
+relinks files.
+"""
+import os
+import uuid
+import shutil
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS urls_sha256 ON urls(sha256);
+"""
+
+
+def place_file(src, dest):
+    """Puts a copy of src at dest: hardlink when possible, else a real copy."""
+    if os.path.abspath(src) == os.path.abspath(dest):
+        return
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    tmp_dest = dest + ".tmp"
+    if os.path.exists(tmp_dest):
+        os.remove(tmp_dest)
+    try:
+        os.link(src, tmp_dest)
+    except OSError:
+        shutil.copy2(src, tmp_dest)
+    os.replace(tmp_dest, dest)
+
+
+class BlobStore:
+    """SHA-256 keyed blobs plus the URL -> blob map; thread-safe."""
+
+    def __init__(self, root, db_file=None):
+        self.root = root
+        self.db_file = db_file or os.path.join(root, "blobs.db")
+        self.lock = threading.RLock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def temp_path(self):
+        """Scratch file inside the store, so finished downloads are renamed (not copied) in."""
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        return os.path.join(tmp_dir, uuid.uuid4().hex + ".part")
+
+    def blob_path(self, sha256):
+        """Path of a stored blob, or None if it is unknown or missing on disk."""
+        with self.lock:
+            row = self.conn.execute("SELECT path, size FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if not row:
+            return None
+        path, size = row
+        try:
+            if os.path.getsize(path) == size:
+                return path
+        except OSError:
+            pass
+        return None
+
+    def add(self, tmp_file, sha256, size, ext=""):
+        """
+        Moves a finished download into the store. Returns (blob_path, is_new);
+        when the content is already stored, tmp_file is discarded.
+        """
+        with self.lock:
+            existing = self.blob_path(sha256)
+            if existing:
+                os.remove(tmp_file)
+                return existing, False
+            path = os.path.join(self.root, sha256[:2], sha256 + (ext or "").lower()[:10])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_file, path)
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO blobs (sha256, size, path) VALUES (?, ?, ?)",
+                                  (sha256, size, path))
+            return path, True
+
+    def lookup_url(self, url):
+        """{sha256, etag, last_modified, path} for a URL whose blob is still on disk, else None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT sha256, etag, last_modified FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        path = self.blob_path(row[0])
+        if not path:
+            return None
+        return {"sha256": row[0], "etag": row[1], "last_modified": row[2], "path": path}
+
+    def map_url(self, url, sha256, etag=None, last_modified=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO urls (url, sha256, etag, last_modified) VALUES (?, ?, ?, ?)",
+                (url, sha256, etag, last_modified)
+            )
+
+    def link(self, sha256, dest):
+        """Hardlinks (or copies) a blob to dest; a no-op if dest already is that blob."""
+        path = self.blob_path(sha256)
+        if not path:
+            raise FileNotFoundError(f"Blob {sha256} is not in the store")
+        try:
+            if os.path.samefile(path, dest):
+                return path
+        except OSError:
+            pass
+        place_file(path, dest)
+        return path
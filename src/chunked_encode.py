@@ -0,0 +1,196 @@
+"""
+Chunked encode — one long video encoded by several ffmpeg processes at once
+
+The source is cut at keyframes into ~chunk_seconds pieces. Each piece is
+encoded video-only by its own ffmpeg process (up to `chunk_workers` at a
+time), the audio track is encoded once alongside them, and the concat demuxer
+joins everything with -c copy. Chunks must come out with identical stream
+parameters, each last its planned length to within a frame and compress the
+source at a similar ratio (no quality outlier); otherwise the result is
+discarded and the caller encodes in a single process as before.
+
+Settings come from the `video` section of config.yaml (chunk_workers,
+chunk_seconds, chunk_min_duration).
+"""
+import os
+import asyncio
+import shutil
+import statistics
+
+from src import config
+from src.ffmpeg_tools import _drop_option, _video_stream_index, keyframe_index, probe_video, run_ffmpeg_async
+
+# Encoders whose output can be joined losslessly chunk by chunk
+CHUNK_ENCODERS = ('libx264', 'libx265')
+# Cores per chunk process when chunk_workers is 0 (auto)
+CORES_PER_WORKER = 8
+# Allowed difference between the joined output and the source (seconds)
+DURATION_TOLERANCE = 1.0
+# Allowed difference between a chunk and its planned length (frames): audio is
+# encoded once for the whole source, so any chunk drift desyncs A/V
+CHUNK_FRAME_TOLERANCE = 1
+# Compression ratio (chunk bytes / source bytes of the same span) allowed
+# against the median chunk: beyond this factor the chunk is a quality outlier
+CHUNK_RATIO_SPREAD = 2.5
+# Output options that only concern the audio stream (dropped from chunk commands)
+_AUDIO_OPTIONS = ("-af", "-c:a", "-b:a")
+
+
+def chunk_workers(settings=None):
+    settings = settings or config.get_video_config()
+    workers = int(settings["chunk_workers"])
+    if workers <= 0:
+        workers = (os.cpu_count() or 1) // CORES_PER_WORKER
+    return max(1, workers)
+
+
+def plan_chunks(keyframe_times, duration, chunk_seconds):
+    """
+    [(start, end), ...] covering 0..duration, each cut on a keyframe about
+    chunk_seconds after the previous cut; a short tail stays with the last chunk.
+    """
+    starts = [0.0]
+    next_cut = chunk_seconds
+    for t in sorted(keyframe_times):
+        if t >= next_cut and duration - t >= chunk_seconds / 2:
+            starts.append(t)
+            next_cut = t + chunk_seconds
+    ends = starts[1:] + [duration]
+    return list(zip(starts, ends))
+
+
+def _split_command(cmd):
+    """(input_path, output options, output_path) of a single-input encode command."""
+    i = cmd.index("-i")
+    return cmd[i + 1], cmd[i + 2:-1], cmd[-1]
+
+
+def chunk_command(cmd, start, end, chunk_path, threads, last=False):
+    """Video-only encode of [start, end) with the same output options as cmd."""
+    input_path, options, _ = _split_command(cmd)
+    for flag in _AUDIO_OPTIONS:
+        options = _drop_option(options, flag)
+    argv = ["ffmpeg", "-y", "-ss", f"{start:.6f}", "-i", input_path]
+    if not last:
+        argv += ["-t", f"{end - start:.6f}"]
+    argv += ["-an"] + _drop_option(options, "-movflags") + ["-threads", str(threads), chunk_path]
+    return argv
+
+
+def audio_command(cmd, audio_path):
+    """Audio-only encode of the whole source with the audio options of cmd."""
+    input_path, options, _ = _split_command(cmd)
+    argv = ["ffmpeg", "-y", "-i", input_path, "-vn"]
+    for flag in _AUDIO_OPTIONS:
+        if flag in options:
+            argv += [flag, options[options.index(flag) + 1]]
+    return argv + [audio_path]
+
+
+def source_bytes(keyframes, total_bytes, chunks):
+    """Source video bytes inside each planned chunk, from the keyframe index."""
+    before = dict(keyframes)
+    return [before.get(end, total_bytes) - before.get(start, 0) for start, end in chunks]
+
+
+def check_chunks(chunk_probes, chunks, chunk_source_bytes=None):
+    """
+    Quality/consistency gate before joining: every chunk has the same codec,
+    frame size, pixel format and frame rate (concat -c copy needs that), each
+    one lasts its planned end - start to within a frame, so the video stays in
+    sync with the separately encoded audio, and each one compresses its part
+    of the source at a ratio within CHUNK_RATIO_SPREAD of the median chunk
+    (an outlier was encoded at a visibly different quality). Returns a list
+    of problems.
+    """
+    problems = []
+    if any(p is None for p in chunk_probes):
+        return ["chunk could not be probed"]
+    params = {(p['codec'], p['width'], p['height'], p['pix_fmt'], round(p['fps'], 2)) for p in chunk_probes}
+    if len(params) > 1:
+        problems.append(f"chunks differ in stream parameters: {sorted(params)}")
+    for i, (p, (start, end)) in enumerate(zip(chunk_probes, chunks)):
+        tolerance = CHUNK_FRAME_TOLERANCE / (p['fps'] or 25) + 1e-3
+        if abs(p['duration'] - (end - start)) > tolerance:
+            problems.append(f"chunk {i + 1} lasts {p['duration']:.3f}s, planned {end - start:.3f}s")
+    if chunk_source_bytes and all(b > 0 for b in chunk_source_bytes):
+        ratios = [p['size'] / b for p, b in zip(chunk_probes, chunk_source_bytes)]
+        median = statistics.median(ratios)
+        for i, ratio in enumerate(ratios):
+            if median and not median / CHUNK_RATIO_SPREAD <= ratio <= median * CHUNK_RATIO_SPREAD:
+                problems.append(f"chunk {i + 1} compresses at {ratio:.2f}x the source, median {median:.2f}x")
+    return problems
+
+
+async def encode_in_chunks(cmd, encoder, duration, settings=None):
+    """
+    Runs the single-process encode `cmd` (one input, output path last) as
+    parallel keyframe-aligned chunks. Returns True when the output was
+    written; False when chunking does not apply or failed (nothing written).
+    """
+    settings = settings or config.get_video_config()
+    workers = chunk_workers(settings)
+    if workers < 2 or encoder not in CHUNK_ENCODERS or not duration or duration < float(settings["chunk_min_duration"]):
+        return False
+
+    input_path, _, output_path = _split_command(cmd)
+    probe = probe_video(input_path)
+    if not probe:
+        return False
+    index = await asyncio.to_thread(keyframe_index, input_path, _video_stream_index(probe))
+    if not index or not index['keyframes']:
+        return False
+    chunks = plan_chunks([t for t, _ in index['keyframes']], probe['duration'], float(settings["chunk_seconds"]))
+    if len(chunks) < 2:
+        return False
+
+    work_dir = output_path + ".chunks"
+    os.makedirs(work_dir, exist_ok=True)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    slots = asyncio.Semaphore(workers)
+    print(f"   🧩 Encoding {len(chunks)} chunks with {workers} parallel workers ({threads} threads each)")
+
+    async def run(argv, label):
+        async with slots:
+            returncode, stderr_tail = await run_ffmpeg_async(argv, timeout=3600)
+        if returncode != 0:
+            print(f"   ⚠️ {label} failed: {stderr_tail[-1][-200:] if stderr_tail else 'unknown'}")
+        return returncode == 0
+
+    try:
+        chunk_paths = [os.path.join(work_dir, f"chunk_{i:04d}.mp4") for i in range(len(chunks))]
+        jobs = [
+            run(chunk_command(cmd, start, end, path, threads, last=(i == len(chunks) - 1)), f"Chunk {i + 1}")
+            for i, ((start, end), path) in enumerate(zip(chunks, chunk_paths))
+        ]
+        audio_path = os.path.join(work_dir, "audio.m4a") if probe['has_audio'] else None
+        if audio_path:
+            jobs.append(run(audio_command(cmd, audio_path), "Audio"))
+        if not all(await asyncio.gather(*jobs)):
+            return False
+
+        chunk_probes = [probe_video(p, use_cache=False) for p in chunk_paths]
+        problems = check_chunks(chunk_probes, chunks, source_bytes(index['keyframes'], index['total'], chunks))
+        if problems:
+            print(f"   ⚠️ Chunk check failed: {'; '.join(problems)}")
+            return False
+
+        list_file = os.path.join(work_dir, "chunks.txt")
+        with open(list_file, "w", encoding="utf-8") as f:
+            for path in chunk_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        join = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file]
+        if audio_path:
+            join += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+        join += ["-c", "copy", "-movflags", "+faststart", output_path]
+        returncode, stderr_tail = await run_ffmpeg_async(join, timeout=1200)
+        result = probe_video(output_path, use_cache=False) if returncode == 0 else None
+        if not result or abs(result['duration'] - probe['duration']) > DURATION_TOLERANCE:
+            print(f"   ⚠️ Joining chunks failed: {stderr_tail[-1][-200:] if stderr_tail else 'duration mismatch'}")
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            return False
+        return True
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
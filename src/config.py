@@ -24,7 +24,13 @@ def get_storage_config():
         "media_paths_file": "media_paths.json",
         "content_file": "scraped_content.json",
         "chrome_profile_dir": "chrome_profile",
-        "failed_log": "failed_downloads.txt"
+        "failed_log": "failed_downloads.txt",
+        "probe_cache_file": "probe_cache.db",
+        "http_cache_dir": "http_cache",
+        "blob_store_dir": "blobs",
+        "media_index_file": "media_index.db",
+        "encoder_cache_file": "encoder_capabilities.json",
+        "intro_cache_dir": "intro_cache"
     }
     
     # Merge defaults
@@ -47,7 +53,83 @@ def get_path(key):
     if key == "downloads_dir":
         return conf["downloads_dir"]
         
-    if key in ["manifest_file", "media_paths_file", "content_file", "chrome_profile_dir", "failed_log"]:
+    if key in ["manifest_file", "media_paths_file", "content_file", "chrome_profile_dir", "failed_log", "probe_cache_file", "http_cache_dir", "blob_store_dir", "media_index_file", "encoder_cache_file", "intro_cache_dir"]:
         return os.path.join(conf["base_dir"], conf[key])
         
     return conf.get(key)
+
+def get_video_config():
+    """Returns the 'video' section from config with defaults."""
+    video = dict(_config_cache.get('video', {}))
+    
+    # Defaults
+    defaults = {
+        "target_resolution": 720,
+        "add_intro": False,
+        "encoding_preset": "fast",
+        "crf_quality": 23,
+        "chunk_workers": 0,
+        "chunk_seconds": 60,
+        "chunk_min_duration": 600,
+        "profiles": {}
+    }
+    
+    for k, v in defaults.items():
+        if k not in video:
+            video[k] = v
+            
+    return video
+
+def get_upload_config():
+    """Returns the 'upload' section from config with defaults."""
+    upload = dict(_config_cache.get('upload', {}))
+    
+    # Defaults
+    defaults = {
+        "bot_delay": 30,
+        "user_delay": 120,
+        "adaptive_delay": True,
+        "bot_max_size_mb": 45,
+        "user_max_size_mb": 1900
+    }
+    
+    for k, v in defaults.items():
+        if k not in upload:
+            upload[k] = v
+            
+    return upload
+
+def get_scraper_config():
+    """Returns the 'scraper' section from config with defaults."""
+    scraper = dict(_config_cache.get('scraper', {}))
+    
+    # Defaults
+    defaults = {
+        "hydration_workers": 4,
+        "http_first": True
+    }
+    
+    for k, v in defaults.items():
+        if k not in scraper:
+            scraper[k] = v
+            
+    return scraper
+
+def get_download_config():
+    """Returns the 'download' section from config with defaults."""
+    download = dict(_config_cache.get('download', {}))
+    
+    # Defaults
+    defaults = {
+        "max_concurrent": 3,
+        "per_host_limit": 3,
+        "fragment_concurrency": 4,
+        "rate_limit_mb": 0,
+        "retries": 10
+    }
+    
+    for k, v in defaults.items():
+        if k not in download:
+            download[k] = v
+            
+    return download
@@ -0,0 +1,325 @@
+"""
+Content store — indexed lookups into scraped_content.json
+
+scraped_content.json stays the canonical file (the maintenance tools edit it
+directly). This store mirrors it into SQLite with indexes on the record key,
+video_url and course_url, so a lookup is a single indexed query instead of a
+full json.load of the whole document. Page HTML is not mirrored (lookups only
+need the metadata).
+
+Writes during a scan go through ContentJournal: one appended JSONL line per
+lesson, folded into scraped_content.json by periodic compaction. The mirror
+follows the journal incrementally (only lines appended since the last lookup
+are read) and recognises its own compactions from a small marker file, so
+during a scan nothing re-parses the whole document. Only an outside edit of
+the JSON file triggers a full rebuild.
+"""
+import os
+import json
+import sqlite3
+import threading
+
+# Compact once the journal holds this share of the base file's records (min COMPACT_MIN_RECORDS),
+# so total rewrite cost stays linear in the number of lessons
+COMPACT_RATIO = 0.25
+COMPACT_MIN_RECORDS = 50
+
+
+# Fields left out of the SQLite mirror (large, never needed by lookups)
+_UNMIRRORED_FIELDS = ("html",)
+
+
+def journal_path(json_file):
+    return os.path.splitext(json_file)[0] + ".journal.jsonl"
+
+
+def previous_journal_path(json_file):
+    return os.path.splitext(json_file)[0] + ".journal.prev.jsonl"
+
+
+def compaction_path(json_file):
+    return os.path.splitext(json_file)[0] + ".compacted.json"
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+        return f"{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        return ""
+
+
+def read_journal(path):
+    """Yields (key, record) pairs from a journal; a torn last line (crash) is ignored."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+                yield item["key"], item["record"]
+            except (ValueError, KeyError, TypeError):
+                continue
+
+
+def read_journal_from(path, offset):
+    """
+    ([(key, record), ...], new_offset) for the complete lines appended after
+    byte `offset`; a line still being written is left for the next read.
+    """
+    items = []
+    if not os.path.exists(path):
+        return items, offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                item = json.loads(line)
+                items.append((item["key"], item["record"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+    return items, offset
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS content (
+    key TEXT PRIMARY KEY,
+    video_url TEXT,
+    course_url TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS content_video_url ON content(video_url);
+CREATE INDEX IF NOT EXISTS content_course_url ON content(course_url);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class ContentJournal:
+    """
+    Write-behind writer for scraped_content.json.
+    put() appends one JSONL line (constant cost); compact() folds the journal
+    into the JSON file. Leftovers from an interrupted run are compacted on open.
+    """
+
+    def __init__(self, json_file):
+        self.json_file = json_file
+        self.journal_file = journal_path(json_file)
+        self.lock = threading.Lock()
+        self._base_records = None
+        self._pending = 0
+        os.makedirs(os.path.dirname(self.json_file) or ".", exist_ok=True)
+        if os.path.exists(self.journal_file):
+            self.compact()
+
+    def put(self, key, record):
+        """Persists one record: a single appended line, compacting when the journal gets large."""
+        line = json.dumps({"key": key, "record": record}, ensure_ascii=False)
+        with self.lock:
+            with open(self.journal_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._pending += 1
+            if self._base_records is None:
+                self._base_records = self._count_base_records()
+            if self._pending >= max(COMPACT_MIN_RECORDS, self._base_records * COMPACT_RATIO):
+                self._compact_locked()
+
+    def _count_base_records(self):
+        # Only needed once per session; the count is tracked afterwards
+        if not os.path.exists(self.json_file):
+            return 0
+        try:
+            with open(self.json_file, "r", encoding="utf-8") as f:
+                return len(json.load(f))
+        except Exception:
+            return 0
+
+    def compact(self):
+        """Folds journaled records into scraped_content.json (atomic replace) and clears the journal."""
+        with self.lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        if not os.path.exists(self.journal_file):
+            return
+        data = {}
+        if os.path.exists(self.json_file):
+            try:
+                with open(self.json_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                # Keep the journal so nothing is lost; try again on the next compaction
+                print(f"⚠️ Could not read {self.json_file} for compaction: {e}")
+                return
+        for key, record in read_journal(self.journal_file):
+            data[key] = record
+
+        # Marker for ContentStore: the new base file is the old one plus exactly
+        # these journal bytes, kept as the previous journal so a mirror that
+        # lags behind can catch up from it instead of rebuilding
+        marker = {"from": file_signature(self.json_file), "journal_bytes": os.path.getsize(self.journal_file)}
+        tmp_file = self.json_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.json_file)
+        marker["to"] = file_signature(self.json_file)
+        marker_file = compaction_path(self.json_file)
+        with open(marker_file + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(marker, f)
+        os.replace(self.journal_file, previous_journal_path(self.json_file))
+        os.replace(marker_file + ".tmp", marker_file)
+        self._base_records = len(data)
+        self._pending = 0
+
+    def flush(self):
+        """Final flush at the end of a scan."""
+        self.compact()
+
+
+class ContentStore:
+    """Lazily opened, thread-safe index over the scraped content database."""
+
+    def __init__(self, json_file, db_file=None):
+        self.json_file = json_file
+        self.db_file = db_file or os.path.splitext(json_file)[0] + ".db"
+        self.lock = threading.RLock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def _get_meta(self, key, default=""):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _upsert(self, items):
+        rows = []
+        for key, val in items:
+            if not isinstance(val, dict):
+                continue
+            mirrored = {k: v for k, v in val.items() if k not in _UNMIRRORED_FIELDS}
+            rows.append((key, val.get('video_url'), val.get('course_url'), json.dumps(mirrored, ensure_ascii=False)))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO content (key, video_url, course_url, data) VALUES (?, ?, ?, ?)", rows
+        )
+
+    def _catch_up_compaction(self, known_base, base):
+        """
+        If the base file only changed by a compaction, applies the journal
+        lines the mirror had not seen yet (from the previous journal) and
+        returns True; False means a full rebuild is needed.
+        """
+        try:
+            with open(compaction_path(self.json_file), "r", encoding="utf-8") as f:
+                marker = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if marker.get("from") != known_base or marker.get("to") != base:
+            return False
+        offset = int(self._get_meta("journal_offset", "0") or 0)
+        items, offset = read_journal_from(previous_journal_path(self.json_file), offset)
+        if offset != marker.get("journal_bytes"):
+            return False
+        with self.conn:
+            self._upsert(items)
+            self._set_meta("json_signature", base)
+            self._set_meta("journal_offset", 0)
+        return True
+
+    def _rebuild(self, base):
+        data = {}
+        if os.path.exists(self.json_file):
+            try:
+                with open(self.json_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Could not read {self.json_file}: {e}")
+                return False
+        with self.conn:
+            self.conn.execute("DELETE FROM content")
+            self._upsert(data.items())
+            self._set_meta("json_signature", base)
+            self._set_meta("journal_offset", 0)
+        return True
+
+    def sync(self):
+        """
+        Brings the mirror up to date: journal lines appended since the last
+        sync are applied incrementally; the whole JSON file is re-read only
+        when it changed other than by a known compaction.
+        """
+        with self.lock:
+            changed = False
+            base = file_signature(self.json_file)
+            known_base = self._get_meta("json_signature", None)
+            if base != known_base:
+                caught_up = known_base is not None and self._catch_up_compaction(known_base, base)
+                if not caught_up and not self._rebuild(base):
+                    return False
+                changed = True
+
+            journal = journal_path(self.json_file)
+            offset = int(self._get_meta("journal_offset", "0") or 0)
+            size = os.path.getsize(journal) if os.path.exists(journal) else 0
+            if size < offset:
+                # Journal replaced behind our back: start over from the files
+                if not self._rebuild(base):
+                    return False
+                offset, changed = 0, True
+            if size > offset:
+                items, new_offset = read_journal_from(journal, offset)
+                with self.conn:
+                    self._upsert(items)
+                    self._set_meta("journal_offset", new_offset)
+                changed = changed or bool(items)
+            return changed
+
+    def get(self, url):
+        """
+        Record for `url`: looked up by key first, then by video_url, then by course_url.
+        Returns None if nothing matches.
+        """
+        if not url:
+            return None
+        with self.lock:
+            self.sync()
+            for column in ("key", "video_url", "course_url"):
+                row = self.conn.execute(f"SELECT data FROM content WHERE {column} = ? LIMIT 1", (url,)).fetchone()
+                if row:
+                    return json.loads(row[0])
+        return None
+
+    def __len__(self):
+        with self.lock:
+            self.sync()
+            return self.conn.execute("SELECT COUNT(*) FROM content").fetchone()[0]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_content_store(json_file=None):
+    """Shared store per content file (default: config content_file)."""
+    if json_file is None:
+        from .config import get_path
+        json_file = get_path("content_file")
+    key = os.path.abspath(json_file)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ContentStore(json_file)
+        return _stores[key]
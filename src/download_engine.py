@@ -0,0 +1,184 @@
+"""
+Download engine — yt-dlp downloads with concurrency caps and a bandwidth cap
+
+Settings come from the `download` section of config.yaml:
+  - max_concurrent: videos downloaded at the same time (all hosts together)
+  - per_host_limit: videos downloaded at the same time from one host
+  - fragment_concurrency: parallel fragment downloads for HLS/DASH streams
+  - rate_limit_mb: total bandwidth cap in MB/s shared by all downloads (0 = off)
+
+Partial files are resumed as yt-dlp always has (continuedl, its default);
+the engine only turns that off for forced re-downloads. HTTP downloads are
+fetched in byte-range chunks (http_chunk_size), HLS/DASH fragments in parallel.
+"""
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from src import config
+
+# Byte-range chunk size for progressive (non-HLS) downloads
+HTTP_CHUNK_SIZE = 10 * 1024 * 1024
+
+
+class BandwidthLimiter:
+    """Thread-safe byte budget: consume(n) blocks until n bytes fit under `rate` bytes/s."""
+
+    def __init__(self, rate, burst_seconds=1.0):
+        self.rate = rate
+        self.capacity = rate * burst_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        if self.rate <= 0 or amount <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            # Debt is paid by sleeping outside the lock; other downloads keep reserving behind us
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class DownloadStats:
+    """Thread-safe batch counters: bytes (for MB/s), active/queued/done/failed jobs and ETA."""
+
+    def __init__(self, total=0, window=10.0):
+        self.total = total
+        self.window = window
+        self.started = 0
+        self.done = 0
+        self.failed = 0
+        self.bytes = 0
+        self.start_time = time.monotonic()
+        self._samples = deque()   # (time, bytes) within the last `window` seconds
+        self.lock = threading.Lock()
+
+    def add_bytes(self, amount):
+        now = time.monotonic()
+        with self.lock:
+            self.bytes += amount
+            self._samples.append((now, amount))
+            while self._samples and now - self._samples[0][0] > self.window:
+                self._samples.popleft()
+
+    def job_started(self):
+        with self.lock:
+            self.started += 1
+
+    def job_finished(self, ok):
+        with self.lock:
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self.lock:
+            recent = [(t, n) for t, n in self._samples if now - t <= self.window]
+            span = min(self.window, now - self.start_time) or 1.0
+            finished = self.done + self.failed
+            elapsed = now - self.start_time
+            remaining = max(0, self.total - finished)
+            return {
+                "mb_per_sec": sum(n for _, n in recent) / span / (1024 * 1024),
+                "active": self.started - finished,
+                "queued": max(0, self.total - self.started),
+                "done": self.done,
+                "failed": self.failed,
+                # Based on the file completion rate so far
+                "eta": elapsed / finished * remaining if finished else None,
+            }
+
+    def summary(self):
+        snap = self.snapshot()
+        eta = snap["eta"]
+        eta_text = "--" if eta is None else f"{int(eta // 60)}m{int(eta % 60):02d}s"
+        return (f"{snap['mb_per_sec']:.1f} MB/s | ETA {eta_text} | "
+                f"{snap['active']} active, {snap['queued']} queued, {snap['failed']} failed")
+
+
+class DownloadEngine:
+    """Shared by all download workers of a batch."""
+
+    def __init__(self, settings=None):
+        settings = settings or config.get_download_config()
+        self.max_concurrent = max(1, int(settings["max_concurrent"]))
+        self.per_host = max(1, int(settings["per_host_limit"]))
+        self.fragments = max(1, int(settings["fragment_concurrency"]))
+        self.retries = int(settings["retries"])
+        self.rate = int(float(settings["rate_limit_mb"]) * 1024 * 1024)
+        self.limiter = BandwidthLimiter(self.rate) if self.rate > 0 else None
+        self.stats = DownloadStats()
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def host_slot(self, url):
+        """Blocks while `per_host_limit` downloads from the same host are running."""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            slot = self._host_slots[host]
+        with slot:
+            yield
+
+    def throttle_hook(self):
+        """yt-dlp progress hook counting each download's new bytes and charging them to the bandwidth budget."""
+        seen = {}
+
+        def hook(d):
+            if d.get('status') != 'downloading':
+                return
+            key = d.get('tmpfilename') or d.get('filename')
+            downloaded = d.get('downloaded_bytes') or 0
+            if key not in seen:
+                # First report: a resumed file already counts its old bytes, don't charge them
+                seen[key] = downloaded
+                return
+            delta = downloaded - seen[key]
+            seen[key] = downloaded
+            if delta > 0:
+                self.stats.add_bytes(delta)
+                if self.limiter:
+                    self.limiter.consume(delta)
+
+        return hook
+
+    def ydl_opts(self, output_path, force=False, progress_hooks=()):
+        opts = {
+            "outtmpl": output_path,
+            "format": "bestvideo+bestaudio/best",
+            "merge_output_format": "mp4",
+            "progress_hooks": [self.throttle_hook(), *progress_hooks],
+            "quiet": True,
+            "no_warnings": True,
+            "overwrites": force,
+            # yt-dlp resumes .part files by default; a forced download starts over
+            "continuedl": not force,
+            "retries": self.retries,
+            "fragment_retries": self.retries,
+            "concurrent_fragment_downloads": self.fragments,
+            "http_chunk_size": HTTP_CHUNK_SIZE,
+        }
+        if self.rate > 0:
+            # A single download never exceeds the global cap either
+            opts["ratelimit"] = self.rate
+        return opts
+
+    def download(self, url, output_path, force=False, progress_hooks=()):
+        """Downloads one video (blocking). Raises yt-dlp errors."""
+        import yt_dlp
+        with self.host_slot(url):
+            with yt_dlp.YoutubeDL(self.ydl_opts(output_path, force, progress_hooks)) as ydl:
+                ydl.download([url])
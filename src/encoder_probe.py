@@ -0,0 +1,131 @@
+"""
+Encoder probe — which video encoders actually work here, and how fast
+
+Every candidate encoder listed by `ffmpeg -encoders` test-encodes a short
+synthetic 720p clip with the settings of the user-720p profile. An encoder
+that is compiled in but unusable (h264_nvenc without a GPU, VideoToolbox
+outside macOS) fails the test and is never picked; the working ones are
+ranked by measured encode fps. Results are stored in .storage keyed by the
+ffmpeg build, so later runs only ask ffmpeg for its version.
+"""
+import os
+import json
+import time
+import shutil
+import subprocess
+import threading
+
+from .config import get_path
+from .encoding_profiles import encoder_options, get_profile
+
+# Candidates, in order of preference when two are equally fast
+CANDIDATE_ENCODERS = ('hevc_videotoolbox', 'h264_videotoolbox', 'h264_nvenc', 'libx265', 'libx264')
+FALLBACK_ENCODER = 'libx264'
+
+# Synthetic test clip (no input file needed)
+TEST_SOURCE = "testsrc2=size=1280x720:rate=25"
+TEST_SECONDS = 2
+TEST_TIMEOUT = 60
+
+_lock = threading.Lock()
+
+
+def ffmpeg_version():
+    """First line of `ffmpeg -version` plus the binary path (the cache key), or None without ffmpeg."""
+    binary = shutil.which("ffmpeg")
+    if not binary:
+        return None
+    try:
+        result = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True, timeout=10)
+    except Exception:
+        return None
+    if result.returncode != 0 or not result.stdout:
+        return None
+    return f"{result.stdout.splitlines()[0].strip()} ({binary})"
+
+
+def listed_encoders():
+    """Candidates that this ffmpeg build was compiled with."""
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=10)
+    except Exception:
+        return []
+    names = {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+    return [e for e in CANDIDATE_ENCODERS if e in names]
+
+
+def benchmark_encoder(encoder):
+    """Encodes the test clip; {'ok': bool, 'fps': frames per second, 'error': str}."""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-v", "error", "-y",
+        "-f", "lavfi", "-i", TEST_SOURCE, "-t", str(TEST_SECONDS),
+        "-c:v", encoder, *encoder_options(encoder, get_profile("user", 720)),
+        "-pix_fmt", "yuv420p", "-f", "null", "-"
+    ]
+    started = time.monotonic()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=TEST_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return {"ok": False, "fps": 0.0, "error": "timeout"}
+    except Exception as e:
+        return {"ok": False, "fps": 0.0, "error": str(e)}
+    elapsed = max(time.monotonic() - started, 1e-3)
+    if result.returncode != 0:
+        error = (result.stderr or "").strip().splitlines()
+        return {"ok": False, "fps": 0.0, "error": error[-1][:200] if error else f"exit {result.returncode}"}
+    return {"ok": True, "fps": round(TEST_SECONDS * 25 / elapsed, 1), "error": ""}
+
+
+def fastest_encoder(results):
+    """Working encoder with the highest fps (ties: CANDIDATE_ENCODERS order), else the fallback."""
+    working = [e for e in CANDIDATE_ENCODERS if results.get(e, {}).get("ok")]
+    if not working:
+        return FALLBACK_ENCODER
+    return max(working, key=lambda e: (results[e]["fps"], -CANDIDATE_ENCODERS.index(e)))
+
+
+def _load(cache_file):
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {}
+
+
+def _save(cache_file, data):
+    try:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        tmp_file = cache_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        print(f"   ⚠️ Could not save encoder capabilities: {e}")
+
+
+def probe_encoders(force=False, cache_file=None):
+    """
+    {encoder: {'ok', 'fps', 'error'}} for this ffmpeg build, from the cache
+    when this build was probed before. Empty dict without ffmpeg.
+    """
+    version = ffmpeg_version()
+    if not version:
+        return {}
+    cache_file = cache_file or get_path("encoder_cache_file")
+    with _lock:
+        cache = _load(cache_file)
+        entry = cache.get(version)
+        if entry and not force:
+            return entry["encoders"]
+
+        print("🔬 Probing video encoders (once per ffmpeg build)...")
+        results = {}
+        for encoder in listed_encoders():
+            results[encoder] = benchmark_encoder(encoder)
+            status = f"{results[encoder]['fps']:.0f} fps" if results[encoder]["ok"] else f"unusable ({results[encoder]['error']})"
+            print(f"   {'✅' if results[encoder]['ok'] else '❌'} {encoder}: {status}")
+        cache[version] = {"probed_at": time.strftime("%Y-%m-%d %H:%M:%S"), "encoders": results}
+        _save(cache_file, cache)
+        return results
@@ -0,0 +1,173 @@
+"""
+Encoding profiles — declarative ffmpeg encode settings rendered into argv
+
+A profile says what an output should look like (frame size, fps, audio
+format, size limit); ENCODER_TUNING says how each encoder reaches the
+quality target. build_encode_command() renders both into one ffmpeg argv for
+a plain encode, a seeked part or an intro + video concat, so the process and
+split paths can no longer drift apart.
+
+`encoding_preset` and `crf_quality` in the `video` section of config.yaml set
+the quality for every profile; `video.profiles.<name>` overrides single
+fields, e.g.:
+
+    video:
+      profiles:
+        bot-720p: {crf: 26}
+"""
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from src import config
+
+AUDIO_FILTER = "aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo"
+
+# Options that never take a value (everything else in our argv is "-flag value")
+_BOOLEAN_OPTIONS = {"-y", "-n", "-an", "-vn", "-sn", "-dn", "-nostats"}
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    name: str
+    width: int
+    height: int
+    fps: int = 25
+    preset: Optional[str] = None        # None: config encoding_preset
+    crf: Optional[int] = None           # None: config crf_quality
+    max_size_mb: Optional[int] = None   # Telegram limit the output is meant for
+    follow_target: bool = False         # Frame size follows the requested target resolution
+
+
+PROFILES = {
+    "bot-720p": EncodingProfile("bot-720p", 1280, 720, max_size_mb=45),
+    "bot-1080p": EncodingProfile("bot-1080p", 1920, 1080, max_size_mb=45),
+    "user-720p": EncodingProfile("user-720p", 1280, 720, max_size_mb=1900),
+    "user-1080p": EncodingProfile("user-1080p", 1920, 1080, max_size_mb=1900),
+    # Re-encoded split parts (fallback splitter, intro-bearing first part)
+    "split-part": EncodingProfile("split-part", 1280, 720, follow_target=True),
+}
+
+
+def _x264(preset, crf):
+    return ["-preset", preset, "-crf", str(crf)]
+
+def _x265(preset, crf):
+    # x265 reaches x264's quality at a ~2 higher CRF
+    return ["-tag:v", "hvc1", "-preset", preset, "-crf", str(crf + 2)]
+
+def _videotoolbox_hevc(preset, crf):
+    return ["-tag:v", "hvc1", "-q:v", str(_vt_quality(crf) - 5)]
+
+def _videotoolbox_h264(preset, crf):
+    return ["-q:v", str(_vt_quality(crf))]
+
+def _nvenc(preset, crf):
+    return ["-preset", "fast", "-cq", str(crf)]
+
+def _vt_quality(crf):
+    # VideoToolbox -q:v is 1-100 (higher = better); 65 matches CRF 23
+    return max(1, min(100, 65 - (crf - 23) * 3))
+
+
+# Encoder -> quality options for (preset, crf)
+ENCODER_TUNING = {
+    "libx264": _x264,
+    "libx265": _x265,
+    "hevc_videotoolbox": _videotoolbox_hevc,
+    "h264_videotoolbox": _videotoolbox_h264,
+    "h264_nvenc": _nvenc,
+}
+
+
+def get_profile(kind, target_res=720, settings=None):
+    """
+    Profile `<kind>-<target_res>p` (or `kind` itself, e.g. "split-part") with
+    config defaults and overrides applied.
+    """
+    settings = settings or config.get_video_config()
+    name = kind if kind in PROFILES else f"{kind}-{target_res}p"
+    profile = PROFILES[name]
+    if profile.follow_target:
+        width, height = (1920, 1080) if target_res == 1080 else (1280, 720)
+        profile = replace(profile, width=width, height=height)
+    profile = replace(
+        profile,
+        preset=profile.preset or settings.get("encoding_preset", "fast"),
+        crf=profile.crf if profile.crf is not None else int(settings.get("crf_quality", 23)),
+    )
+    overrides = (settings.get("profiles") or {}).get(name) or {}
+    fields = {k: v for k, v in overrides.items() if k in EncodingProfile.__dataclass_fields__ and k != "name"}
+    return replace(profile, **fields) if fields else profile
+
+
+def video_filter(profile):
+    w, h = profile.width, profile.height
+    return (f"fps={profile.fps},scale={w}:{h}:force_original_aspect_ratio=decrease,"
+            f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1")
+
+
+def encoder_options(encoder, profile):
+    tuning = ENCODER_TUNING.get(encoder)
+    return tuning(profile.preset, profile.crf) if tuning else ["-preset", "fast"]
+
+
+def dedupe_options(argv):
+    """
+    Drops repeated output options, keeping the last value of each
+    (later settings override earlier ones). Input options (everything up to
+    the last -i and its value) and the output path are left as they are.
+    """
+    last_input = max((i for i, arg in enumerate(argv) if arg == "-i"), default=-1)
+    head_end = last_input + 2 if last_input >= 0 else 1
+    head, options, output = argv[:head_end], argv[head_end:-1], argv[-1:]
+
+    pairs, i = [], 0
+    while i < len(options):
+        flag = options[i]
+        if flag in _BOOLEAN_OPTIONS or not flag.startswith("-") or i + 1 >= len(options):
+            pairs.append((flag,))
+            i += 1
+        else:
+            pairs.append((flag, options[i + 1]))
+            i += 2
+    # -map may legitimately repeat
+    last_index = {p[0]: n for n, p in enumerate(pairs) if p[0] != "-map"}
+    kept = [p for n, p in enumerate(pairs) if p[0] == "-map" or last_index[p[0]] == n]
+    return head + [arg for p in kept for arg in p] + output
+
+
+def build_encode_command(profile, input_path, output_path, encoder, intro_path=None,
+                         start=None, duration=None, extra_options=()):
+    """
+    ffmpeg argv encoding input_path (optionally the [start, start+duration)
+    part of it, optionally preceded by the intro clip) according to profile.
+    """
+    argv = ["ffmpeg", "-y"]
+    if intro_path:
+        argv += ["-i", intro_path]
+    # Seek and length are input options: they cut the source, not the intro
+    if start is not None:
+        argv += ["-ss", str(start)]
+    if duration is not None:
+        argv += ["-t", str(duration)]
+    argv += ["-i", input_path]
+
+    vf = video_filter(profile)
+    if intro_path:
+        argv += [
+            "-filter_complex",
+            f"[0:v:0]{vf}[v0];"
+            f"[1:v:0]{vf}[v1];"
+            f"[0:a:0]{AUDIO_FILTER}[a0];"
+            f"[1:a:0]{AUDIO_FILTER}[a1];"
+            f"[v0][a0][v1][a1]concat=n=2:v=1:a=1[outv][outa]",
+            "-map", "[outv]", "-map", "[outa]",
+        ]
+    else:
+        argv += ["-vf", vf, "-af", AUDIO_FILTER]
+
+    argv += ["-c:v", encoder, "-c:a", "aac"]
+    argv += encoder_options(encoder, profile)
+    argv += ["-pix_fmt", "yuv420p", "-movflags", "+faststart"]
+    argv += list(extra_options)
+    return dedupe_options(argv + [output_path])
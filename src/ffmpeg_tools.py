@@ -0,0 +1,263 @@
+"""
+FFmpeg tools — running ffmpeg/ffprobe and reading what they report
+
+Low-level helpers shared by video_utils and chunked_encode: non-blocking
+ffmpeg runs with progress, the cached ffprobe entry point, the keyframe
+index and argv editing. Kept out of video_utils so chunked_encode can
+import them without a circular import.
+"""
+import os
+import re
+import json
+import asyncio
+import subprocess
+from collections import deque
+
+from .probe_cache import get_probe_cache
+
+# ffmpeg `-progress` reports the current output timestamp in microseconds
+# (`out_time_ms` is a historical misnomer and is also in microseconds).
+_PROGRESS_TIME_RE = re.compile(r'^out_time_(?:us|ms)=(\d+)')
+
+def _kill_process(proc):
+    """Kill a child process if it is still running."""
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+
+async def run_ffmpeg_async(cmd, timeout=None, duration=None, label="Encoding"):
+    """
+    Run an ffmpeg command without blocking the event loop.
+    
+    - Progress is streamed via `-progress pipe:1` and printed as a percentage
+      when the expected output `duration` (seconds) is known.
+    - On timeout the child is killed and subprocess.TimeoutExpired is raised.
+    - On task cancellation the child is killed before the error propagates.
+    
+    Returns (returncode, stderr_tail) where stderr_tail holds the last lines
+    ffmpeg wrote to stderr (useful for error reporting).
+    """
+    argv = [cmd[0], "-nostats", "-progress", "pipe:1"] + list(cmd[1:])
+    proc = await asyncio.create_subprocess_exec(
+        *argv,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stderr_tail = deque(maxlen=20)
+    
+    async def _drain_stderr():
+        while True:
+            line = await proc.stderr.readline()
+            if not line:
+                break
+            stderr_tail.append(line.decode("utf-8", "replace").rstrip())
+    
+    async def _pump_progress():
+        last_step = -1
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                break
+            if not duration:
+                continue
+            match = _PROGRESS_TIME_RE.match(line.decode("utf-8", "replace").strip())
+            if match:
+                pct = min(100.0, (int(match.group(1)) / 1_000_000) / duration * 100)
+                step = int(pct) // 5
+                if step != last_step:
+                    last_step = step
+                    print(f"   📊 {label}: {pct:.0f}%", end='\r', flush=True)
+    
+    try:
+        await asyncio.wait_for(asyncio.gather(_pump_progress(), _drain_stderr(), proc.wait()), timeout)
+    except TimeoutError:
+        _kill_process(proc)
+        await proc.wait()
+        raise subprocess.TimeoutExpired(argv, timeout)
+    except BaseException:
+        # Cancellation (CancelledError) or Ctrl+C: never leave ffmpeg orphaned
+        _kill_process(proc)
+        await proc.wait()
+        raise
+    
+    if duration:
+        print()
+    return proc.returncode, list(stderr_tail)
+
+# Stream fields kept in the cached probe (full ffprobe output is much larger)
+_PROBE_STREAM_KEYS = (
+    "index", "codec_type", "codec_name", "profile", "pix_fmt", "width", "height",
+    "sample_aspect_ratio", "r_frame_rate", "avg_frame_rate", "bit_rate", "duration",
+    "sample_rate", "channels", "field_order", "color_space", "color_transfer", "color_primaries",
+    "level", "refs", "has_b_frames", "color_range", "is_avc", "nal_length_size"
+)
+
+def _parse_rate(rate):
+    """'30000/1001' -> 29.97"""
+    try:
+        num, _, den = str(rate).partition('/')
+        num, den = float(num), float(den or 1)
+        return num / den if den else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+def _stream_rotation(stream):
+    """Rotation in degrees from the legacy `rotate` tag or the display matrix side data."""
+    try:
+        rotate = int(float(stream.get('tags', {}).get('rotate', 0)))
+    except (TypeError, ValueError):
+        rotate = 0
+    for side_data in stream.get('side_data_list', []):
+        if 'rotation' in side_data:
+            try:
+                rotate = int(float(side_data['rotation']))
+            except (TypeError, ValueError):
+                pass
+    return rotate
+
+def _build_probe(data, path, st):
+    """Condense raw ffprobe JSON into the structured probe result."""
+    fmt = data.get('format', {})
+    tags = fmt.get('tags', {})
+
+    streams = []
+    for stream in data.get('streams', []):
+        entry = {k: stream[k] for k in _PROBE_STREAM_KEYS if k in stream}
+        entry['rotation'] = _stream_rotation(stream)
+        language = stream.get('tags', {}).get('language')
+        if language:
+            entry['language'] = language
+        streams.append(entry)
+
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+    try:
+        duration = float(fmt.get('duration') or (video or {}).get('duration') or 0)
+    except (TypeError, ValueError):
+        duration = 0.0
+    try:
+        bitrate = int(fmt.get('bit_rate') or 0)
+    except (TypeError, ValueError):
+        bitrate = 0
+
+    width = int(video.get('width', 0)) if video else 0
+    height = int(video.get('height', 0)) if video else 0
+    rotation = video.get('rotation', 0) if video else 0
+    display_w, display_h = (height, width) if abs(rotation) in (90, 270) else (width, height)
+
+    return {
+        'path': path,
+        'size': st.st_size,
+        'format_name': fmt.get('format_name', ''),
+        'duration': duration,
+        'bitrate': bitrate,
+        'title': tags.get('title', '') or tags.get('TITLE', ''),
+        'width': width,
+        'height': height,
+        'display_width': display_w,
+        'display_height': display_h,
+        'rotation': rotation,
+        'sar': (video.get('sample_aspect_ratio') or '1:1') if video else '1:1',
+        'codec': video.get('codec_name', '') if video else '',
+        'profile': video.get('profile', '') if video else '',
+        'pix_fmt': video.get('pix_fmt', '') if video else '',
+        'fps': _parse_rate(video.get('r_frame_rate', '0/1')) if video else 0,
+        'audio_codec': audio.get('codec_name', '') if audio else '',
+        'has_audio': audio is not None,
+        'streams': streams,
+    }
+
+def probe_video(input_path, use_cache=True):
+    """
+    Single ffprobe entry point.
+    Returns a structured dict (streams, duration, bitrate, title, codec,
+    width/height, display dimensions after rotation, sar, fps, audio) or None
+    if the file is missing or unreadable.
+    Results are cached on disk keyed by path + size + mtime, so unchanged files
+    are never probed twice; use_cache=False bypasses the cache (temporary
+    outputs: processed files, split parts, chunks).
+    """
+    try:
+        st = os.stat(input_path)
+    except OSError:
+        return None
+
+    key = os.path.abspath(input_path)
+    if use_cache:
+        cached = get_probe_cache().get(key, st)
+        if cached is not None:
+            return cached
+
+    try:
+        cmd = [
+            "ffprobe", "-v", "quiet", "-print_format", "json",
+            "-show_format", "-show_streams", input_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            return None
+        probe = _build_probe(json.loads(result.stdout), input_path, st)
+    except Exception:
+        return None
+
+    if use_cache:
+        get_probe_cache().put(key, st, probe)
+    return probe
+
+def _drop_option(cmd, flag):
+    """Removes every `flag value` pair from an ffmpeg argv."""
+    result, skip = [], False
+    for arg in cmd:
+        if skip:
+            skip = False
+        elif arg == flag:
+            skip = True
+        else:
+            result.append(arg)
+    return result
+
+def keyframe_index(input_path, video_stream=0):
+    """
+    Reads every packet's size (ffprobe, no decoding) and returns
+    {'keyframes': [(pts_time, bytes_before), ...], 'total': bytes}, where
+    bytes_before counts all packets (video + audio) ahead of the keyframe.
+    Returns None if the file cannot be read.
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "packet=stream_index,pts_time,dts_time,size,flags",
+        "-of", "compact=p=0", input_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+    except Exception:
+        return None
+    if result.returncode != 0:
+        return None
+
+    keyframes, total = [], 0
+    for line in result.stdout.splitlines():
+        fields = dict(kv.split("=", 1) for kv in line.strip().split("|") if "=" in kv)
+        try:
+            size = int(fields.get("size", 0))
+        except ValueError:
+            continue
+        if fields.get("stream_index") == str(video_stream) and fields.get("flags", "").startswith("K"):
+            time_str = fields.get("pts_time", "N/A")
+            if time_str == "N/A":
+                time_str = fields.get("dts_time", "N/A")
+            try:
+                keyframes.append((float(time_str), total))
+            except ValueError:
+                pass
+        total += size
+    keyframes.sort()
+    return {"keyframes": keyframes, "total": total}
+
+def _video_stream_index(probe):
+    video = next((s for s in probe.get('streams', []) if s.get('codec_type') == 'video'), None)
+    return video.get('index', 0) if video else 0
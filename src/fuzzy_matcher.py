@@ -0,0 +1,123 @@
+"""
+Fuzzy matcher — trigram inverted index for approximate title lookups
+
+Keys are split into character trigrams (padded with "$" so short keys and
+word edges count) and every trigram keeps a posting list of the keys that
+contain it. A query only scores the keys that share at least one trigram
+with it, so matching thousands of lessons against thousands of files no
+longer compares every pair. Similarity is the Dice coefficient of the two
+trigram sets (1.0 = same trigrams).
+
+Digits in the keys must agree: "part1" and "part2" share most trigrams but
+are different lessons.
+"""
+import re
+from collections import Counter
+
+DEFAULT_MIN_SCORE = 0.6
+# For matches that rewrite data (manifest indices, course/section)
+STRICT_MIN_SCORE = 0.85
+
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def ngrams(text, n=3):
+    """Set of padded character n-grams of text ("" -> empty set)."""
+    if not text:
+        return set()
+    padded = f"${text}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def similarity(a, b, n=3):
+    """Dice coefficient of the n-gram sets of a and b."""
+    ga, gb = ngrams(a, n), ngrams(b, n)
+    if not ga or not gb:
+        return 0.0
+    return 2.0 * len(ga & gb) / (len(ga) + len(gb))
+
+
+class TrigramIndex:
+    """Maps normalized keys to values; exact get() plus scored search()."""
+
+    def __init__(self, items=(), n=3):
+        self.n = n
+        self._ids = {}          # key -> entry id
+        self._keys = []         # entry id -> key
+        self._values = []       # entry id -> value
+        self._sizes = []        # entry id -> number of n-grams
+        self._numbers = []      # entry id -> digit groups of the key
+        self._postings = {}     # n-gram -> [entry id, ...]
+        for key, value in items:
+            self.add(key, value)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    def add(self, key, value):
+        """Adds key -> value; adding an existing key replaces its value (like a dict)."""
+        if not key:
+            return
+        if key in self._ids:
+            self._values[self._ids[key]] = value
+            return
+        entry = len(self._keys)
+        grams = ngrams(key, self.n)
+        self._ids[key] = entry
+        self._keys.append(key)
+        self._values.append(value)
+        self._sizes.append(len(grams))
+        self._numbers.append(_DIGITS_RE.findall(key))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry)
+
+    def get(self, key, default=None):
+        entry = self._ids.get(key)
+        return default if entry is None else self._values[entry]
+
+    def search(self, query, limit=5, min_score=DEFAULT_MIN_SCORE):
+        """[(value, score, key), ...] best first; only keys scoring at least min_score."""
+        if not query:
+            return []
+        entry = self._ids.get(query)
+        if entry is not None and limit == 1:
+            return [(self._values[entry], 1.0, query)]
+
+        grams = ngrams(query, self.n)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self._postings.get(gram, ()))
+
+        numbers = _DIGITS_RE.findall(query)
+        size = len(grams)
+        results = []
+        for entry, shared in overlap.items():
+            score = 2.0 * shared / (size + self._sizes[entry])
+            if score < min_score or self._numbers[entry] != numbers:
+                continue
+            results.append((score, -entry))
+        # Ties go to the key added first
+        results.sort(reverse=True)
+        return [(self._values[-e], score, self._keys[-e]) for score, e in results[:limit]]
+
+    def best(self, query, min_score=DEFAULT_MIN_SCORE):
+        """Value of the exact key, else of the most similar key, else None."""
+        found = self.search(query, limit=1, min_score=min_score)
+        return found[0][0] if found else None
+
+    def unique(self, query, min_score=DEFAULT_MIN_SCORE):
+        """
+        Value of the exact key, else of the only key scoring at least
+        min_score; None when nothing or more than one key qualifies. For
+        callers that rewrite data from the match and cannot afford a wrong pick.
+        """
+        entry = self._ids.get(query)
+        if entry is not None:
+            return self._values[entry]
+        found = self.search(query, limit=2, min_score=min_score)
+        return found[0][0] if len(found) == 1 else None
@@ -0,0 +1,117 @@
+"""
+HTTP client — pooled sessions with the saved auth cookies, plus a response cache
+
+One session per cookie file is shared by the archiver and the scrapers, so
+pages, images and attachments reuse keep-alive connections. ResponseCache
+stores page bodies with their ETag/Last-Modified and revalidates them with a
+conditional GET, so an unchanged page costs a 304 instead of a full download.
+"""
+import os
+import json
+import hashlib
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+COOKIES_FILE = "auth_cookies.json"
+POOL_SIZE = 16
+
+
+def load_cookies(path=COOKIES_FILE):
+    """Cookie dicts as exported from the browser (name, value, domain, path, ...)."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception:
+        return []
+
+
+def create_session(cookies=None, pool_size=POOL_SIZE):
+    """New pooled session carrying `cookies` (scoped to their domain when known)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    for cookie in cookies or []:
+        if 'name' not in cookie or 'value' not in cookie:
+            continue
+        extra = {k: cookie[k] for k in ("domain", "path") if cookie.get(k)}
+        session.cookies.set(cookie['name'], cookie['value'], **extra)
+    return session
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(cookies_file=COOKIES_FILE):
+    """Shared session per cookie file."""
+    key = os.path.abspath(cookies_file)
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = create_session(load_cookies(cookies_file))
+        return _sessions[key]
+
+
+class ResponseCache:
+    """
+    On-disk page cache keyed by URL. Each entry is a body file plus a small JSON
+    header with the validators (ETag, Last-Modified) used for revalidation.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".body", base + ".json"
+
+    def _load(self, url):
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def _store(self, url, response):
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if not any(validators.values()):
+            return  # Nothing to revalidate with
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        for path, data, mode in ((body_path, response.content, "wb"),
+                                 (meta_path, json.dumps({"url": url, "encoding": response.encoding, **validators}).encode("utf-8"), "wb")):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def get(self, session, url, timeout=30):
+        """
+        Fetches `url`, revalidating a cached copy when there is one.
+        Returns (body_bytes, encoding, from_cache). Raises requests exceptions on failure.
+        """
+        meta, body = self._load(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = session.get(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and body is not None:
+            return body, meta.get("encoding"), True
+        response.raise_for_status()
+        self._store(url, response)
+        return response.content, response.encoding, False
@@ -1,271 +1,164 @@
 import os
 import shutil
 import threading
-import re
 from datetime import datetime
 
+from .manifest_parser import normalize_url
+from .manifest_store import get_store
+
 class ManifestManager:
     def __init__(self, storage_dir=".storage", manifest_filename="downloaded_video.txt"):
         self.storage_dir = storage_dir
         self.manifest_file = os.path.join(storage_dir, manifest_filename)
         self.lock = threading.Lock()
+        self._session_backup = None
         os.makedirs(self.storage_dir, exist_ok=True)
 
+    @property
+    def store(self):
+        """SQLite-backed manifest store (opened on first use)."""
+        return get_store(self.manifest_file)
+
     def backup(self):
-        """Creates a timestamped backup of the manifest file."""
+        """
+        Backs up the manifest file before a structural rewrite.
+        Only the first backup of a session is timestamped; later ones just refresh the '.bak' copy.
+        """
         if os.path.exists(self.manifest_file):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"downloaded_video_backup_{timestamp}.txt"
-            backup_path = os.path.join(self.storage_dir, backup_name)
-            shutil.copy2(self.manifest_file, backup_path)
+            if self._session_backup is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                backup_name = f"downloaded_video_backup_{timestamp}.txt"
+                self._session_backup = os.path.join(self.storage_dir, backup_name)
+                shutil.copy2(self.manifest_file, self._session_backup)
             
             # Also maintain a 'latest' backup
             latest_backup = os.path.join(self.storage_dir, "downloaded_video.txt.bak")
             shutil.copy2(self.manifest_file, latest_backup)
-            return backup_path
+            return self._session_backup
         return None
 
-    def mark_video_completed(self, index_str):
-        """Marks a video as completed in the manifest file by commenting it out (adding [DONE])."""
+    def mark_video_completed(self, index_str, url=None):
+        """Marks a video as completed ([DONE]) — indexed update, the text file is re-rendered lazily."""
+        try:
+            entry = self.store.get_by_url(url) if url else self.store.get(index_str)
+            if entry and not entry['is_done']:
+                self.store.mark_done(index_str, url=url)
+                print(f"   📝 Marked {index_str} as done in manifest.")
+        except Exception as e:
+            print(f"   ❌ Error marking video as done: {e}")
+
+    def flush(self):
+        """Writes pending status changes to the text manifest."""
+        self.store.flush()
+
+    @staticmethod
+    def _new_entry(v):
+        return {
+            'index': None, # To be assigned
+            'url': v['url'],
+            'is_done': False,
+            'title': v.get('title', 'Unknown'),
+            'course_title': v.get('course_title', 'Unknown Course'),
+            'section': v.get('section', 'General'),
+            'category': v.get('category', 'General'),
+            'subsection': v.get('subsection', None)
+        }
+
+    @staticmethod
+    def _refresh_entry(vid_data, fresh):
+        """Updates an existing entry with freshly scraped metadata (index and status are kept)."""
+        vid_data['title'] = fresh.get('title', vid_data['title'])
+        vid_data['course_title'] = fresh.get('course_title', vid_data['course_title'])
+        vid_data['section'] = fresh.get('section', vid_data['section'])
+        vid_data['category'] = fresh.get('category', vid_data['section'])
+        vid_data['subsection'] = fresh.get('subsection', None)
+
+    def checkpoint(self, videos):
+        """
+        Incremental save during a scan: upserts only `videos` (the lessons
+        found since the last checkpoint) instead of rewriting the whole
+        manifest. New entries are appended; the final save_manifest sorts them.
+        """
         with self.lock:
-            try:
-                self.backup()
-                lines = []
-                with open(self.manifest_file, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                
-                with open(self.manifest_file, "w", encoding="utf-8") as f:
-                    for line in lines:
-                        if line.strip().startswith(f"{index_str} |"):
-                            # Check if already done
-                            if "# [DONE]" not in line:
-                                f.write(f"# [DONE] {line}")
-                                print(f"   📝 Marked {index_str} as done in manifest.")
-                            else:
-                                f.write(line)
-                        else:
-                            f.write(line)
-            except Exception as e:
-                print(f"   ❌ Error marking video as done: {e}")
+            entries = {}
+            for v in videos:
+                if not v.get('url'): continue
+                n_url = normalize_url(v['url'])
+                if n_url in entries: continue
+                vid_data = self.store.get_by_url(v['url'])
+                if vid_data:
+                    self._refresh_entry(vid_data, v)
+                else:
+                    vid_data = self._new_entry(v)
+                entries[n_url] = vid_data
+            self.store.upsert(list(entries.values()))
+            return len(entries)
 
     def save_manifest(self, videos, limit=None):
         """
         Saves the list of discovered videos to the manifest.
         Handles merging with existing data to update metadata while preserving history.
         """
-        # Backup before any write operation
-        self.backup()
-        
-        # 1. Deduplicate & Prepare Fresh Map
-        fresh_videos_map = {}
-        for v in videos:
-            if not v.get('url'): continue # Skip if no URL
-            n_url = v['url'].strip().rstrip("/")
-            if n_url not in fresh_videos_map:
-                fresh_videos_map[n_url] = v
-        
-        # 2. Load EXISTING manifest
-        final_videos = []
-        processed_urls = set()
-        
-        current_course = "Unknown Course"
-        current_section = "General"
-        index_title_pattern = re.compile(r"^(\d+(?:_\d+)?)_(.*)$") # e.g. 039_1_Title
-
-        def _norm_url(u):
-            return u.strip().rstrip("/")
-        
-        max_index = 0
-        if os.path.exists(self.manifest_file):
-            try:
-                with open(self.manifest_file, "r", encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line: continue
-
-                        # Context Tracking
-                        if line.startswith("# === "):
-                            current_course = line.replace("# === ", "").replace(" ===", "").strip()
-                            current_section = "General"
-                            continue
-                        if line.startswith("## --- "):
-                            current_section = line.replace("## --- ", "").replace(" ---", "").strip()
-                            continue
-                        
-                        if line.startswith("# Index"): continue # Skip header
-
-                        # Preserve "Done" status
-                        is_done = "# [DONE]" in line
-                        clean_line = line.replace("# [DONE]", "").strip()
-                        if clean_line.startswith("#"): continue
-                            
-                        if "|" in clean_line:
-                            parts = [p.strip() for p in clean_line.split("|")]
-                            
-                            # --- Smart Parse: Find URL ---
-                            url_idx = -1
-                            for i, p in enumerate(parts):
-                                if p.startswith("http"):
-                                    url_idx = i
-                                    break
-                            
-                            if url_idx == -1: continue 
-                            
-                            url = parts[url_idx]
-                            
-                            # --- Extract Metadata ---
-                            course = current_course
-                            section = current_section
-                            if len(parts) > url_idx + 1: course = parts[url_idx+1]
-                            if len(parts) > url_idx + 2: section = parts[url_idx+2]
-                            
-                            # --- Extract Index & Title ---
-                            pre_url_parts = parts[:url_idx]
-                            idx_str = None
-                            title = "Unknown"
-                            
-                            if pre_url_parts:
-                                first = pre_url_parts[0]
-                                # Pure index check
-                                if re.match(r"^\d+(?:_\d+)?$", first) and len(pre_url_parts) > 1:
-                                    idx_str = first
-                                    title = " - ".join(pre_url_parts[1:])
-                                else:
-                                    match = index_title_pattern.match(first)
-                                    if match:
-                                        idx_str = match.group(1)
-                                        t_p = match.group(2)
-                                        if len(pre_url_parts) > 1:
-                                            title = t_p + " - " + " - ".join(pre_url_parts[1:])
-                                        else:
-                                            title = t_p
-                                    else:
-                                        # No index
-                                        idx_str = "999"
-                                        title = " - ".join(pre_url_parts)
-
-                            if url_idx != -1: # Just to keep indentation logic/vars valid
-                                pass
-                            
-                            if idx_str and idx_str.replace("_", "").isdigit():
-                                 try:
-                                     # Track max index for base numbers
-                                     base_idx = int(idx_str.split('_')[0])
-                                     max_index = max(max_index, base_idx)
-                                 except: pass
-                            
-                            norm_url = _norm_url(url)
-                            processed_urls.add(norm_url)
-                            
-                            # Default to existing
-                            vid_data = {
-                                'index': idx_str,
-                                'url': url,
-                                'is_done': is_done,
-                                'title': title,
-                                'course_title': course,
-                                'section': section,
-                                'category': section,
-                                'subsection': None
-                            }
-                            
-                            # UPGRADE with Fresh Metadata if available
-                            if norm_url in fresh_videos_map:
-                                fresh = fresh_videos_map[norm_url]
-                                vid_data['title'] = fresh.get('title', title)
-                                vid_data['course_title'] = fresh.get('course_title', course)
-                                vid_data['section'] = fresh.get('section', section)
-                                vid_data['category'] = fresh.get('category', section)
-                                vid_data['subsection'] = fresh.get('subsection', None)
-                            
-                            final_videos.append(vid_data)
-            except Exception as e:
-                print(f"⚠️ Could not read existing manifest: {e}")
-                
-        # 3. Add NEW videos
-        new_found = []
-        for v in videos:
-            if not v.get('url'): continue
-            n_url = v['url'].strip().rstrip("/")
-            if n_url not in processed_urls:
-                v_data = {
-                    'index': None, # To be assigned
-                    'url': v['url'],
-                    'is_done': False,
-                    'title': v.get('title', 'Unknown'),
-                    'course_title': v.get('course_title', 'Unknown Course'),
-                    'section': v.get('section', 'General'),
-                    'category': v.get('category', 'General'),
-                    'subsection': v.get('subsection', None)
-                }
-                new_found.append(v_data)
-                processed_urls.add(v['url'])
-        
-        final_videos.extend(new_found)
-        
-        # 4. SORT & Renumber Sequentially
-        # Sort key: Course -> Section -> Subsection (empty last) -> Index (Float-like)
-        def sort_key(v):
-            idx_val = 999999.0
-            if v.get('index'):
-                try: 
-                    # Handle 039_1 as 39.1 for sorting
-                    idx_val = float(v['index'].replace("_", "."))
-                except: pass
+        with self.lock:
+            # Backup before any structural write
+            self.backup()
             
-            return (
-                v.get('course_title', 'zzz'), 
-                v.get('section', 'zzz'), 
-                v.get('subsection') or '',
-                idx_val
-            )
+            # 1. Deduplicate & Prepare Fresh Map
+            fresh_videos_map = {}
+            for v in videos:
+                if not v.get('url'): continue # Skip if no URL
+                n_url = normalize_url(v['url'])
+                if n_url not in fresh_videos_map:
+                    fresh_videos_map[n_url] = v
             
-        final_videos.sort(key=sort_key)
-        
-        # Disable auto-renumbering to preserve 039_X format
-        # for idx, v in enumerate(final_videos, 1):
-        #     v['index'] = f"{idx:03d}"
-        
-        # 5. Write Manifest
-        with self.lock:
-            with open(self.manifest_file, "w", encoding="utf-8") as f:
-                f.write(f"# Index_Title | URL\n")
-                f.write(f"# To skip a video, delete the line or put a '#' at the start\n")
+            # 2. Load EXISTING manifest (store picks up manual edits of the text file)
+            final_videos = []
+            processed_urls = set()
+            
+            for vid_data in self.store.all():
+                norm_url = normalize_url(vid_data['url'])
+                processed_urls.add(norm_url)
                 
-                current_course = None
-                current_category = None
-                current_subsection_header = None
+                # UPGRADE with Fresh Metadata if available
+                if norm_url in fresh_videos_map:
+                    self._refresh_entry(vid_data, fresh_videos_map[norm_url])
                 
-                for v in final_videos:
-                    c_title = v['course_title']
-                    cat = v.get('category', v['section'])
-                    sub = v.get('subsection')
-                    sec_name = v['section']
-                    
-                    if c_title != current_course:
-                        current_course = c_title
-                        count = sum(1 for x in final_videos if x['course_title'] == c_title)
-                        f.write(f"\n# === {c_title} ({count} videos) ===\n")
-                        current_category = None
-                        current_subsection_header = None
-                    
-                    actual_cat = cat if cat else sec_name
-                    if actual_cat != current_category:
-                        f.write(f"\n## --- {actual_cat} ---\n")
-                        current_category = actual_cat
-                        current_subsection_header = None
+                final_videos.append(vid_data)
                     
-                    if sub and sub != actual_cat:
-                        if sub != current_subsection_header:
-                            f.write(f"### {sub}\n")
-                            current_subsection_header = sub
-                    
-                    status_pfx = "# [DONE] " if v.get('is_done') else ""
-                    clean_title = v['title'].replace("\n", " ").strip()
-                    
-                    # 2-column format: Index_Title | URL
-                    idx_display = v['index'] if v['index'] else "999"
-                    line = f"{idx_display}_{clean_title} | {v['url']}"
-                    f.write(f"{status_pfx}{line}\n")
+            # 3. Add NEW videos
+            new_found = []
+            for v in videos:
+                if not v.get('url'): continue
+                n_url = normalize_url(v['url'])
+                if n_url not in processed_urls:
+                    new_found.append(self._new_entry(v))
+                    processed_urls.add(n_url)
+            
+            final_videos.extend(new_found)
+            
+            # 4. SORT & Renumber Sequentially
+            # Sort key: Course -> Section -> Subsection (empty last) -> Index (Float-like)
+            def sort_key(v):
+                idx_val = 999999.0
+                if v.get('index'):
+                    try: 
+                        # Handle 039_1 as 39.1 for sorting
+                        idx_val = float(v['index'].replace("_", "."))
+                    except: pass
                 
-                print(f"   ✅ Manifest saved: {len(final_videos)} entries")
+                return (
+                    v.get('course_title') or 'zzz', 
+                    v.get('section') or 'zzz', 
+                    v.get('subsection') or '',
+                    idx_val
+                )
+                
+            final_videos.sort(key=sort_key)
+            
+            # Disable auto-renumbering to preserve 039_X format
+            # for idx, v in enumerate(final_videos, 1):
+            #     v['index'] = f"{idx:03d}"
+            
+            # 5. Write Manifest (single transaction, then rendered to text)
+            self.store.replace_all(final_videos)
+            print(f"   ✅ Manifest saved: {len(final_videos)} entries")
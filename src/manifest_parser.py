@@ -0,0 +1,253 @@
+"""
+Manifest parser — the single parser for downloaded_video.txt
+
+Produces typed ManifestEntry records plus lookup maps (by index, by 3-digit
+number, by URL). Parsed manifests are cached per file and reused until the
+file's mtime/size changes, so callers can look entries up per video for free.
+"""
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Upload status values and how they are displayed in the text manifest
+STATUS_LABELS = {
+    "UPLOADED": "✅ UPLOADED",
+    "PROCESSING": "⏳ PROCESSING",
+    "FAILED": "❌ FAILED",
+}
+
+_INDEX_TITLE_RE = re.compile(r"^(\d+(?:_\d+)?)_(.*)$")  # e.g. 039_1_Title
+_PURE_INDEX_RE = re.compile(r"^\d+(?:_\d+)?$")
+_NUMBER_RE = re.compile(r"^(\d{3})")
+_COURSE_COUNT_RE = re.compile(r"\s*\((?:[^()]* of )?(\d+) videos\)$")
+_MSG_ID_RE = re.compile(r"msg_id:\s*(\d+)")
+
+
+def normalize_url(url):
+    return (url or "").strip().rstrip("/")
+
+
+def format_status(status, msg_id=None):
+    """Display string for an upload status, e.g. '✅ UPLOADED (msg_id: 12)'."""
+    if not status:
+        return ""
+    label = STATUS_LABELS.get(status, status)
+    if status == "UPLOADED":
+        return f"{label} (msg_id: {msg_id})"
+    return label
+
+
+def _parse_status(text):
+    for status, label in STATUS_LABELS.items():
+        if label in text or text.startswith(status):
+            match = _MSG_ID_RE.search(text)
+            return status, int(match.group(1)) if match else None
+    return None, None
+
+
+@dataclass
+class ManifestEntry:
+    """One video line of the manifest."""
+    index: Optional[str]
+    title: str
+    url: str
+    course: str = "Unknown Course"
+    section: str = "General"
+    subsection: Optional[str] = None
+    is_done: bool = False
+    skipped: bool = False
+    status: Optional[str] = None
+    msg_id: Optional[int] = None
+    position: int = 0
+
+    @property
+    def number(self) -> Optional[str]:
+        """3-digit base number ('039' for '039_1'), used to match video files."""
+        match = _NUMBER_RE.match(self.index or "")
+        return match.group(1) if match else None
+
+    @property
+    def display_name(self) -> str:
+        """'Index_Title' as written in the manifest and used for file names."""
+        return f"{self.index}_{self.title}" if self.index else self.title
+
+    def to_dict(self) -> Dict:
+        """Dict in the shape used by ManifestManager / ManifestStore."""
+        return {
+            'index': self.index,
+            'title': self.title,
+            'url': self.url,
+            'course_title': self.course,
+            'section': self.section,
+            'category': self.section,
+            'subsection': self.subsection,
+            'is_done': self.is_done,
+            'skipped': self.skipped,
+            'status': self.status,
+            'msg_id': self.msg_id,
+        }
+
+
+@dataclass
+class Manifest:
+    """Parsed manifest: entries in file order plus lookup maps."""
+    entries: List[ManifestEntry] = field(default_factory=list)
+    by_index: Dict[str, ManifestEntry] = field(default_factory=dict)
+    by_number: Dict[str, ManifestEntry] = field(default_factory=dict)
+    by_url: Dict[str, ManifestEntry] = field(default_factory=dict)
+    course_counts: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for entry in self.entries:
+            self.course_counts[entry.course] = self.course_counts.get(entry.course, 0) + 1
+            self.by_url.setdefault(normalize_url(entry.url), entry)
+            if entry.skipped:
+                continue
+            if entry.index:
+                self.by_index.setdefault(entry.index, entry)
+            if entry.number:
+                self.by_number.setdefault(entry.number, entry)
+
+    def active(self) -> List[ManifestEntry]:
+        """Entries that were not commented out by hand."""
+        return [e for e in self.entries if not e.skipped]
+
+    def find(self, index) -> Optional[ManifestEntry]:
+        """Entry by exact index ('039_1'), falling back to the 3-digit number."""
+        return self.by_index.get(index) or self.by_number.get(str(index)[:3])
+
+    def get_by_url(self, url) -> Optional[ManifestEntry]:
+        return self.by_url.get(normalize_url(url))
+
+
+def parse_manifest_file(path) -> Manifest:
+    """
+    Parses the text manifest (no caching).
+    Understands 'Index_Title | URL' and 'Index | Title | URL [| Course | Section]' lines,
+    '# [DONE]' markers, status columns, '### subsection' headers and lines
+    commented out by hand (kept as skipped entries).
+    """
+    entries = []
+    if not os.path.exists(path):
+        return Manifest()
+
+    current_course = "Unknown Course"
+    current_section = "General"
+    current_subsection = None
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            if line.startswith("# === "):
+                current_course = _COURSE_COUNT_RE.sub("", line.replace("# === ", "").replace(" ===", "").strip())
+                current_section = "General"
+                current_subsection = None
+                continue
+            if line.startswith("## --- "):
+                current_section = line.replace("## --- ", "").replace(" ---", "").strip()
+                current_subsection = None
+                continue
+            if line.startswith("### "):
+                current_subsection = line[4:].strip()
+                continue
+            if line.startswith("# Index"):
+                continue
+
+            is_done = "# [DONE]" in line
+            clean_line = line.replace("# [DONE]", "").strip()
+            skipped = False
+            if clean_line.startswith("#"):
+                # Commented out by hand: keep it, but never download/upload it
+                clean_line = clean_line.lstrip("#").strip()
+                skipped = True
+
+            if "|" not in clean_line:
+                continue
+            parts = [p.strip() for p in clean_line.split("|")]
+
+            url_idx = next((i for i, p in enumerate(parts) if p.startswith("http")), -1)
+            if url_idx == -1:
+                continue
+
+            # Columns after the URL: optional status, course, section
+            course, section = current_course, current_section
+            status, msg_id = None, None
+            extra = []
+            for p in parts[url_idx + 1:]:
+                p_status, p_msg_id = _parse_status(p)
+                if p_status:
+                    status, msg_id = p_status, p_msg_id
+                else:
+                    extra.append(p)
+            if len(extra) > 0 and extra[0]:
+                course = extra[0]
+            if len(extra) > 1 and extra[1]:
+                section = extra[1]
+
+            # Columns before the URL: index and title
+            idx_str, title = None, "Unknown"
+            pre_url_parts = parts[:url_idx]
+            if pre_url_parts:
+                first = pre_url_parts[0]
+                if _PURE_INDEX_RE.match(first) and len(pre_url_parts) > 1:
+                    idx_str = first
+                    title = " - ".join(pre_url_parts[1:])
+                else:
+                    match = _INDEX_TITLE_RE.match(first)
+                    if match:
+                        idx_str = match.group(1)
+                        title = match.group(2)
+                        if len(pre_url_parts) > 1:
+                            title += " - " + " - ".join(pre_url_parts[1:])
+                    else:
+                        idx_str = "999"
+                        title = " - ".join(pre_url_parts)
+
+            entries.append(ManifestEntry(
+                index=idx_str,
+                title=title,
+                url=parts[url_idx],
+                course=course,
+                section=section,
+                subsection=current_subsection,
+                is_done=is_done,
+                skipped=skipped,
+                status=status,
+                msg_id=msg_id,
+                position=len(entries),
+            ))
+    return Manifest(entries=entries)
+
+
+# {abs_path: (signature, Manifest)}
+_manifest_cache = {}
+_manifest_cache_lock = threading.Lock()
+
+def load_manifest(path=None) -> Manifest:
+    """
+    Cached parse of the manifest (default: config manifest_file).
+    Re-parsed only when the file's mtime or size changes; treat the result as read-only.
+    """
+    if path is None:
+        from .config import get_path
+        path = get_path("manifest_file")
+    try:
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return Manifest()
+
+    key = os.path.abspath(path)
+    with _manifest_cache_lock:
+        cached = _manifest_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    manifest = parse_manifest_file(path)
+    with _manifest_cache_lock:
+        _manifest_cache[key] = (signature, manifest)
+    return manifest
@@ -0,0 +1,313 @@
+"""
+Manifest store — SQLite backend for downloaded_video.txt
+
+The database is the source of truth for entries and their status; the text
+manifest is rendered from it (debounced) so humans can still review and edit it.
+Edits made to the text file by hand are detected (mtime/size) and imported
+back before the next read or write.
+"""
+import os
+import time
+import atexit
+import sqlite3
+import threading
+
+from .manifest_parser import parse_manifest_file, normalize_url, format_status
+
+# Minimum seconds between two renders of the text manifest
+RENDER_INTERVAL = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url_key TEXT PRIMARY KEY,
+    pos INTEGER NOT NULL,
+    idx TEXT,
+    title TEXT,
+    url TEXT NOT NULL,
+    course TEXT,
+    section TEXT,
+    category TEXT,
+    subsection TEXT,
+    is_done INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    status TEXT,
+    msg_id INTEGER,
+    link TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_idx ON entries(idx);
+CREATE INDEX IF NOT EXISTS entries_pos ON entries(pos);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMNS = ("url_key", "pos", "idx", "title", "url", "course", "section", "category",
+            "subsection", "is_done", "skipped", "status", "msg_id", "link")
+
+
+class ManifestStore:
+    """Thread-safe SQLite manifest with indexed lookups by index and URL."""
+
+    def __init__(self, manifest_file, db_file=None, render_interval=RENDER_INTERVAL):
+        self.manifest_file = manifest_file
+        self.db_file = db_file or os.path.splitext(manifest_file)[0] + ".db"
+        self.render_interval = render_interval
+        self.lock = threading.RLock()
+        self._last_render = 0.0
+
+        os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(_SCHEMA)
+            self.conn.commit()
+        atexit.register(self.flush)
+
+    # ------------------------------------------------------------------ meta
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _text_signature(self):
+        try:
+            st = os.stat(self.manifest_file)
+            return f"{st.st_mtime_ns}:{st.st_size}"
+        except OSError:
+            return ""
+
+    # ------------------------------------------------------------------ sync
+    def sync(self):
+        """Imports the text manifest if it was edited outside the store (or on first use)."""
+        with self.lock:
+            signature = self._text_signature()
+            known_signature = self._get_meta("text_signature") or ""
+            if signature == known_signature:
+                return False
+            if signature:
+                # Changes still waiting for the debounced render are not in the
+                # text yet: they are carried over instead of being overwritten
+                pending = self._get_meta("dirty") == "1"
+                self._import_entries([e.to_dict() for e in parse_manifest_file(self.manifest_file).entries], pending)
+            else:
+                # Text manifest deleted by hand: start from an empty manifest
+                self.conn.execute("DELETE FROM entries")
+            self._set_meta("text_signature", signature)
+            self.conn.commit()
+            return True
+
+    def _import_entries(self, entries, pending=False):
+        """
+        Replaces entries with the parsed text, keeping upload status the text
+        does not carry. With pending (unrendered) changes, [DONE] marks and
+        statuses from the database are kept too, so a hand edit made before
+        the next render does not drop them.
+        """
+        known = {
+            row["url_key"]: row
+            for row in self.conn.execute("SELECT url_key, is_done, status, msg_id, link FROM entries")
+        }
+        self.conn.execute("DELETE FROM entries")
+        seen = set()
+        for pos, e in enumerate(entries):
+            key = normalize_url(e['url'])
+            if key in seen:
+                continue
+            seen.add(key)
+            old = known.get(key)
+            if old:
+                if old["status"] and (pending or not e.get('status')):
+                    e['status'], e['msg_id'] = old["status"], old["msg_id"]
+                e['link'] = old["link"]
+                if pending and old["is_done"]:
+                    e['is_done'] = True
+            self._insert(pos, e)
+
+    def _insert(self, pos, e):
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO entries ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+            (
+                normalize_url(e['url']), pos, e.get('index'), e.get('title') or "Unknown", e['url'],
+                e.get('course_title') or "Unknown Course", e.get('section') or "General",
+                e.get('category'), e.get('subsection'),
+                int(bool(e.get('is_done'))), int(bool(e.get('skipped'))),
+                e.get('status'), e.get('msg_id'), e.get('link'),
+            )
+        )
+
+    # ------------------------------------------------------------------ reads
+    @staticmethod
+    def _to_dict(row):
+        return {
+            'index': row["idx"],
+            'title': row["title"],
+            'url': row["url"],
+            'course_title': row["course"],
+            'section': row["section"],
+            'category': row["category"],
+            'subsection': row["subsection"],
+            'is_done': bool(row["is_done"]),
+            'skipped': bool(row["skipped"]),
+            'status': row["status"],
+            'msg_id': row["msg_id"],
+            'link': row["link"],
+        }
+
+    def all(self, include_skipped=True):
+        """All entries in manifest order."""
+        with self.lock:
+            self.sync()
+            query = "SELECT * FROM entries" + ("" if include_skipped else " WHERE skipped = 0") + " ORDER BY pos"
+            return [self._to_dict(row) for row in self.conn.execute(query)]
+
+    def get(self, index):
+        """Entry by manifest index ('001', '039_1'), or None."""
+        with self.lock:
+            self.sync()
+            row = self.conn.execute("SELECT * FROM entries WHERE idx = ? ORDER BY pos LIMIT 1", (index,)).fetchone()
+            return self._to_dict(row) if row else None
+
+    def get_by_url(self, url):
+        """Entry by URL (trailing slashes ignored), or None."""
+        with self.lock:
+            self.sync()
+            row = self.conn.execute("SELECT * FROM entries WHERE url_key = ?", (normalize_url(url),)).fetchone()
+            return self._to_dict(row) if row else None
+
+    # ------------------------------------------------------------------ writes
+    def replace_all(self, entries):
+        """Replaces the whole manifest (already sorted) in one transaction and renders it."""
+        with self.lock:
+            self.sync()
+            with self.conn:
+                self.conn.execute("DELETE FROM entries")
+                for pos, e in enumerate(entries):
+                    self._insert(pos, e)
+                self._set_meta("dirty", 1)
+            self.render(force=True)
+
+    def upsert(self, entries):
+        """
+        Inserts or replaces entries by URL without touching the rest of the
+        manifest: known entries keep their position, new ones are appended.
+        Cost is proportional to len(entries); the text is rendered debounced.
+        """
+        if not entries:
+            return
+        with self.lock:
+            self.sync()
+            with self.conn:
+                next_pos = self.conn.execute("SELECT COALESCE(MAX(pos), -1) + 1 FROM entries").fetchone()[0]
+                for e in entries:
+                    row = self.conn.execute("SELECT pos FROM entries WHERE url_key = ?", (normalize_url(e['url']),)).fetchone()
+                    if row:
+                        pos = row["pos"]
+                    else:
+                        pos, next_pos = next_pos, next_pos + 1
+                    self._insert(pos, e)
+                self._set_meta("dirty", 1)
+            self.render()
+
+    def _update(self, where, key, assignments, params):
+        with self.lock:
+            self.sync()
+            with self.conn:
+                cur = self.conn.execute(f"UPDATE entries SET {assignments} WHERE {where} = ?", (*params, key))
+                if cur.rowcount:
+                    self._set_meta("dirty", 1)
+            if cur.rowcount:
+                self.render()
+            return cur.rowcount > 0
+
+    def mark_done(self, index=None, url=None):
+        """
+        Marks a downloaded entry as [DONE], by URL when given (indexes are not
+        guaranteed unique, e.g. '999' for unnumbered entries). Returns False if unknown.
+        """
+        if url:
+            return self._update("url_key", normalize_url(url), "is_done = 1", ())
+        return self._update("idx", index, "is_done = 1", ())
+
+    def set_status(self, index, status, msg_id=None, link=None):
+        """Sets the upload status (UPLOADED / PROCESSING / FAILED / None)."""
+        return self._update("idx", index, "status = ?, msg_id = ?, link = ?", (status or None, msg_id, link))
+
+    # ------------------------------------------------------------------ render
+    def render(self, force=False):
+        """Writes the text manifest from the database (at most once per render_interval unless forced)."""
+        with self.lock:
+            if self._get_meta("dirty") != "1":
+                return False
+            if not force and time.monotonic() - self._last_render < self.render_interval:
+                return False
+
+            rows = [self._to_dict(row) for row in self.conn.execute("SELECT * FROM entries ORDER BY pos")]
+            counts = {}
+            for v in rows:
+                counts[v['course_title']] = counts.get(v['course_title'], 0) + 1
+
+            tmp_file = self.manifest_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write("# Index_Title | URL [| Status]\n")
+                f.write("# To skip a video, delete the line or put a '#' at the start\n")
+
+                current_course = None
+                current_category = None
+                current_subsection_header = None
+
+                for v in rows:
+                    c_title = v['course_title']
+                    sub = v.get('subsection')
+
+                    if c_title != current_course:
+                        current_course = c_title
+                        f.write(f"\n# === {c_title} ({counts[c_title]} videos) ===\n")
+                        current_category = None
+                        current_subsection_header = None
+
+                    actual_cat = v.get('category') or v['section']
+                    if actual_cat != current_category:
+                        f.write(f"\n## --- {actual_cat} ---\n")
+                        current_category = actual_cat
+                        current_subsection_header = None
+
+                    if sub and sub != actual_cat:
+                        if sub != current_subsection_header:
+                            f.write(f"### {sub}\n")
+                            current_subsection_header = sub
+
+                    status_pfx = "# [DONE] " if v['is_done'] else ("# " if v['skipped'] else "")
+                    clean_title = (v['title'] or "").replace("\n", " ").strip()
+                    idx_display = v['index'] if v['index'] else "999"
+                    status_col = f" | {format_status(v['status'], v['msg_id'])}" if v['status'] else ""
+                    f.write(f"{status_pfx}{idx_display}_{clean_title} | {v['url']}{status_col}\n")
+            os.replace(tmp_file, self.manifest_file)
+
+            with self.conn:
+                self._set_meta("dirty", 0)
+                self._set_meta("text_signature", self._text_signature())
+            self._last_render = time.monotonic()
+            return True
+
+    def flush(self):
+        """Renders any pending changes immediately."""
+        try:
+            self.render(force=True)
+        except sqlite3.ProgrammingError:
+            pass  # Connection already closed
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(manifest_file, db_file=None):
+    """Shared store per manifest file (one connection per process)."""
+    key = os.path.abspath(manifest_file)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ManifestStore(manifest_file, db_file)
+        return _stores[key]
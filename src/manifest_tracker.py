@@ -1,9 +1,12 @@
 """
 Manifest manager — track video processing and upload status in downloaded_video.txt
+(indexed status updates through the SQLite manifest store)
 """
 import os
 import re
-from pathlib import Path
+
+from .manifest_parser import format_status
+from .manifest_store import get_store
 
 
 STORAGE_DIR = ".storage"
@@ -11,6 +14,10 @@ MANIFEST_FILE = os.path.join(STORAGE_DIR, "downloaded_video.txt")
 UPLOAD_HISTORY_FILE = os.path.join(STORAGE_DIR, "upload_history.json")
 
 
+def _store():
+    return get_store(MANIFEST_FILE)
+
+
 def update_manifest_status(index, status, msg_id=None, link=None):
     """
     Update status of a video in manifest.
@@ -27,49 +34,7 @@ def update_manifest_status(index, status, msg_id=None, link=None):
         return False
     
     try:
-        lines = []
-        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        updated = False
-        for i, line in enumerate(lines):
-            # Look for line starting with this index
-            if re.match(rf'^{index}\s*\|', line):
-                # Parse line
-                parts = line.split('|')
-                if len(parts) >= 3:
-                    # Format: INDEX | TITLE | URL | [STATUS]
-                    idx = parts[0].strip()
-                    title = parts[1].strip()
-                    url = parts[2].strip()
-                    
-                    # Build status string
-                    if status == "UPLOADED":
-                        status_str = f"✅ UPLOADED (msg_id: {msg_id})"
-                    elif status == "PROCESSING":
-                        status_str = "⏳ PROCESSING"
-                    elif status == "FAILED":
-                        status_str = "❌ FAILED"
-                    else:
-                        status_str = ""
-                    
-                    # Rebuild line
-                    if status_str:
-                        new_line = f"{idx} | {title} | {url} | {status_str}\n"
-                    else:
-                        new_line = f"{idx} | {title} | {url}\n"
-                    
-                    lines[i] = new_line
-                    updated = True
-                    break
-        
-        if updated:
-            with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
-                f.writelines(lines)
-            return True
-        
-        return False
-    
+        return _store().set_status(index, status, msg_id=msg_id, link=link)
     except Exception as e:
         print(f"❌ Error updating manifest: {e}")
         return False
@@ -81,88 +46,49 @@ def get_video_status(index):
         return None
     
     try:
-        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                if re.match(rf'^{index}\s*\|', line):
-                    parts = line.split('|')
-                    if len(parts) >= 4:
-                        return parts[3].strip()
-                    return None
+        entry = _store().get(index)
+        if entry and entry['status']:
+            return format_status(entry['status'], entry['msg_id'])
         return None
     except:
         return None
 
 
-def get_pending_videos():
-    """Get all videos without upload status."""
+def _videos_with_status(status):
     if not os.path.exists(MANIFEST_FILE):
         return []
     
-    pending = []
     try:
-        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                # Skip comments and headers
-                if line.startswith('#'):
-                    continue
-                
-                # Check if it has a status
-                parts = line.split('|')
-                if len(parts) >= 3:
-                    idx = parts[0].strip()
-                    # If it's a valid index (3 digits) and no status column
-                    if idx.isdigit() and len(parts) == 3:
-                        title = parts[1].strip()
-                        url = parts[2].strip()
-                        pending.append({'index': idx, 'title': title, 'url': url})
+        return [
+            {'index': v['index'], 'title': v['title'], 'status': format_status(v['status'], v['msg_id'])}
+            for v in _store().all(include_skipped=False) if v['status'] == status
+        ]
     except:
-        pass
-    
-    return pending
+        return []
 
 
-def get_uploaded_videos():
-    """Get all uploaded videos."""
+def get_pending_videos():
+    """Get all videos without upload status."""
     if not os.path.exists(MANIFEST_FILE):
         return []
     
-    uploaded = []
     try:
-        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                if '✅ UPLOADED' in line:
-                    parts = line.split('|')
-                    if len(parts) >= 4:
-                        idx = parts[0].strip()
-                        title = parts[1].strip()
-                        status = parts[3].strip()
-                        uploaded.append({'index': idx, 'title': title, 'status': status})
+        return [
+            {'index': v['index'], 'title': v['title'], 'url': v['url']}
+            for v in _store().all(include_skipped=False) if not v['status']
+        ]
     except:
-        pass
-    
-    return uploaded
+        return []
+
+
+def get_uploaded_videos():
+    """Get all uploaded videos."""
+    return _videos_with_status("UPLOADED")
 
 
 def get_failed_videos():
     """Get all failed videos."""
-    if not os.path.exists(MANIFEST_FILE):
-        return []
-    
-    failed = []
-    try:
-        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                if '❌ FAILED' in line:
-                    parts = line.split('|')
-                    if len(parts) >= 4:
-                        idx = parts[0].strip()
-                        title = parts[1].strip()
-                        status = parts[3].strip()
-                        failed.append({'index': idx, 'title': title, 'status': status})
-    except:
-        pass
-    
-    return failed
+    return _videos_with_status("FAILED")
 
 
 def get_all_manifest_videos():
@@ -172,43 +98,18 @@ def get_all_manifest_videos():
     
     videos = []
     try:
-        current_course = "Unknown Course"
-        current_section = "General"
-        
-        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line: continue
-                
-                if line.startswith("# === "):
-                    current_course = line.replace("# === ", "").split(" ===")[0].split("(")[0].strip()
-                    current_section = "General"
-                elif line.startswith("## --- "):
-                    current_section = line.replace("## --- ", "").replace(" ---", "").strip()
-                elif "|" in line:
-                    clean_line = line.replace("# [DONE] ", "").strip()
-                    parts = [p.strip() for p in clean_line.split("|")]
-                    if len(parts) >= 2:
-                        # Extract index from parts[0] which might be "001" or "001_Title"
-                        idx_match = re.match(r'^(\d{3})', parts[0])
-                        if idx_match:
-                            index = idx_match.group(1)
-                            # Title logic
-                            if "_" in parts[0] and len(parts[0]) > 4:
-                                title = parts[0][4:].strip()
-                            else:
-                                title = parts[1] if len(parts) >= 2 else ""
-                            
-                            url = parts[1] if "_" in parts[0] else (parts[2] if len(parts) >= 3 else "")
-                            
-                            videos.append({
-                                'index': index,
-                                'title': title,
-                                'url': url,
-                                'course': current_course,
-                                'section': current_section,
-                                'is_done': "# [DONE]" in line or "UPLOADED" in line
-                            })
+        for v in _store().all(include_skipped=False):
+            # Extract index from entries like "001" or "039_1"
+            idx_match = re.match(r'^(\d{3})', v['index'] or "")
+            if idx_match:
+                videos.append({
+                    'index': idx_match.group(1),
+                    'title': v['title'],
+                    'url': v['url'],
+                    'course': v['course_title'],
+                    'section': v['section'],
+                    'is_done': v['is_done'] or v['status'] == "UPLOADED"
+                })
     except Exception as e:
         print(f"⚠️ Error reading manifest sequence: {e}")
         
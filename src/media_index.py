@@ -0,0 +1,225 @@
+"""
+Media index — persistent index of video files on all media drives
+
+Stores every video under the configured media roots in SQLite (path, size,
+mtime, normalized title, 3-digit index number) together with each directory's
+mtime and subdirectories. A refresh only re-lists directories whose mtime
+changed (a file was added, removed or renamed in them); unchanged directories
+cost a single stat. MediaLibrary, media_resolver and generate_viewer share it,
+so lookups are indexed queries instead of a recursive walk of every drive.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+# A refresh already done this recently is reused (lookups in a loop stay O(1))
+REFRESH_INTERVAL = 30.0
+# After a lookup miss the index is refreshed again, but not more often than this
+MISS_REFRESH_INTERVAL = 2.0
+
+_INDEX_NUMBER_RE = re.compile(r'^(\d{3})')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    mtime_ns INTEGER,
+    subdirs TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    root TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    norm_title TEXT,
+    number TEXT
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+CREATE INDEX IF NOT EXISTS files_name ON files(name);
+CREATE INDEX IF NOT EXISTS files_norm_title ON files(norm_title);
+CREATE INDEX IF NOT EXISTS files_number ON files(number);
+"""
+
+
+def normalize_title(filename):
+    """
+    Normalize filename for fuzzy matching.
+    Removes leading index numbers (001_), extension, and special chars.
+    """
+    # Remove extension
+    name = os.path.splitext(filename)[0]
+
+    # Remove leading numbers/hyphens/underscores pattern (e.g. "001_", "01 - ", "1.")
+    name = re.sub(r'^\d+[\s\-\_\.]+', '', name)
+
+    # Lowercase and remove non-alphanumeric
+    clean = re.sub(r'[^a-z0-9]', '', name.lower())
+    return clean
+
+
+def is_video_file(name):
+    return name.lower().endswith(VIDEO_EXTENSIONS) and not name.startswith("._")
+
+
+class MediaIndex:
+    """Thread-safe, incrementally refreshed video index (see module docstring)."""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.RLock()
+        self._conn = None
+        self._refreshed = {}    # root -> monotonic time of the last refresh
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def refresh(self, roots, max_age=REFRESH_INTERVAL):
+        """Brings the index up to date for `roots` (skipped for roots refreshed less than max_age seconds ago)."""
+        now = time.monotonic()
+        for root in {os.path.abspath(r) for r in roots}:
+            with self.lock:
+                if now - self._refreshed.get(root, float("-inf")) < max_age:
+                    continue
+                if os.path.isdir(root):
+                    self._refresh_root(root)
+                self._refreshed[root] = time.monotonic()
+        return self
+
+    def _refresh_root(self, root):
+        known = {
+            path: (mtime_ns, json.loads(subdirs or "[]"))
+            for path, mtime_ns, subdirs in self.conn.execute(
+                "SELECT path, mtime_ns, subdirs FROM dirs WHERE root = ?", (root,)
+            )
+        }
+        seen = set()
+        stack = [root]
+        with self.conn:
+            while stack:
+                directory = stack.pop()
+                try:
+                    mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(directory)
+
+                cached = known.get(directory)
+                if cached and cached[0] == mtime_ns:
+                    stack.extend(cached[1])
+                    continue
+
+                files, subdirs = self._scan_dir(directory, root)
+                self.conn.execute("DELETE FROM files WHERE dir = ?", (directory,))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO files (path, dir, root, name, size, mtime_ns, norm_title, number) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", files
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO dirs (path, root, mtime_ns, subdirs) VALUES (?, ?, ?, ?)",
+                    (directory, root, mtime_ns, json.dumps(subdirs))
+                )
+                stack.extend(subdirs)
+
+            # Directories that disappeared since the last refresh
+            for directory in set(known) - seen:
+                self.conn.execute("DELETE FROM files WHERE dir = ?", (directory,))
+                self.conn.execute("DELETE FROM dirs WHERE path = ?", (directory,))
+
+    @staticmethod
+    def _scan_dir(directory, root):
+        files, subdirs = [], []
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return files, subdirs
+        for entry in entries:
+            try:
+                # Like os.walk: symlinked directories are not followed
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif is_video_file(entry.name) and entry.is_file():
+                    st = entry.stat()
+                    match = _INDEX_NUMBER_RE.match(entry.name)
+                    files.append((
+                        entry.path, directory, root, entry.name, st.st_size, st.st_mtime_ns,
+                        normalize_title(entry.name), match.group(1) if match else None
+                    ))
+            except OSError:
+                continue
+        return files, subdirs
+
+    def _root_filter(self, roots):
+        # Roots that are not mounted right now keep their rows but are not served
+        roots = [os.path.abspath(r) for r in roots if os.path.isdir(r)]
+        return f"root IN ({','.join('?' * len(roots))})", roots
+
+    def videos(self, roots, extensions=VIDEO_EXTENSIONS, exclude_dirs=()):
+        """[(filename, full_path), ...] ordered by path."""
+        self.refresh(roots)
+        where, params = self._root_filter(roots)
+        if not params:
+            return []
+        with self.lock:
+            rows = self.conn.execute(f"SELECT name, path, root FROM files WHERE {where} ORDER BY path", params).fetchall()
+        result = []
+        for name, path, root in rows:
+            if not name.lower().endswith(tuple(extensions)):
+                continue
+            if exclude_dirs and set(os.path.relpath(os.path.dirname(path), root).split(os.sep)) & set(exclude_dirs):
+                continue
+            result.append((name, path))
+        return result
+
+    def _find(self, column, value, roots):
+        self.refresh(roots)
+        where, params = self._root_filter(roots)
+        if not params:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT path FROM files WHERE {column} = ? AND {where} ORDER BY path LIMIT 1", [value] + params
+            ).fetchone()
+        return row[0] if row else None
+
+    def find(self, column, value, roots):
+        """Path of the first video whose `column` equals value; a miss triggers a refresh (new files)."""
+        path = self._find(column, value, roots)
+        if path and os.path.exists(path):
+            return path
+        self.refresh(roots, max_age=MISS_REFRESH_INTERVAL)
+        path = self._find(column, value, roots)
+        return path if path and os.path.exists(path) else None
+
+    def find_by_name(self, filename, roots):
+        return self.find("name", filename, roots)
+
+    def find_by_title(self, title, roots):
+        return self.find("norm_title", normalize_title(title), roots)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_media_index(db_file=None):
+    """Shared index per database file (default: config media_index_file)."""
+    if db_file is None:
+        from .config import get_path
+        db_file = get_path("media_index_file")
+    key = os.path.abspath(db_file)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = MediaIndex(db_file)
+        return _indexes[key]
@@ -1,29 +1,17 @@
 import os
 import json
-import re
 from src import config
+from src.media_index import get_media_index, normalize_title
+from src.fuzzy_matcher import TrigramIndex
 
 STORAGE_DIR = config.get_path("base_dir")
 MEDIA_PATHS_FILE = config.get_path("media_paths_file")
-
-def normalize_title(filename):
-    """
-    Normalize filename for fuzzy matching.
-    Removes leading index numbers (001_), extension, and special chars.
-    """
-    # Remove extension
-    name = os.path.splitext(filename)[0]
-    
-    # Remove leading numbers/hyphens/underscores pattern (e.g. "001_", "01 - ", "1.")
-    name = re.sub(r'^\d+[\s\-\_\.]+', '', name)
-    
-    # Lowercase and remove non-alphanumeric
-    clean = re.sub(r'[^a-z0-9]', '', name.lower())
-    return clean
+# Minimum similarity for a library title reported as a possible duplicate
+SIMILAR_MIN_SCORE = 0.85
 
 class MediaLibrary:
     def __init__(self):
-        self.index = {} # normalized_title -> full_path
+        self.index = TrigramIndex() # normalized_title -> full_path
         self.paths = []
         self._load_paths()
         
@@ -44,7 +32,7 @@ class MediaLibrary:
             return
             
         print("🔍 Scanning external media paths for existing files...")
-        count = 0
+        roots = []
         for path in self.paths:
             # Resolve relative paths
             if not path.startswith("/"):
@@ -53,17 +41,27 @@ class MediaLibrary:
             if not os.path.exists(path):
                 print(f"   ⚠️ Path not found: {path}")
                 continue
-                
-            for root, _, files in os.walk(path):
-                for file in files:
-                    if file.lower().endswith(('.mp4', '.mov', '.mkv')):
-                        norm = normalize_title(file)
-                        if norm:
-                            self.index[norm] = os.path.join(root, file)
-                            count += 1
+            roots.append(path)
+        
+        # Persistent index: only directories changed since the last run are re-listed
+        count = 0
+        for file, full_path in get_media_index().videos(roots, extensions=('.mp4', '.mov', '.mkv')):
+            norm = normalize_title(file)
+            if norm:
+                self.index.add(norm, full_path)
+                count += 1
         print(f"✅ Indexed {count} existing videos from media library.")
 
     def find_file(self, title):
-        """Check if video title exists in index."""
+        """
+        Check if video title exists in index (normalized exact match only: a
+        hit skips the download, and near-identical titles can be distinct
+        lessons, e.g. "... Premiere Pro" vs "... Premiere Pro CC").
+        """
         norm = normalize_title(title)
         return self.index.get(norm)
+
+    def find_similar(self, title):
+        """Closest library file by fuzzy title match, for reporting only: (path, score) or None."""
+        hits = self.index.search(normalize_title(title), limit=1, min_score=SIMILAR_MIN_SCORE)
+        return (hits[0][0], hits[0][1]) if hits else None
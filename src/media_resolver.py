@@ -5,6 +5,8 @@ import os
 import json
 from pathlib import Path
 
+from .media_index import get_media_index
+
 
 STORAGE_DIR = ".storage"
 MEDIA_PATHS_FILE = os.path.join(STORAGE_DIR, "media_paths.json")
@@ -42,17 +44,7 @@ def find_video_file(filename):
     Search for a video file across all configured media paths (recursively).
     Returns full path if found, else None.
     """
-    paths = load_media_paths()
-    
-    for base_path in paths:
-        # Walk recursively
-        for root, dirs, files in os.walk(base_path):
-            if filename in files:
-                full_path = os.path.join(root, filename)
-                if os.path.exists(full_path):
-                    return full_path
-    
-    return None
+    return get_media_index().find_by_name(filename, load_media_paths())
 
 
 def list_all_videos():
@@ -61,24 +53,9 @@ def list_all_videos():
     Returns: [(filename, full_path), ...]
     """
     paths = load_media_paths()
-    videos = []
-    
     for base_path in paths:
         if not os.path.exists(base_path):
             print(f"⚠️ Media path not found: {base_path}")
-            continue
-        
-        # Walk recursively through all subdirectories
-        for root, dirs, files in os.walk(base_path):
-            # Exclude processed directories to avoid duplicates/loops
-            dirs[:] = [d for d in dirs if d not in ["telegram_processed", "processed"]]
-            
-            for f in files:
-                if f.startswith("._"):
-                    continue
-                if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
-                    full_path = os.path.join(root, f)
-                    if os.path.isfile(full_path):
-                        videos.append((f, full_path))
     
-    return videos
+    # Exclude processed directories to avoid duplicates/loops
+    return get_media_index().videos(paths, exclude_dirs=("telegram_processed", "processed"))
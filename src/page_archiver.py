@@ -3,12 +3,16 @@ Page archiver — save web pages locally with all assets (images, scripts, style
 """
 import os
 import json
-import requests
+import hashlib
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import mimetypes
 from pathlib import Path
 
+from .config import get_path
+from .http_client import get_session, ResponseCache
+from .asset_downloader import AssetDownloader, AssetJob, get_downloader
+
 
 STORAGE_DIR = ".storage"
 ARCHIVE_DIR = os.path.join(STORAGE_DIR, "page_archives")
@@ -25,7 +29,39 @@ def get_safe_filename(url):
     return clean
 
 
-def archive_page(page_url, page_title=None, output_dir=None):
+def unique_asset_name(name, url, used):
+    """
+    Keeps asset file names unique within a page: a name already taken by a
+    different URL gets a short URL hash suffix instead of overwriting it.
+    """
+    if used.get(name, url) != url:
+        stem, ext = os.path.splitext(name)
+        name = f"{stem}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}{ext}"
+    used[name] = url
+    return name
+
+
+def fetch_page(page_url, session=None, use_cache=True):
+    """
+    Downloads a page's HTML with the shared session.
+    With use_cache, a cached copy is revalidated (ETag/Last-Modified) instead of re-downloaded.
+    Returns the raw bytes: BeautifulSoup detects the charset from the
+    document itself (<meta charset>), which requests' header-based guess
+    (ISO-8859-1 for text/html without a charset) gets wrong.
+    """
+    session = session or get_session()
+    if not use_cache:
+        response = session.get(page_url, timeout=30)
+        response.raise_for_status()
+        return response.content
+
+    body, _, from_cache = ResponseCache(get_path("http_cache_dir")).get(session, page_url, timeout=30)
+    if from_cache:
+        print("  ♻️ Page unchanged since last fetch (cached)")
+    return body
+
+
+def archive_page(page_url, page_title=None, output_dir=None, html=None, session=None, use_cache=True):
     """
     Archive a complete web page with all assets.
     
@@ -34,6 +70,11 @@ def archive_page(page_url, page_title=None, output_dir=None):
         page_title: Optional friendly name for the page
         output_dir: Optional custom directory to save the archive to.
                    If None, creates a slug in default archive dir.
+        html: Optional HTML (str or bytes) already fetched for page_url (e.g.
+              by the scraper); the page is then not downloaded again.
+        session: Optional requests session for the page and its assets
+                 (default: shared session with the auth cookies).
+        use_cache: Revalidate the page against the response cache.
     
     Returns:
         dict with archive info: {success, path, assets_count, images, links}
@@ -50,29 +91,17 @@ def archive_page(page_url, page_title=None, output_dir=None):
             page_dir = os.path.join(ARCHIVE_DIR, safe_name)
             os.makedirs(page_dir, exist_ok=True)
         
-        # Download main page
-        print(f"📥 Downloading page: {page_url}")
+        session = session or get_session()
         
-        # Load cookies
-        cookies = {}
-        cookie_path = "auth_cookies.json"
-        if os.path.exists(cookie_path):
-            import json
-            try:
-                with open(cookie_path, 'r') as f:
-                    c_list = json.load(f)
-                    for c in c_list:
-                        if 'name' in c and 'value' in c:
-                            cookies[c['name']] = c['value']
-            except: pass
-
-        response = requests.get(page_url, timeout=30, cookies=cookies, headers={
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)'
-        })
-        response.raise_for_status()
+        # Download main page (unless the caller already has it)
+        if html is None:
+            print(f"📥 Downloading page: {page_url}")
+            html = fetch_page(page_url, session, use_cache)
+        else:
+            print(f"📥 Archiving fetched page: {page_url}")
         
         # Parse HTML
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(html, 'html.parser')
         
         # Track results
         results = {
@@ -84,43 +113,36 @@ def archive_page(page_url, page_title=None, output_dir=None):
             'assets_count': 0
         }
         
-        # Extract and download images
-        print("  🖼️ Downloading images...")
+        downloader = get_downloader() if session is get_session() else AssetDownloader(session=session)
+        
+        # Collect images
+        image_jobs = []
+        image_entries = []
+        used_names = {}
         for img in soup.find_all('img'):
             img_url = img.get('src') or img.get('data-src')
             if not img_url:
                 continue
             
             img_url = urljoin(page_url, img_url)
-            try:
-                img_response = requests.get(img_url, timeout=15)
-                img_response.raise_for_status()
-                
-                # Get filename
-                parsed_url = urlparse(img_url)
-                img_name = os.path.basename(parsed_url.path)
-                if not img_name or '.' not in img_name:
-                    img_name = f"image_{len(results['images'])}.jpg"
-                
-                # Save image
-                img_path = os.path.join(page_dir, 'images', img_name)
-                os.makedirs(os.path.dirname(img_path), exist_ok=True)
-                with open(img_path, 'wb') as f:
-                    f.write(img_response.content)
-                
-                results['images'].append({
-                    'original_url': img_url,
-                    'local_path': f"images/{img_name}",
-                    'alt_text': img.get('alt', '')
-                })
-                results['assets_count'] += 1
-                
-            except Exception as e:
-                print(f"    ⚠️ Failed to download {img_url}: {e}")
+            
+            # Get filename
+            parsed_url = urlparse(img_url)
+            img_name = os.path.basename(parsed_url.path)
+            if not img_name or '.' not in img_name:
+                img_name = f"image_{len(image_jobs)}.jpg"
+            img_name = unique_asset_name(img_name, img_url, used_names)
+            
+            image_jobs.append(AssetJob(img_url, os.path.join(page_dir, 'images', img_name), timeout=15))
+            image_entries.append({
+                'original_url': img_url,
+                'local_path': f"images/{img_name}",
+                'alt_text': img.get('alt', '')
+            })
         
-        # Extract links and download attachments (PDF, ZIP, etc.)
+        # Extract links and collect attachments (PDF, ZIP, etc.)
         doc_extensions = ['.pdf', '.zip', '.docx', '.doc', '.xlsx', '.xls', '.mp3', '.pptx', '.txt']
-        print("  📎 Downloading attachments...")
+        doc_jobs = []
         for link in soup.find_all('a'):
             href = link.get('href')
             text = link.get_text(strip=True)
@@ -137,32 +159,43 @@ def archive_page(page_url, page_title=None, output_dir=None):
             # Check if it's an attachment
             ext = os.path.splitext(urlparse(full_url).path)[1].lower()
             if ext in doc_extensions:
-                try:
-                    # Sanitize filename from URL or text
-                    doc_name = os.path.basename(urlparse(full_url).path)
-                    if not doc_name or len(doc_name) < 4:
-                        doc_name = "".join(x for x in text if x.isalnum() or x in "._- ")[:40] + ext
-                    
-                    doc_path = os.path.join(page_dir, 'attachments', doc_name)
-                    if os.path.exists(doc_path):
-                        continue
-                        
-                    os.makedirs(os.path.dirname(doc_path), exist_ok=True)
-                    print(f"    📩 Downloading attachment: {doc_name}")
-                    doc_response = requests.get(full_url, timeout=30, headers={
-                        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)'
-                    })
-                    doc_response.raise_for_status()
-                    with open(doc_path, 'wb') as f:
-                        f.write(doc_response.content)
-                    results['assets_count'] += 1
-                except Exception as e:
-                    print(f"    ⚠️ Failed to download attachment {full_url}: {e}")
+                # Sanitize filename from URL or text
+                doc_name = os.path.basename(urlparse(full_url).path)
+                if not doc_name or len(doc_name) < 4:
+                    doc_name = "".join(x for x in text if x.isalnum() or x in "._- ")[:40] + ext
+                doc_name = unique_asset_name(doc_name, full_url, used_names)
+                doc_jobs.append(AssetJob(full_url, os.path.join(page_dir, 'attachments', doc_name), skip_existing=True))
+        
+        # Download everything concurrently (pooled, per-host limited, stored once in the blob store)
+        print(f"  🖼️ Downloading {len(image_jobs)} images, 📎 {len(doc_jobs)} attachments...")
+        outcomes = downloader.download_all(image_jobs + doc_jobs)
+        
+        for entry, outcome in zip(image_entries, outcomes[:len(image_jobs)]):
+            if outcome.ok:
+                entry['sha256'] = outcome.sha256
+                results['images'].append(entry)
+                results['assets_count'] += 1
+            else:
+                print(f"    ⚠️ Failed to download {outcome.url}: {outcome.error}")
+        
+        for outcome in outcomes[len(image_jobs):]:
+            if outcome.status == "exists":
+                continue
+            if outcome.ok:
+                print(f"    📩 Attachment: {os.path.basename(outcome.dest)} ({outcome.status})")
+                results['assets_count'] += 1
+            else:
+                print(f"    ⚠️ Failed to download attachment {outcome.url}: {outcome.error}")
         
         # Save original HTML
         html_path = os.path.join(page_dir, 'index.html')
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(response.text)
+        if isinstance(html, bytes):
+            # Downloaded bytes are kept as-is, so the page's own charset declaration stays valid
+            with open(html_path, 'wb') as f:
+                f.write(html)
+        else:
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(html)
         results['assets_count'] += 1
         
         # Save metadata JSON
@@ -0,0 +1,97 @@
+"""
+Probe cache — persistent ffprobe results keyed by path + size + mtime
+
+One SQLite row per file, so caching a new probe is a single-row write
+instead of rewriting the whole cache (a first scan of a large library stays
+linear). Rows for files deleted from a directory that is still there are
+pruned when the cache is opened; a missing directory usually means an
+unplugged media drive, so its rows are kept for the next run with it.
+Temporary outputs (processed files, split parts, chunks) are probed with
+use_cache=False and never stored.
+"""
+import os
+import json
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    probe TEXT
+);
+"""
+
+
+class ProbeCache:
+    """Thread-safe ffprobe result cache (see module docstring)."""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.RLock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+            self.prune()
+        return self._conn
+
+    def get(self, path, st):
+        """Cached probe of path if its size and mtime still match `st`, else None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, probe FROM probes WHERE path = ?", (path,)
+            ).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return json.loads(row[2])
+        return None
+
+    def put(self, path, st, probe):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO probes (path, size, mtime_ns, probe) VALUES (?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, json.dumps(probe, ensure_ascii=False))
+            )
+
+    def prune(self):
+        """
+        Drops entries for files that were deleted: the file is missing but its
+        directory exists. Files under a missing directory (drive not mounted)
+        are kept. Returns the number removed.
+        """
+        with self.lock:
+            gone = [
+                (path,) for (path,) in self._conn.execute("SELECT path FROM probes")
+                if not os.path.exists(path) and os.path.isdir(os.path.dirname(path))
+            ]
+            if gone:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM probes WHERE path = ?", gone)
+            return len(gone)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_probe_cache(db_file=None):
+    """Shared cache per database file (default: config probe_cache_file)."""
+    if db_file is None:
+        from .config import get_path
+        db_file = get_path("probe_cache_file")
+    key = os.path.abspath(db_file)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ProbeCache(db_file)
+        return _caches[key]
@@ -0,0 +1,191 @@
+"""
+Rate limiter — shared token-bucket pacing for Telegram sends, driven by FloodWait feedback.
+
+Buckets are tracked per client ("bot" / "user") and per (client, chat, action).
+The per-chat pace starts from config.yaml (`upload.bot_delay` / `upload.user_delay`
+for uploads) and, when `adaptive_delay` is on, speeds up after every successful
+call and backs off whenever Telegram answers with a FloodWait.
+"""
+import asyncio
+import re
+import time
+from datetime import timedelta
+
+from src import config
+
+# Adaptive pacing never goes below this interval (seconds) for a single chat
+MIN_INTERVAL = 1.0
+# Interval multipliers: after a successful call / after a FloodWait
+SPEEDUP_FACTOR = 0.8
+BACKOFF_FACTOR = 2.0
+# Requests per second allowed for a whole client connection (all chats together)
+CLIENT_RATE_PER_SEC = 20
+# Starting per-chat interval for lightweight actions (text messages, edits)
+DEFAULT_ACTION_INTERVAL = {
+    "send": 1.0,
+    "edit": 1.0,
+}
+
+_FLOOD_TEXT_PATTERNS = [
+    re.compile(r'FLOOD_WAIT_(\d+)'),
+    re.compile(r'wait of (\d+) seconds', re.IGNORECASE),
+    re.compile(r'retry (?:in|after) (\d+(?:\.\d+)?)', re.IGNORECASE),
+]
+
+
+def get_flood_wait_seconds(error):
+    """
+    Extract the server-requested wait (seconds) from a flood error.
+    Supports Pyrogram's FloodWait (`.value`, older `.x`), python-telegram-bot's
+    RetryAfter (`.retry_after`, int or timedelta) and falls back to the message text.
+    Returns None if the error is not a flood/rate-limit error.
+    """
+    name = type(error).__name__
+    if "Flood" in name or "RetryAfter" in name or "Slowmode" in name:
+        for attr in ("value", "x", "retry_after"):
+            value = getattr(error, attr, None)
+            if isinstance(value, timedelta):
+                return value.total_seconds()
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return float(value)
+
+    text = str(error)
+    for pattern in _FLOOD_TEXT_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, one token refilled every `interval` seconds."""
+
+    def __init__(self, interval, capacity=1):
+        self.interval = interval
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = None
+
+    def _refill(self, now):
+        if self.interval > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+        else:
+            self.tokens = self.capacity
+        self.updated = now
+
+    def delay_needed(self):
+        """Seconds until a token can be taken (0 if available now)."""
+        now = time.monotonic()
+        self._refill(now)
+        blocked = self.blocked_until - now
+        if blocked > 0:
+            return blocked
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.interval
+
+    async def take(self):
+        """Wait until a token is available, then consume it."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                wait = self.delay_needed()
+                if wait <= 0:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """Per-client and per-chat pacing shared by every script that talks to Telegram."""
+
+    def __init__(self, upload_intervals=None, adaptive=True):
+        self.upload_intervals = upload_intervals or {}
+        self.adaptive = adaptive
+        self._buckets = {}
+
+    def _base_interval(self, client, action):
+        if action == "upload":
+            return float(self.upload_intervals.get(client, MIN_INTERVAL))
+        return DEFAULT_ACTION_INTERVAL.get(action, MIN_INTERVAL)
+
+    def _client_bucket(self, client):
+        key = (client,)
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(1.0 / CLIENT_RATE_PER_SEC, capacity=CLIENT_RATE_PER_SEC)
+        return self._buckets[key]
+
+    def _chat_bucket(self, client, chat, action):
+        key = (client, str(chat), action)
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(self._base_interval(client, action))
+        return self._buckets[key]
+
+    async def acquire(self, client, chat=None, action="send"):
+        """Wait for both the client-wide and the per-chat bucket."""
+        await self._client_bucket(client).take()
+        if chat is not None:
+            await self._chat_bucket(client, chat, action).take()
+
+    def report_success(self, client, chat=None, action="send"):
+        """Speed the per-chat pace up a little (adaptive mode only)."""
+        if not self.adaptive or chat is None:
+            return
+        bucket = self._chat_bucket(client, chat, action)
+        bucket.interval = max(MIN_INTERVAL, bucket.interval * SPEEDUP_FACTOR)
+
+    def report_flood_wait(self, client, chat, seconds, action="send"):
+        """
+        Honour a FloodWait: block the whole client for `seconds` (Telegram applies
+        flood limits per account) and slow this chat's pace down.
+        """
+        until = time.monotonic() + seconds
+        client_bucket = self._client_bucket(client)
+        client_bucket.blocked_until = max(client_bucket.blocked_until, until)
+        if chat is not None:
+            bucket = self._chat_bucket(client, chat, action)
+            bucket.blocked_until = max(bucket.blocked_until, until)
+            if self.adaptive:
+                bucket.interval = max(MIN_INTERVAL, bucket.interval * BACKOFF_FACTOR)
+
+    async def run(self, client, chat, call, action="send", max_retries=3):
+        """
+        Pace and execute `call` (a zero-argument coroutine factory, e.g. a lambda).
+        FloodWait errors are honoured and retried up to `max_retries` times
+        (the last one still blocks the buckets before it is re-raised);
+        any other error is re-raised unchanged.
+        """
+        for attempt in range(max_retries + 1):
+            await self.acquire(client, chat, action)
+            try:
+                result = await call()
+            except Exception as e:
+                wait = get_flood_wait_seconds(e)
+                if wait is None:
+                    raise
+                # Block the buckets even when giving up: the caller's next
+                # attempt goes through acquire() and must honour the wait too
+                self.report_flood_wait(client, chat, wait, action)
+                if attempt == max_retries:
+                    raise
+                print(f"   ⏳ FloodWait: Telegram asked to wait {wait:.0f}s (retry {attempt + 1}/{max_retries})")
+                continue
+            self.report_success(client, chat, action)
+            return result
+
+
+_limiter = None
+
+def get_limiter():
+    """Returns the process-wide limiter configured from config.yaml."""
+    global _limiter
+    if _limiter is None:
+        upload = config.get_upload_config()
+        _limiter = RateLimiter(
+            upload_intervals={"bot": upload["bot_delay"], "user": upload["user_delay"]},
+            adaptive=bool(upload["adaptive_delay"])
+        )
+    return _limiter
@@ -0,0 +1,123 @@
+"""
+Page readiness — explicit waits instead of fixed sleeps
+
+Each page type has a readiness condition (any of a set of CSS selectors
+present, after document.readyState is complete) and a timeout. wait_for_page()
+returns as soon as the condition holds, so a page costs only as long as it
+actually takes to render. Wait times are recorded per page type in
+`page_stats` for the end-of-scan summary.
+"""
+import time
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+POLL_INTERVAL = 0.1
+
+
+@dataclass(frozen=True)
+class PageCondition:
+    selectors: Tuple[str, ...]      # Ready when any of these is present
+    timeout: float
+    requires: Optional[str] = None  # Only wait if this marker is in the page source
+
+
+PAGE_CONDITIONS = {
+    # Any rendered document (cookie sync)
+    "document": PageCondition(("body",), 10),
+    # Library: product cards (an auth/captcha page never matches; the caller handles it)
+    "library": PageCondition(("a[href*='/products/']",), 15),
+    # Course categories index
+    "course": PageCondition(("a[href*='/categories/']", "a[href*='/posts/']", ".product-title", ".hero__title"), 15),
+    # Section listing: lesson links, sub-categories or pagination rendered
+    "section": PageCondition((
+        "a[href*='/posts/']", "a[href*='/categories/']",
+        ".pagination", ".pagination__next", "a[rel='next']",
+    ), 15),
+    # Lesson page: body or title element present
+    "lesson": PageCondition((
+        ".post-body", ".user-content", ".content-wrap", ".product-outline-post__text",
+        ".post-title", ".lesson_title",
+    ), 20),
+    # Lesson video: wistia iframe injected (only for pages that embed wistia at all)
+    "lesson_video": PageCondition(("iframe[src*='wistia']",), 10, requires="wistia"),
+    # SiteScraper video posts
+    "video_post": PageCondition(("h1.blog-title", "script[type='application/ld+json']", "iframe[src]"), 15),
+}
+
+
+class PageTimingStats:
+    """Thread-safe wait-time totals per page type."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def record(self, page_type, seconds, ready):
+        with self.lock:
+            s = self.stats.setdefault(page_type, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+            s["count"] += 1
+            s["total"] += seconds
+            s["max"] = max(s["max"], seconds)
+            if not ready:
+                s["timeouts"] += 1
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+
+    def summary(self):
+        """One line per page type: count, average/max wait and timeouts."""
+        with self.lock:
+            lines = []
+            for page_type, s in sorted(self.stats.items()):
+                avg = s["total"] / s["count"] if s["count"] else 0
+                line = f"   ⏱️  {page_type}: {s['count']} pages, avg {avg:.2f}s, max {s['max']:.2f}s"
+                if s["timeouts"]:
+                    line += f", {s['timeouts']} timeouts"
+                lines.append(line)
+            return "\n".join(lines)
+
+
+page_stats = PageTimingStats()
+
+
+def _document_complete(driver):
+    try:
+        return driver.execute_script("return document.readyState") == "complete"
+    except WebDriverException:
+        return False
+
+
+def wait_for_page(driver, page_type, timeout=None):
+    """
+    Blocks until the page-type condition holds or its timeout expires.
+    Returns True if the page became ready; on timeout the caller continues with
+    whatever has rendered (same as after the old fixed sleeps).
+    """
+    condition = PAGE_CONDITIONS[page_type]
+    start = time.monotonic()
+
+    if condition.requires:
+        try:
+            if condition.requires not in driver.page_source:
+                return True
+        except WebDriverException:
+            return False
+
+    element_present = EC.presence_of_element_located((By.CSS_SELECTOR, ", ".join(condition.selectors)))
+    ready = True
+    try:
+        WebDriverWait(driver, timeout or condition.timeout, poll_frequency=POLL_INTERVAL).until(
+            lambda d: _document_complete(d) and element_present(d)
+        )
+    except TimeoutException:
+        ready = False
+
+    page_stats.record(page_type, time.monotonic() - start, ready)
+    return ready
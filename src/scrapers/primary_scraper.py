@@ -1,6 +1,9 @@
 import json
 import time
 import re
+import queue
+import threading
+import requests
 from typing import List, Dict, Optional, Set
 from datetime import datetime
 from urllib.parse import urljoin
@@ -8,11 +11,10 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 from .base import BaseScraper
+from .page_ready import wait_for_page, page_stats
+from src.http_client import create_session
 import os
 from dotenv import load_dotenv
 from src import config
@@ -22,6 +24,15 @@ load_dotenv()
 STORAGE_DIR = config.get_path("base_dir")
 STRUCTURE_FILE = os.path.join(STORAGE_DIR, "course_structure.json")
 
+# A hydration worker whose browser crashes more often than this is retired
+MAX_WORKER_RESTARTS = 3
+
+# HTTP-first lesson fetching (browser only when the plain HTML lacks the content)
+HTTP_TIMEOUT = 30
+HTTP_POOL_SIZE = 16
+LESSON_BODY_SELECTOR = ".post-body, .user-content, .content-wrap, .product-outline-post__text"
+WISTIA_IFRAME_RE = re.compile(r'fast\.wistia\.(?:com|net)/embed/iframe/([a-zA-Z0-9]+)')
+
 class FatalScraperError(Exception):
     """Raised when a persistent network error occurs that should stop the scan."""
     pass
@@ -39,6 +50,11 @@ class PrimaryScraper(BaseScraper):
         self.last_successful_lesson = "None"
         self.global_index = 0
         self._driver = None
+        self._chromedriver_path = None
+        self._http = None
+        self._http_lock = threading.Lock()
+        self.http_first = config.get_scraper_config()["http_first"]
+        self.fetch_counts = {"http": 0, "browser": 0}
         self.structure = [] # List of Course Objects
         
         # Load existing structure if available to append/resume
@@ -122,7 +138,7 @@ class PrimaryScraper(BaseScraper):
                     except: 
                         print("   ⚠️  Cookie sync: Initial page load timed out (Continuing anyway...)")
                     
-                    time.sleep(1)
+                    wait_for_page(self._driver, "document")
                     
                     for cookie in self.cookies:
                         try: self._driver.add_cookie(cookie)
@@ -153,7 +169,7 @@ class PrimaryScraper(BaseScraper):
         try:
             # 1. Domain Visit & Library Gate
             driver.get(f"{self.base_url}/library")
-            time.sleep(3)
+            wait_for_page(driver, "library")
             
             # 2. Get All Courses
             courses = self._get_enrolled_courses()
@@ -169,6 +185,7 @@ class PrimaryScraper(BaseScraper):
             
             print("\n✅ Structural Discovery Complete.")
             print(f"📄 Saved structure to: {STRUCTURE_FILE}")
+            self._print_page_stats()
             
         finally:
             is_headless = os.getenv("HEADLESS_MODE", "false").lower() == "true"
@@ -189,7 +206,7 @@ class PrimaryScraper(BaseScraper):
         print(f"\n🔹 Exploring Course: {course_title} ({cat_index_url})")
         
         driver.get(cat_index_url)
-        time.sleep(3)
+        wait_for_page(driver, "course")
         
         # Title Extraction
         soup = BeautifulSoup(driver.page_source, "html.parser")
@@ -257,7 +274,7 @@ class PrimaryScraper(BaseScraper):
             visited_pages.add(current_page_url)
             
             driver.get(current_page_url)
-            time.sleep(2)
+            wait_for_page(driver, "section")
             soup = BeautifulSoup(driver.page_source, "html.parser")
             
             # Check for Sub-Categories (Recursion)
@@ -430,15 +447,8 @@ class PrimaryScraper(BaseScraper):
         print(f"🔍 Analyzing Single URL: {url}")
         driver = self._get_driver()
         
-        # 1. Navigate
-        try:
-            driver.get(url)
-            time.sleep(3) # Wait for JS load
-        except Exception as e:
-            raise FatalScraperError(f"Failed to load URL: {e}")
-        
-        # 2. Extract Basic Content (Title, Video URL, Description)
-        # We assume _extract_lesson_content works mainly on current page state
+        # 1-2. Navigate and extract Basic Content (Title, Video URL, Description)
+        # _extract_lesson_content loads the page and waits until it is ready
         data = self._extract_lesson_content(driver, url)
         
         # 3. Intelligent Hierarchy Extraction (Course > Section)
@@ -522,8 +532,11 @@ class PrimaryScraper(BaseScraper):
         return data
 
     # --- PHASE 2: CONTENT EXTRACTION ---
-    def scan_content(self, limit=None, offset=0, callback=None):
-        """PHASE 2: Hydrates the structure by visiting lesson URLs."""
+    def scan_content(self, limit=None, offset=0, callback=None, workers=None):
+        """
+        PHASE 2: Hydrates the structure by visiting lesson URLs.
+        With more than one worker, lessons are fetched by parallel headless browsers.
+        """
         print("🏗️  PHASE 2: Content Extraction")
         
         if not os.path.exists(STRUCTURE_FILE):
@@ -533,9 +546,6 @@ class PrimaryScraper(BaseScraper):
         with open(STRUCTURE_FILE, 'r', encoding='utf-8') as f:
             self.structure = json.load(f)
             
-        driver = self._get_driver()
-        collected_lessons = []
-        
         # Flatten structure to a workable list
         work_queue = []
         for course in self.structure:
@@ -555,6 +565,16 @@ class PrimaryScraper(BaseScraper):
             print(f"⏭️  Skipping first {offset} lessons.")
             work_queue = work_queue[offset:]
             
+        # Concurrency cap: config `scraper.hydration_workers`, never more than the queue
+        if workers is None:
+            workers = config.get_scraper_config()["hydration_workers"]
+        workers = max(1, min(int(workers), len(work_queue)))
+        if workers > 1:
+            collected_lessons = self._scan_content_parallel(work_queue, limit, callback, workers)
+            self._print_page_stats()
+            return collected_lessons
+            
+        collected_lessons = []
         count = 0
         for lesson_item in work_queue:
             if limit and count >= limit: break
@@ -562,16 +582,9 @@ class PrimaryScraper(BaseScraper):
             print(f"   🎥 Fetching: {lesson_item['title']}...")
             try:
                 # Hydrate
-                data = self._extract_lesson_content(driver, lesson_item['url'], default_title=lesson_item['title'])
+                data = self.fetch_lesson(lesson_item['url'], default_title=lesson_item['title'])
                 if data:
-                    # Merge Structure Data
-                    data.update({
-                        'course_title': lesson_item['course_title'],
-                        'category': lesson_item['category'],
-                        'section': lesson_item['section'],
-                        'subsection': lesson_item['subsection']
-                    })
-                    
+                    self._merge_structure_data(data, lesson_item)
                     collected_lessons.append(data)
                     count += 1
                     
@@ -581,8 +594,199 @@ class PrimaryScraper(BaseScraper):
             except Exception as e:
                 print(f"   ❌ Error extracting content: {e}")
                 
+        self._print_page_stats()
+        return collected_lessons
+
+    def _print_page_stats(self):
+        if any(self.fetch_counts.values()):
+            print(f"📊 Lessons fetched: {self.fetch_counts['http']} via HTTP, {self.fetch_counts['browser']} via browser")
+        summary = page_stats.summary()
+        if summary:
+            print("📊 Page load waits:")
+            print(summary)
+
+    @staticmethod
+    def _merge_structure_data(data, lesson_item):
+        """Adds the course/section context from the structure to hydrated lesson data."""
+        data.update({
+            'course_title': lesson_item['course_title'],
+            'category': lesson_item['category'],
+            'section': lesson_item['section'],
+            'subsection': lesson_item['subsection']
+        })
+        return data
+
+    def _scan_content_parallel(self, work_queue, limit, callback, workers):
+        """
+        Hydrates lessons with `workers` headless browsers pulling from a shared queue.
+        Results are handed to `callback` strictly in queue order. A crashed browser is
+        restarted and its lesson retried once (only real browser deaths count towards
+        MAX_WORKER_RESTARTS; other failures are per-lesson errors). A FatalScraperError
+        stops all workers.
+        """
+        print(f"🧵 Hydrating with {workers} parallel browsers...")
+        cookies = self._shared_cookies()
+        
+        jobs = queue.Queue()
+        for pos, lesson_item in enumerate(work_queue):
+            jobs.put((pos, lesson_item))
+        
+        results = {}            # pos -> hydrated data (None if the lesson failed)
+        cond = threading.Condition()
+        stop = threading.Event()
+        state = {"active": workers, "hydrated": 0, "failed": 0, "fatal": None}
+        
+        def worker(worker_id):
+            driver = None
+            restarts = 0
+            
+            def get_worker_driver():
+                nonlocal driver
+                if driver is None:
+                    driver = self._create_worker_driver(cookies)
+                return driver
+            
+            try:
+                while not stop.is_set():
+                    try:
+                        pos, lesson_item = jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    
+                    print(f"   🎥 [{worker_id}] Fetching: {lesson_item['title']}...")
+                    data = None
+                    for attempt in range(2):
+                        try:
+                            data = self.fetch_lesson(lesson_item['url'], default_title=lesson_item['title'], get_driver=get_worker_driver)
+                            break
+                        except Exception as e:
+                            # No browser yet (HTTP-first fetch or browser start failed) or a live
+                            # one: the lesson failed, not the browser, so no restart is counted
+                            if driver is None or self._driver_alive(driver):
+                                if isinstance(e, FatalScraperError):
+                                    with cond:
+                                        state["fatal"] = state["fatal"] or e
+                                    stop.set()
+                                else:
+                                    print(f"   ❌ [{worker_id}] Error extracting content: {e}")
+                                    with cond:
+                                        state["failed"] += 1
+                                break
+                            
+                            # Browser crashed: restart it and retry this lesson once
+                            restarts += 1
+                            print(f"   ⚠️  [{worker_id}] Browser crashed ({e}). Restarting ({restarts}/{MAX_WORKER_RESTARTS})...")
+                            self._quit_driver(driver)
+                            driver = None
+                            if restarts > MAX_WORKER_RESTARTS:
+                                break
+                    
+                    with cond:
+                        results[pos] = self._merge_structure_data(data, lesson_item) if data else None
+                        if data:
+                            state["hydrated"] += 1
+                            if limit and state["hydrated"] >= limit:
+                                stop.set()
+                        cond.notify_all()
+                    
+                    if restarts > MAX_WORKER_RESTARTS:
+                        print(f"   🛑 [{worker_id}] Too many browser crashes. Worker retired.")
+                        return
+            except Exception as e:
+                print(f"   ❌ [{worker_id}] Worker failed: {e}")
+            finally:
+                self._quit_driver(driver)
+                with cond:
+                    state["active"] -= 1
+                    cond.notify_all()
+        
+        threads = [threading.Thread(target=worker, args=(i + 1,), daemon=True) for i in range(workers)]
+        for t in threads:
+            t.start()
+        
+        # Ordered merge: emit results as soon as the next lesson in queue order is ready
+        collected_lessons = []
+        next_pos = 0
+        try:
+            while next_pos < len(work_queue):
+                with cond:
+                    while next_pos not in results and state["active"] > 0:
+                        cond.wait(1)
+                    if next_pos not in results:
+                        break  # Workers finished (limit reached, fatal error or all retired)
+                    data = results.pop(next_pos)
+                next_pos += 1
+                
+                if data is None:
+                    continue
+                if limit and len(collected_lessons) >= limit:
+                    break
+                collected_lessons.append(data)
+                if callback: callback(data)
+        finally:
+            stop.set()
+            for t in threads:
+                t.join()
+        
+        if state["fatal"]:
+            raise state["fatal"]
+        
+        if state["failed"]:
+            print(f"   ⚠️  {state['failed']} lessons failed to extract (see errors above).")
+        skipped = len(work_queue) - next_pos
+        if skipped and not (limit and len(collected_lessons) >= limit):
+            print(f"   ⚠️  {skipped} lessons were not hydrated (workers stopped).")
         return collected_lessons
 
+    def _shared_cookies(self):
+        """Session cookies for worker browsers: the live main browser session, else auth_cookies.json."""
+        try:
+            cookies = self._get_driver().get_cookies()
+            if cookies:
+                return cookies
+        except Exception as e:
+            print(f"   ⚠️  Could not read cookies from the main browser: {e}")
+        return self.cookies
+
+    def _create_worker_driver(self, cookies):
+        """Headless Chrome with a throwaway profile (the persistent one can only be opened once)."""
+        chrome_options = Options()
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+        
+        if self._chromedriver_path is None:
+            self._chromedriver_path = ChromeDriverManager().install()
+        driver = webdriver.Chrome(service=Service(self._chromedriver_path), options=chrome_options)
+        
+        if cookies:
+            driver.set_page_load_timeout(30)
+            try:
+                driver.get(self.base_url)
+            except:
+                pass
+            for cookie in cookies:
+                try: driver.add_cookie(cookie)
+                except: pass
+        driver.set_page_load_timeout(300)
+        return driver
+
+    @staticmethod
+    def _driver_alive(driver):
+        try:
+            _ = driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit_driver(driver):
+        if driver is not None:
+            try: driver.quit()
+            except: pass
+
     # --- EXISTING HELPER METHODS ---
     def _get_enrolled_courses(self) -> List[str]:
         library_url = f"{self.base_url}/library"
@@ -590,7 +794,7 @@ class PrimaryScraper(BaseScraper):
             driver = self._get_driver()
             try:
                 driver.get(library_url)
-                time.sleep(3)
+                wait_for_page(driver, "library")
                 curr_url = driver.current_url.lower()
                 page_source = driver.page_source.lower()
                 
@@ -628,6 +832,53 @@ class PrimaryScraper(BaseScraper):
         }
         return mapping.get(course_title, course_title)
 
+    def fetch_lesson(self, lesson_url, default_title=None, get_driver=None):
+        """
+        Hydrates one lesson. Tries a plain HTTP GET with the saved cookies first and
+        only renders the page in Chrome (driver from `get_driver`) when the fetched
+        HTML lacks the lesson content.
+        """
+        data = self._fetch_lesson_http(lesson_url, default_title)
+        if data:
+            self._count_fetch("http")
+            return data
+        self._count_fetch("browser")
+        driver = (get_driver or self._get_driver)()
+        return self._extract_lesson_content(driver, lesson_url, default_title=default_title)
+
+    def _count_fetch(self, method):
+        with self._http_lock:
+            self.fetch_counts[method] += 1
+
+    def _get_http_session(self):
+        """Pooled session carrying the saved auth cookies, shared by all workers."""
+        with self._http_lock:
+            if self._http is None:
+                self._http = create_session(self.cookies, HTTP_POOL_SIZE)
+            return self._http
+
+    def _fetch_lesson_http(self, lesson_url, default_title=None):
+        """Lesson data from a plain GET, or None when the browser is needed."""
+        if not self.http_first or not self.cookies:
+            return None
+        try:
+            response = self._get_http_session().get(lesson_url, timeout=HTTP_TIMEOUT)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200 or any(m in response.url for m in ("/login", "/sign_in")):
+            return None
+        
+        html = response.text
+        soup = BeautifulSoup(html, "html.parser")
+        if not soup.select_one(LESSON_BODY_SELECTOR):
+            return None
+        # Video embedded by JavaScript: only a rendered page has the iframe
+        if "wistia" in html and not WISTIA_IFRAME_RE.search(html):
+            return None
+        
+        page_title = soup.title.get_text(strip=True) if soup.title else ""
+        return self._parse_lesson_html(html, lesson_url, default_title, page_title, soup=soup)
+
     def _extract_lesson_content(self, driver, lesson_url, default_title=None):
         # Robust navigation with retries
         max_retries = 3
@@ -639,8 +890,14 @@ class PrimaryScraper(BaseScraper):
                 if i == max_retries - 1: raise FatalScraperError(f"Connection Failed: {e}")
                 time.sleep(2)
         
-        time.sleep(1.5)
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        wait_for_page(driver, "lesson")
+        wait_for_page(driver, "lesson_video")
+        return self._parse_lesson_html(driver.page_source, lesson_url, default_title, driver.title)
+
+    def _parse_lesson_html(self, html, lesson_url, default_title=None, page_title="", soup=None):
+        """Title, body text, links and wistia video from a lesson page's HTML."""
+        if soup is None:
+            soup = BeautifulSoup(html, "html.parser")
         
         # Title Logic
         final_title = default_title or "Unknown Title"
@@ -655,14 +912,14 @@ class PrimaryScraper(BaseScraper):
              if h1: final_title = h1.get_text(strip=True)
         # Priority 3: Meta Title Fallback
         elif not default_title:
-             final_title = driver.title.split("|")[0].strip()
+             final_title = page_title.split("|")[0].strip()
         
         # Extract Content Body (Simplified for this file re-write, but core logic preserved)
         body_content = ""
         extracted_links = []
         
         # Look for content containers
-        div = soup.select_one(".post-body, .user-content, .content-wrap, .product-outline-post__text")
+        div = soup.select_one(LESSON_BODY_SELECTOR)
         if div:
             # 1. Links
             for a in div.find_all("a", href=True):
@@ -672,10 +929,9 @@ class PrimaryScraper(BaseScraper):
             # 2. Text
             body_content = div.get_text(separator="\n", strip=True)
             
-        page_source = driver.page_source
         wistia_id = None
         # Pattern 1: Standard iframe embed
-        iframe_match = re.search(r'fast\.wistia\.(?:com|net)/embed/iframe/([a-zA-Z0-9]+)', page_source)
+        iframe_match = WISTIA_IFRAME_RE.search(html)
         if iframe_match: wistia_id = iframe_match.group(1)
         
         # Return Lesson Data
@@ -685,5 +941,5 @@ class PrimaryScraper(BaseScraper):
             "course_url": lesson_url,
             "description": body_content, 
             "links": extracted_links,
-            "html": driver.page_source
+            "html": html
         }
@@ -9,6 +9,7 @@ import time
 from datetime import datetime
 import threading
 from .base import BaseScraper
+from .page_ready import wait_for_page
 
 class SiteScraper(BaseScraper):
     """
@@ -111,7 +112,7 @@ class SiteScraper(BaseScraper):
 
         try:
             driver.get(subpage_url)
-            time.sleep(3)
+            wait_for_page(driver, "video_post")
             soup = BeautifulSoup(driver.page_source, "html.parser")
 
             title_tag = soup.find("h1", class_="blog-title")
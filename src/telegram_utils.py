@@ -3,6 +3,7 @@ import asyncio
 from telegram import Bot
 from telegram.error import TelegramError
 from pyrogram import Client, enums
+from .rate_limiter import get_limiter, get_flood_wait_seconds
 
 # Thresholds
 SIZE_THRESHOLD_MB = 45
@@ -25,29 +26,33 @@ async def upload_with_bot(video_path, caption, token, channel_id, thumb=None, ma
             print(f"   📤 Uploading with bot: {caption[:50]}... ({file_size/(1024*1024):.1f}MB)")
             
             # ✅ Get video dimensions for correct aspect ratio display
-            video_info = get_video_info(video_path)
+            video_info = get_video_info(video_path, use_cache=False)
             
-            with open(video_path, "rb") as video_file:
-                message = await bot.send_video(
-                    chat_id=channel_id,
-                    video=video_file,
-                    caption=caption[:1024],
-                    parse_mode='Markdown',
-                    thumbnail=open(thumb, 'rb') if thumb and os.path.exists(thumb) else None,
-                    width=video_info['width'] if video_info else None,      # ✅ FIX: Add width
-                    height=video_info['height'] if video_info else None,    # ✅ FIX: Add height
-                    duration=int(video_info['duration']) if video_info else None,  # ✅ Add duration too
-                    supports_streaming=True,
-                    read_timeout=180,
-                    write_timeout=180
-                )
+            async def _send():
+                # Re-open on every try: a FloodWait retry must not reuse a half-read handle
+                with open(video_path, "rb") as video_file:
+                    return await bot.send_video(
+                        chat_id=channel_id,
+                        video=video_file,
+                        caption=caption[:1024],
+                        parse_mode='Markdown',
+                        thumbnail=open(thumb, 'rb') if thumb and os.path.exists(thumb) else None,
+                        width=video_info['width'] if video_info else None,      # ✅ FIX: Add width
+                        height=video_info['height'] if video_info else None,    # ✅ FIX: Add height
+                        duration=int(video_info['duration']) if video_info else None,  # ✅ Add duration too
+                        supports_streaming=True,
+                        read_timeout=180,
+                        write_timeout=180
+                    )
+            
+            message = await get_limiter().run("bot", channel_id, _send, action="upload")
             
             print(f"   ✅ Bot upload successful - ID: {message.message_id}")
             return message
             
         except TelegramError as e:
             print(f"   ❌ Bot upload error (attempt {attempt + 1}): {str(e)}")
-            if attempt < max_retries - 1:
+            if attempt < max_retries - 1 and get_flood_wait_seconds(e) is None:
                 await asyncio.sleep(15 * (attempt + 1))
         except Exception as e:
             print(f"   ❌ Unexpected error: {str(e)}")
@@ -70,9 +75,9 @@ async def upload_with_user_account(app, video_path, caption, channel_username, t
         
         print(f"   📤 Uploading with user account: {caption} ({file_size_gb:.3f}GB)")
         
-        video_info = get_video_info(video_path)
+        video_info = get_video_info(video_path, use_cache=False)
         
-        message = await app.send_video(
+        message = await get_limiter().run("user", channel_username, lambda: app.send_video(
             chat_id=channel_username,
             video=video_path,
             caption=caption,
@@ -83,7 +88,7 @@ async def upload_with_user_account(app, video_path, caption, channel_username, t
             height=video_info['height'] if video_info else 0,
             supports_streaming=True,
             progress=lambda current, total: print(f"   📊 {(current/total)*100:.1f}%", end='\r') if int((current/total)*100) % 20 == 0 else None
-        )
+        ), action="upload")
         
         print(f"\n   ✅ User account upload successful - ID: {message.id}")
         return message
@@ -1,69 +1,67 @@
 import os
+import asyncio
 import subprocess
 import json
 import math
-import os
 import re
 import shutil
+import hashlib
+import tempfile
+import threading
 from PIL import Image, ImageDraw, ImageFont
 import textwrap
 
+from .config import get_path
+from .encoding_profiles import build_encode_command, dedupe_options, get_profile
+from .ffmpeg_tools import _drop_option, _video_stream_index, keyframe_index, probe_video, run_ffmpeg_async
+from .chunked_encode import encode_in_chunks
+
 # Threshold for splitting (45MB)
 SIZE_THRESHOLD_MB = 45
 BOT_MAX_SIZE_MB = 45
 USER_MAX_SIZE_MB = 1900  # 1.9GB
 
+# Stream-copy fast path: a source already in the target format is remuxed, not re-encoded
+COPY_VIDEO_CODECS = ('h264',)
+COPY_AUDIO_CODECS = ('aac',)
+COPY_PIX_FMTS = ('yuv420p', 'yuvj420p')
+COPY_MAX_FPS = 30.5
+# Highest total bitrate (bits/s) still worth uploading as-is, per target height
+COPY_MAX_BITRATE = {720: 5_000_000, 1080: 10_000_000}
+
+# Size-targeted encoding: share of the byte budget given to the streams (rest: container, rate-control slack)
+TARGET_SIZE_SAFETY = 0.95
+TARGET_AUDIO_BITRATE = 128_000
+# Below this video bitrate (bits/s) a size target is not worth the quality loss
+MIN_VIDEO_BITRATE = {720: 400_000, 1080: 800_000}
+
 # Cache for hardware encoder detection
 _hw_encoder_cache = None
 
 def detect_hw_encoder():
     """
-    Auto-detect available hardware encoder.
-    Returns the best available encoder with automatic fallback.
-    
-    Priority:
-    1. hevc_videotoolbox (Apple Silicon / Intel Mac - HEVC - very efficient)
-    2. h264_videotoolbox (Apple Silicon / Intel Mac - fast)
-    3. h264_nvenc (NVIDIA GPU)
-    4. libx265 (CPU - HEVC)
-    5. libx264 (CPU fallback)
+    Fastest encoder that actually works with this ffmpeg build.
+    Candidates (hevc/h264 VideoToolbox, NVENC, libx265, libx264) are
+    test-encoded once per ffmpeg version and the results persisted (see
+    src/encoder_probe.py); an encoder that is listed but fails, e.g. NVENC
+    without a GPU, is never chosen. Falls back to libx264.
+    The first probe can take minutes: call it from async code via
+    asyncio.to_thread so uploads keep running meanwhile.
     """
     global _hw_encoder_cache
     
     if _hw_encoder_cache is not None:
         return _hw_encoder_cache
-    try:
-        result = subprocess.run(
-            ['ffmpeg', '-encoders'],
-            capture_output=True, text=True, timeout=10
-        )
-        # Show FFmpeg banner/version info to terminal as requested
-        if result.stderr:
-            print(result.stderr.split("  libavutil")[0]) # Show the main banner part
-            
-        encoders = result.stdout
-        
-        # Check in priority order
-        if 'hevc_videotoolbox' in encoders:
-            _hw_encoder_cache = 'hevc_videotoolbox'
-            print("⚡ Hardware acceleration: Apple HEVC/VideoToolbox (GPU high efficiency)")
-        elif 'h264_videotoolbox' in encoders:
-            _hw_encoder_cache = 'h264_videotoolbox'
-            print("⚡ Hardware acceleration: Apple H.264/VideoToolbox (GPU encoding)")
-        elif 'h264_nvenc' in encoders:
-            _hw_encoder_cache = 'h264_nvenc'
-            print("⚡ Hardware acceleration: NVIDIA NVENC (GPU encoding)")
-        elif 'libx265' in encoders:
-            _hw_encoder_cache = 'libx265'
-            print("ℹ️ Using HEVC CPU encoding (libx265) - slow but efficient")
-        else:
-            _hw_encoder_cache = 'libx264'
-            print("ℹ️ Using CPU encoding (libx264)")
-            
-    except Exception:
-        _hw_encoder_cache = 'libx264'
-        print("ℹ️ Using CPU encoding (libx264)")
     
+    from .encoder_probe import probe_encoders, fastest_encoder
+    try:
+        results = probe_encoders()
+    except Exception as e:
+        print(f"⚠️ Encoder probe failed: {e}")
+        results = {}
+    _hw_encoder_cache = fastest_encoder(results)
+    fps = results.get(_hw_encoder_cache, {}).get("fps")
+    print(f"⚡ Video encoder: {_hw_encoder_cache}" + (f" ({fps:.0f} fps on the 720p test clip)" if fps else ""))
     return _hw_encoder_cache
 
 def reset_hw_encoder_cache():
@@ -80,55 +78,26 @@ def check_disk_space(required_mb, path='.'):
     except:
         return True  # Assume OK if can't check
 
-def get_video_info(input_path):
+def get_video_info(input_path, use_cache=True):
     """Get full video information."""
-    try:
-        cmd = [
-            "ffprobe", "-v", "quiet", "-print_format", "json", 
-            "-show_format", "-show_streams", input_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            
-            # Find video stream
-            video_stream = None
-            for stream in data.get('streams', []):
-                if stream.get('codec_type') == 'video':
-                    video_stream = stream
-                    break
-            
-            duration = float(data.get('format', {}).get('duration', 0))
-            bitrate = int(data.get('format', {}).get('bit_rate', 0))
-            tags = data.get('format', {}).get('tags', {})
-            meta_title = tags.get('title', '') or tags.get('TITLE', '')
-            
-            return {
-                'duration': duration,
-                'bitrate': bitrate,
-                'width': video_stream.get('width', 0) if video_stream else 0,
-                'height': video_stream.get('height', 0) if video_stream else 0,
-                'codec': video_stream.get('codec_name', '') if video_stream else '',
-                'fps': eval(video_stream.get('r_frame_rate', '0/1')) if video_stream else 0,
-                'title': meta_title
-            }
-        
-        return None
-    except Exception as e:
-        # print(f"Error getting video info: {str(e)}") # Suppress noise
+    probe = probe_video(input_path, use_cache)
+    if not probe:
         return None
+    return {
+        'duration': probe['duration'],
+        'bitrate': probe['bitrate'],
+        'width': probe['width'],
+        'height': probe['height'],
+        'codec': probe['codec'],
+        'fps': probe['fps'],
+        'title': probe['title']
+    }
 
-def is_video_valid(video_path):
+def is_video_valid(video_path, use_cache=True):
     """Check if video file is valid and can be opened by ffmpeg/ffprobe."""
     if not os.path.exists(video_path) or os.path.getsize(video_path) < 1000:
         return False
-    try:
-        cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", video_path]
-        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True, timeout=15)
-        return result.returncode == 0
-    except:
-        return False
+    return probe_video(video_path, use_cache) is not None
 
 def get_smart_title(input_path):
     """
@@ -164,6 +133,149 @@ def get_smart_title(input_path):
     
     return clean_name.strip()
 
+def target_dimensions(target_res):
+    """Fixed output frame for a target resolution: 1920x1080 or 1280x720."""
+    return (1920, 1080) if target_res == 1080 else (1280, 720)
+
+def stream_copy_blockers(probe, target_res=720, max_size_mb=USER_MAX_SIZE_MB):
+    """
+    Reasons the source has to be re-encoded; an empty list means it already
+    matches the encode targets (codec, frame size, fps, bitrate, size limit)
+    and a remux (-c copy) gives the same result. An intro does not block:
+    it is rendered in the source's stream format and joined with -c copy.
+    """
+    if not probe:
+        return ["source could not be probed"]
+    target_w, target_h = target_dimensions(target_res)
+    blockers = []
+    if probe['codec'] not in COPY_VIDEO_CODECS:
+        blockers.append(f"video codec {probe['codec'] or 'unknown'}")
+    if probe['pix_fmt'] and probe['pix_fmt'] not in COPY_PIX_FMTS:
+        blockers.append(f"pixel format {probe['pix_fmt']}")
+    if (probe['display_width'], probe['display_height']) != (target_w, target_h) or probe['rotation']:
+        blockers.append(f"frame {probe['display_width']}x{probe['display_height']} (target {target_w}x{target_h})")
+    if probe['sar'] not in ('1:1', '0:1'):
+        blockers.append(f"sample aspect ratio {probe['sar']}")
+    if not 0 < probe['fps'] <= COPY_MAX_FPS:
+        blockers.append(f"{probe['fps']:.2f} fps")
+    if probe['has_audio'] and probe['audio_codec'] not in COPY_AUDIO_CODECS:
+        blockers.append(f"audio codec {probe['audio_codec'] or 'unknown'}")
+    max_bitrate = COPY_MAX_BITRATE.get(target_h, COPY_MAX_BITRATE[720])
+    if probe['bitrate'] > max_bitrate:
+        blockers.append(f"bitrate {probe['bitrate'] / 1_000_000:.1f} Mbps")
+    if probe['size'] / (1024 * 1024) > max_size_mb:
+        blockers.append(f"size over {max_size_mb}MB")
+    return blockers
+
+async def stream_copy_video(input_path, output_path, timeout=600):
+    """
+    Remuxes the first video/audio stream into an MP4 with the moov atom up
+    front (+faststart) - no re-encode. Returns True on success.
+    """
+    probe = probe_video(input_path)
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", input_path,
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-c", "copy",
+        "-movflags", "+faststart",
+        output_path
+    ]
+    returncode, stderr_tail = await run_ffmpeg_async(
+        cmd, timeout=timeout, duration=probe['duration'] if probe else None, label="Remuxing"
+    )
+    if returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
+        return True
+    print(f"   ⚠️ Stream copy failed: {stderr_tail[-1][-200:] if stderr_tail else 'unknown'}")
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    return False
+
+async def _try_stream_copy(input_path, output_path, target_res, max_size_mb, add_intro, title=""):
+    """
+    Fast path shared by the process_* functions: remux when nothing needs
+    encoding; with add_intro, a cached intro rendered in the source's stream
+    format is joined in front (concat demuxer, -c copy).
+    """
+    probe = probe_video(input_path)
+    blockers = stream_copy_blockers(probe, target_res, max_size_mb)
+    if blockers:
+        print(f"   🔄 Re-encode needed: {', '.join(blockers)}")
+        return False
+    if add_intro:
+        # Fresh probe: the join needs codec parameters older cache entries lack
+        probe = probe_video(input_path, use_cache=False) or probe
+        intro_path = await asyncio.to_thread(intro_matching, title, probe)
+        if not intro_path:
+            return False
+        print("   ⚡ Source already meets targets - joining cached intro (no re-encode)")
+        if not await concat_copy([intro_path, input_path], output_path, probe['duration'] + INTRO_SECONDS):
+            return False
+    else:
+        print("   ⚡ Source already meets targets - stream copy (no re-encode)")
+        if not await stream_copy_video(input_path, output_path):
+            return False
+    new_size = os.path.getsize(output_path) / (1024 * 1024)
+    if new_size > max_size_mb:
+        print(f"   ⚠️ Stream copy is {new_size:.2f}MB (limit {max_size_mb}MB) - re-encoding")
+        os.remove(output_path)
+        return False
+    print(f"   ✅ Success - Size: {new_size:.2f}MB (stream copy)")
+    return True
+
+def target_video_bitrate(duration, max_size_mb, audio_bitrate=TARGET_AUDIO_BITRATE):
+    """Video bitrate (bits/s) that lands `duration` seconds under max_size_mb; 0 if unknown."""
+    if not duration or duration <= 0:
+        return 0
+    total = max_size_mb * 1024 * 1024 * 8 * TARGET_SIZE_SAFETY / duration
+    return max(0, int(total - audio_bitrate))
+
+def fits_size_target(duration, max_size_mb, target_res=720):
+    """True when a size-targeted encode to max_size_mb keeps an acceptable bitrate."""
+    _, target_h = target_dimensions(target_res)
+    return target_video_bitrate(duration, max_size_mb) >= MIN_VIDEO_BITRATE.get(target_h, MIN_VIDEO_BITRATE[720])
+
+def apply_size_target(cmd, encoder, video_bitrate, two_pass=False):
+    """
+    Adds a bitrate budget to an encode command (output path last).
+    Single pass keeps the encoder's quality mode and caps it with
+    -maxrate/-bufsize, so files already smaller stay small; two-pass
+    (libx264 only) encodes at exactly the average bitrate.
+    """
+    output_path = cmd[-1]
+    cmd = cmd[:-1]
+    rate = str(video_bitrate)
+    if two_pass and encoder == "libx264":
+        cmd = _drop_option(cmd, "-crf") + ["-b:v", rate, "-maxrate", str(int(video_bitrate * 1.5)), "-bufsize", str(video_bitrate * 2)]
+    elif encoder in ("libx264", "libx265"):
+        cmd += ["-maxrate", rate, "-bufsize", str(video_bitrate * 2)]
+    else:
+        # Hardware encoders: constant quality (-q:v) would ignore the budget
+        cmd = _drop_option(cmd, "-q:v") + ["-b:v", rate, "-maxrate", rate, "-bufsize", str(video_bitrate * 2)]
+    return dedupe_options(cmd + ["-b:a", str(TARGET_AUDIO_BITRATE), output_path])
+
+async def run_encode(cmd, encoder, two_pass=False, timeout=None, duration=None):
+    """
+    Runs an encode command; a two-pass libx264 command (see apply_size_target)
+    gets an analysis pass first. Returns (returncode, stderr_tail).
+    """
+    if not (two_pass and encoder == "libx264"):
+        return await run_ffmpeg_async(cmd, timeout=timeout, duration=duration)
+
+    output_path = cmd[-1]
+    passlog = output_path + ".passlog"
+    try:
+        first = cmd[:-1] + ["-pass", "1", "-passlogfile", passlog, "-an", "-f", "mp4", os.devnull]
+        returncode, stderr_tail = await run_ffmpeg_async(first, timeout=timeout, duration=duration, label="Pass 1/2")
+        if returncode != 0:
+            return returncode, stderr_tail
+        second = cmd[:-1] + ["-pass", "2", "-passlogfile", passlog, output_path]
+        return await run_ffmpeg_async(second, timeout=timeout, duration=duration, label="Pass 2/2")
+    finally:
+        for suffix in ("-0.log", "-0.log.mbtree", "-0.log.temp", "-0.log.mbtree.temp"):
+            if os.path.exists(passlog + suffix):
+                os.remove(passlog + suffix)
+
 def calculate_optimal_segments(file_size_mb, target_size_mb=40):
     """Calculate optimal number of segments for bot."""
     if file_size_mb <= target_size_mb:
@@ -173,80 +285,220 @@ def calculate_optimal_segments(file_size_mb, target_size_mb=40):
     segments = math.ceil(file_size_mb / (target_size_mb * 0.9))
     return segments
 
-def create_intro_video(title, output_intro_path, font_path="src/fonts/Vazir-Bold.ttf"):
-    """Create a 3-second intro video from title."""
+DEFAULT_INTRO_FONT = "src/fonts/Vazir-Bold.ttf"
+INTRO_SECONDS = 2
+# Bump when the intro look changes, so cached clips are rendered again
+INTRO_CACHE_VERSION = 1
+
+def render_intro_image(title, width=1920, height=1080, font_path=DEFAULT_INTRO_FONT):
+    """Title card: white centered text on black, font scaled to the frame height."""
+    background_color = (0, 0, 0)
+    text_color = (255, 255, 255)
+    
+    img = Image.new('RGB', (width, height), color=background_color)
+    draw = ImageDraw.Draw(img)
+    
+    # Load font (120px at 1080p)
     try:
-        # Image settings
-        width, height = 1920, 1080
-        background_color = (0, 0, 0)
-        text_color = (255, 255, 255)
-        
-        # Create image
-        img = Image.new('RGB', (width, height), color=background_color)
-        draw = ImageDraw.Draw(img)
+        font_size = max(16, height // 9)
+        font = ImageFont.truetype(font_path, font_size)
+    except OSError:
+        print(f"⚠️ Font {font_path} not found, using default font.")
+        font = ImageFont.load_default()
+        font_size = 40
+
+    # Text settings (Word Wrap)
+    # Approximate characters per line
+    chars_per_line = 25 
+    lines = textwrap.wrap(title, width=chars_per_line)
+    
+    # Simple centering: line_height approx 1.5 * font_size
+    line_height = int(font_size * 1.5)
+    total_text_height = len(lines) * line_height
+    
+    current_y = (height - total_text_height) // 2
+    
+    for line in lines:
+        # Horizontal centering
+        text_width = draw.textlength(line, font=font)
+        current_x = (width - text_width) // 2
+        
+        draw.text((current_x, current_y), line, font=font, fill=text_color)
+        current_y += line_height
+    return img
+
+def create_intro_video(title, output_intro_path, font_path=DEFAULT_INTRO_FONT, width=1920, height=1080,
+                       fps=25, encoder="libx264", video_options=(), sample_rate=44100, channels=2,
+                       pix_fmt="yuv420p"):
+    """
+    Create a 2-second intro video from title, encoded in the given stream
+    format (frame size, fps, encoder + options, pixel format, audio rate/channels).
+    """
+    temp_image = None
+    try:
+        img = render_intro_image(title, width, height, font_path)
         
-        # Load font
-        try:
-            font_size = 120
-            font = ImageFont.truetype(font_path, font_size)
-        except OSError:
-            print(f"⚠️ Font {font_path} not found, using default font.")
-            font = ImageFont.load_default()
-            font_size = 40
-
-        # Text settings (Word Wrap)
-        # Approximate characters per line
-        chars_per_line = 25 
-        lines = textwrap.wrap(title, width=chars_per_line)
-        
-        # Calculate total text height for centering
-        # In newer Pillow, textbbox is more accurate but keeping it simple for now
-        # getbbox availability depends on version.
-        # Let's use simple logic: line_height approx 1.5 * font_size
-        line_height = int(font_size * 1.5)
-        total_text_height = len(lines) * line_height
-        
-        current_y = (height - total_text_height) // 2
-        
-        for line in lines:
-            # Horizontal centering
-            # draw.textlength is available in newer Pillow
-            text_width = draw.textlength(line, font=font)
-            current_x = (width - text_width) // 2
-            
-            draw.text((current_x, current_y), line, font=font, fill=text_color)
-            current_y += line_height
-            
-        # Save temporary image
-        temp_image = "temp_intro.png"
+        # Unique temporary image next to the output: parallel runs never collide
+        fd, temp_image = tempfile.mkstemp(suffix=".png", dir=os.path.dirname(os.path.abspath(output_intro_path)))
+        os.close(fd)
         img.save(temp_image)
         
-        # Convert image to 3-second video with ffmpeg
-        # -loop 1 -i image -t 3 ...
+        layout = "mono" if channels == 1 else "stereo"
         cmd = [
             "ffmpeg", "-y",
-            "-loop", "1",
+            "-loop", "1", "-framerate", str(fps),
             "-i", temp_image,
-            "-f", "lavfi", "-i", "anullsrc=channel_layout=stereo:sample_rate=44100", # Silence audio
-            "-t", "2", # 2 seconds is enough
-            "-c:v", "libx264",
-            "-tune", "stillimage",
-            "-c:a", "aac",
-            "-pix_fmt", "yuv420p",
-            "-shortest", 
+            "-f", "lavfi", "-i", f"anullsrc=channel_layout={layout}:sample_rate={sample_rate}", # Silence audio
+            "-t", str(INTRO_SECONDS),
+            "-vf", "setsar=1",
+            "-r", str(fps),
+            "-c:v", encoder,
+            *video_options,
+            "-c:a", "aac", "-ar", str(sample_rate), "-ac", str(channels),
+            "-pix_fmt", pix_fmt,
+            "-shortest",
+            "-movflags", "+faststart",
             output_intro_path
         ]
+        if encoder == "libx264":
+            cmd[cmd.index("-c:v") + 2:cmd.index("-c:v") + 2] = ["-tune", "stillimage"]
         
         subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        
-        # Delete temporary image
-        if os.path.exists(temp_image):
-            os.remove(temp_image)
-            
         return True
     except Exception as e:
         print(f"❌ Error creating intro: {e}")
         return False
+    finally:
+        if temp_image and os.path.exists(temp_image):
+            os.remove(temp_image)
+
+def intro_clip(title, width=1920, height=1080, fps=25, encoder="libx264", video_options=(),
+               sample_rate=44100, channels=2, font_path=DEFAULT_INTRO_FONT, pix_fmt="yuv420p"):
+    """
+    Cached intro clip: rendered once per (title, font, frame size, fps,
+    codec parameters, audio format) under .storage/intro_cache and reused by
+    every later video with the same settings. Returns the path or None.
+    """
+    try:
+        st = os.stat(font_path)
+        font_id = [os.path.abspath(font_path), st.st_size, st.st_mtime_ns]
+    except OSError:
+        font_id = [font_path, None, None]
+    key = json.dumps([INTRO_CACHE_VERSION, title, font_id, width, height, str(fps), encoder,
+                      list(video_options), sample_rate, channels, pix_fmt])
+    cache_dir = get_path("intro_cache_dir")
+    path = os.path.join(cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + ".mp4")
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        return path
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.mp4"
+    ok = create_intro_video(title, tmp_path, font_path, width, height, fps, encoder, video_options,
+                            sample_rate, channels, pix_fmt)
+    if not ok or not os.path.exists(tmp_path):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, path)
+    return path
+
+async def _profile_intro(title, kind, target_res):
+    """Cached intro at the profile's frame size and fps (joined by the re-encoding paths)."""
+    profile = get_profile(kind, target_res)
+    return await asyncio.to_thread(intro_clip, title, profile.width, profile.height, profile.fps)
+
+# Stream parameters that have to be identical for a -c copy join: the MP4
+# keeps only the first file's codec config (avcC), so any SPS/PPS difference
+# corrupts the decode of everything after the intro
+_JOIN_VIDEO_KEYS = ("codec_name", "profile", "level", "pix_fmt", "color_range", "width", "height",
+                    "r_frame_rate", "refs", "has_b_frames", "is_avc", "nal_length_size")
+_JOIN_AUDIO_KEYS = ("codec_name", "profile", "sample_rate", "channels")
+
+def join_signature(probe):
+    """Stream parameters of a probe that must match between files joined with -c copy."""
+    streams = probe.get('streams', []) if probe else []
+    video = next((st for st in streams if st.get('codec_type') == 'video'), {})
+    audio = next((st for st in streams if st.get('codec_type') == 'audio'), None)
+    signature = {f"video.{k}": str(video.get(k, '')) for k in _JOIN_VIDEO_KEYS}
+    sar = video.get('sample_aspect_ratio') or '1:1'
+    signature["video.sample_aspect_ratio"] = '1:1' if sar == '0:1' else sar
+    if audio is not None:
+        signature.update({f"audio.{k}": str(audio.get(k, '')) for k in _JOIN_AUDIO_KEYS})
+    return signature
+
+def intro_matching(title, probe):
+    """
+    Cached intro encoded with the stream parameters of an H.264/AAC source
+    (profile, level, refs, B-frames, pixel format, frame size, frame rate,
+    audio rate/channels), so the concat demuxer can join it to the source
+    without re-encoding. None unless the rendered intro's parameters really
+    match the source's (then the source has to be re-encoded).
+    """
+    video = next((st for st in probe.get('streams', []) if st.get('codec_type') == 'video'), {})
+    audio = next((st for st in probe.get('streams', []) if st.get('codec_type') == 'audio'), {})
+    if video.get('codec_name') != 'h264' or not video.get('level'):
+        return None
+    options = []
+    profile = str(video.get('profile', '')).lower()
+    if profile in ('baseline', 'constrained baseline', 'main', 'high'):
+        options += ["-profile:v", "baseline" if "baseline" in profile else profile]
+    level = int(video['level'])
+    options += ["-level:v", f"{level // 10}.{level % 10}"]
+    if video.get('refs'):
+        options += ["-refs", str(video['refs'])]
+    if str(video.get('has_b_frames', '')) == '0':
+        options += ["-bf", "0"]
+    path = intro_clip(
+        title, probe['width'], probe['height'], video.get('r_frame_rate') or 25, "libx264", options,
+        int(audio.get('sample_rate') or 44100), int(audio.get('channels') or 2),
+        pix_fmt=video.get('pix_fmt') or "yuv420p"
+    )
+    if not path:
+        return None
+    expected = join_signature(probe)
+    actual = join_signature(probe_video(path, use_cache=False))
+    mismatched = [k for k in expected if expected[k] != actual.get(k)]
+    if mismatched:
+        print(f"   🔄 Intro cannot be joined without re-encoding: "
+              f"{', '.join(f'{k} {actual.get(k)} != {expected[k]}' for k in mismatched)}")
+        return None
+    return path
+
+async def decode_check(path, duration=None):
+    """Decodes the whole file (-f null); True when ffmpeg reports no errors."""
+    cmd = ["ffmpeg", "-v", "error", "-i", path, "-f", "null", "-"]
+    returncode, stderr_tail = await run_ffmpeg_async(cmd, timeout=1200, duration=duration, label="Verifying")
+    if returncode == 0 and not stderr_tail:
+        return True
+    print(f"   ⚠️ Decode check failed: {stderr_tail[-1][-200:] if stderr_tail else f'exit {returncode}'}")
+    return False
+
+async def concat_copy(paths, output_path, expected_duration=None):
+    """
+    Joins same-format files with the concat demuxer (-c copy). The result
+    must have the expected duration and decode without errors. Returns True
+    on success; on failure nothing is left at output_path.
+    """
+    list_file = output_path + ".concat.txt"
+    with open(list_file, "w", encoding="utf-8") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file,
+           "-map", "0:v:0", "-map", "0:a:0?", "-c", "copy", "-movflags", "+faststart", output_path]
+    try:
+        returncode, stderr_tail = await run_ffmpeg_async(cmd, timeout=600, duration=expected_duration, label="Joining")
+    finally:
+        os.remove(list_file)
+    result = probe_video(output_path, use_cache=False) if returncode == 0 else None
+    if result and (not expected_duration or abs(result['duration'] - expected_duration) <= 1.0):
+        if await decode_check(output_path, result['duration']):
+            return True
+    else:
+        print(f"   ⚠️ Stream-copy join failed: {stderr_tail[-1][-200:] if stderr_tail else 'duration mismatch'}")
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    return False
 
 def extract_thumbnail(video_path, output_thumb_path, timestamps=["00:00:05", "00:00:01", "00:00:10"]):
     """
@@ -305,9 +557,12 @@ def add_intro_to_video(video_path, title, output_path):
 
 
 
-async def process_video_for_bot_safe(input_path, output_path, title, add_intro=False, target_res=720):
+async def process_video_for_bot_safe(input_path, output_path, title, add_intro=False, target_res=720,
+                                     max_size_mb=None, two_pass=False):
     """
     Process video for bot (safer version) + optional intro
+    max_size_mb: encode to a bitrate budget so one pass lands under this size
+    two_pass: two-pass encode for the size target (libx264 only)
     ✅ استفاده کامل filter_complex + صحیح stream selection
     ✅ بهتر error handling و logging
     """
@@ -317,110 +572,52 @@ async def process_video_for_bot_safe(input_path, output_path, title, add_intro=F
         print(f"🤖 Processing for bot - {title}")
         print(f"   📏 Original size: {file_size_mb:.2f}MB")
         
-        intro_created = False
-        intro_path = f"intro_{os.path.basename(input_path)}"
-
-        if add_intro:
-            intro_created = create_intro_video(title, intro_path)
+        if await _try_stream_copy(input_path, output_path, target_res, max_size_mb or BOT_MAX_SIZE_MB, add_intro, title):
+            return True
         
-        # تعیین resolution
-        # ✅ Standardized: Always use Fixed Dimensions (1280x720 or 1920x1080)
-        if target_res == 1080:
-            target_w, target_h = 1920, 1080
-        else:
-            target_w, target_h = 1280, 720
+        # Cached intro rendered at the output frame size/fps (kept for the next video)
+        intro_path = await _profile_intro(title, "bot", target_res) if add_intro else None
+        intro_created = intro_path is not None
         
         if intro_created:
             print("   🎞️ Intro created - re-encoding required...")
-            
-            # ✅ Auto-detect hardware encoder
-            encoder = detect_hw_encoder()
-            
-            # ✅ filter_complex برای concat intro + main video
-            process_cmd = [
-                "ffmpeg", "-y",
-                "-i", intro_path,
-                "-i", input_path,
-                "-filter_complex", 
-                f"[0:v:0]fps=25,scale={target_w}:{target_h}:force_original_aspect_ratio=decrease,pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2,setsar=1[v0];"
-                f"[1:v:0]fps=25,scale={target_w}:{target_h}:force_original_aspect_ratio=decrease,pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2,setsar=1[v1];"
-                f"[0:a:0]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo[a0];"
-                f"[1:a:0]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo[a1];"
-                f"[v0][a0][v1][a1]concat=n=2:v=1:a=1[outv][outa]",
-                "-map", "[outv]", "-map", "[outa]",
-                "-c:v", encoder,  # ✅ Auto hardware acceleration
-                "-c:a", "aac",
-            ]
-            # Encoder-specific options
-            if encoder in ['hevc_videotoolbox', 'libx265']:
-                process_cmd.extend(["-tag:v", "hvc1"])
-                if encoder == 'hevc_videotoolbox':
-                    process_cmd.extend(["-q:v", "60"])
-                else:
-                    process_cmd.extend(["-crf", "25", "-preset", "fast"])
-            elif encoder in ['hevc_videotoolbox', 'h264_videotoolbox', 'libx265']:
-                process_cmd.extend(["-q:v", "65"])
-            elif encoder == 'libx264':
-                process_cmd.extend(["-preset", "fast", "-crf", "23"])
-            else:
-                process_cmd.extend(["-preset", "fast"])
-            
-            process_cmd.extend([
-                "-pix_fmt", "yuv420p",
-                "-movflags", "+faststart",
-                output_path
-            ])
-        else:
-            # ✅ Without intro: Detect hardware encoder
-            encoder = detect_hw_encoder()
-            
-            process_cmd = [
-                "ffmpeg", "-y",
-                "-i", input_path,
-                "-vf", f"fps=25,scale={target_w}:{target_h}:force_original_aspect_ratio=decrease,pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2,setsar=1",
-                "-c:v", encoder,
-                "-af", "aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo",
-                "-c:a", "aac",
-            ]
-            
-            # Encoder-specific options
-            if encoder in ["hevc_videotoolbox", "libx265"]:
-                process_cmd.extend(["-tag:v", "hvc1"])
-                if encoder == "hevc_videotoolbox":
-                    process_cmd.extend(["-q:v", "60"])
-                else:
-                    process_cmd.extend(["-crf", "25", "-preset", "fast"])
-            elif encoder == "h264_videotoolbox":
-                process_cmd.extend(["-q:v", "65"])
-            elif encoder == "libx264":
-                process_cmd.extend(["-preset", "medium", "-crf", "23"])
-            else:
-                process_cmd.extend(["-preset", "fast"])
-
-            process_cmd.extend([
-                "-pix_fmt", "yuv420p",
-                "-movflags", "+faststart",
-                output_path
-            ])
-        
-        result = subprocess.run(
-            process_cmd, 
-            stdout=None,
-            stderr=None,
-            timeout=1200
+        
+        # ✅ Fastest available encoder, settings from the bot profile
+        encoder = await asyncio.to_thread(detect_hw_encoder)
+        process_cmd = build_encode_command(
+            get_profile("bot", target_res), input_path, output_path, encoder,
+            intro_path=intro_path if intro_created else None
         )
         
-        if intro_created and os.path.exists(intro_path):
-            os.remove(intro_path)
-            
-        if result.returncode != 0:
-            print(f"   ❌ ffmpeg error (code {result.returncode})")
+        source_info = get_video_info(input_path)
+        expected_duration = source_info['duration'] + (INTRO_SECONDS if intro_created else 0) if source_info else None
+        
+        use_two_pass = False
+        if max_size_mb and expected_duration:
+            video_bitrate = target_video_bitrate(expected_duration, max_size_mb)
+            if video_bitrate > 0:
+                use_two_pass = two_pass and encoder == "libx264"
+                print(f"   🎯 Size target {max_size_mb}MB - video {video_bitrate // 1000} kbps{' (two-pass)' if use_two_pass else ''}")
+                process_cmd = apply_size_target(process_cmd, encoder, video_bitrate, use_two_pass)
+        
+        returncode, stderr_tail = await run_encode(
+            process_cmd,
+            encoder,
+            two_pass=use_two_pass,
+            timeout=1200,
+            duration=expected_duration
+        )
+        
+        if returncode != 0:
+            print(f"   ❌ ffmpeg error (code {returncode})")
             print(f"   DEBUG - CMD: {' '.join(process_cmd)}")
+            for line in stderr_tail[-5:]:
+                print(f"   DEBUG - {line}")
             return False
         
         if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
             new_size = os.path.getsize(output_path) / (1024 * 1024)
-            final_w, final_h, _ = get_video_info_detailed(output_path)
+            final_w, final_h, _ = get_video_info_detailed(output_path, use_cache=False)
             print(f"   ✅ Success - Size: {new_size:.2f}MB, Final: {final_w}x{final_h}")
             return True
         else:
@@ -429,19 +626,18 @@ async def process_video_for_bot_safe(input_path, output_path, title, add_intro=F
         
     except subprocess.TimeoutExpired:
         print(f"   ❌ Processing timeout (20 minutes exceeded)")
-        if 'intro_created' in locals() and intro_created and os.path.exists(intro_path):
-            os.remove(intro_path)
         return False
     except Exception as e:
         print(f"   ❌ Processing error: {str(e)}")
-        if 'intro_created' in locals() and intro_created and os.path.exists(intro_path):
-            os.remove(intro_path)
         return False
 
 
-async def process_video_for_user_safe(input_path, output_path, title, add_intro=False, target_res=720):
+async def process_video_for_user_safe(input_path, output_path, title, add_intro=False, target_res=720,
+                                      max_size_mb=None, two_pass=False):
     """
     Process video for USER ACCOUNT (supports custom resolution: 720 or 1080)
+    max_size_mb: encode to a bitrate budget so one pass lands under this size
+    two_pass: two-pass encode for the size target (libx264 only)
     ✅ استفاده کامل filter_complex - metadata صحیح!
     ✅ صریح stream selection
     ✅ بهتر progress tracking و error handling
@@ -455,110 +651,62 @@ async def process_video_for_user_safe(input_path, output_path, title, add_intro=
         print(f"👤 Processing for user account - {title}")
         print(f"   📏 Original size: {file_size_mb:.2f}MB")
         
+        if await _try_stream_copy(input_path, output_path, target_res, max_size_mb or USER_MAX_SIZE_MB, add_intro, title):
+            return True
+        
         # ✅ Standardized: Always use Fixed Dimensions (1280x720 or 1920x1080)
-        if target_res == 1080:
-            target_w, target_h = 1920, 1080
-        else:
-            target_w, target_h = 1280, 720
+        target_w, target_h = target_dimensions(target_res)
+        if target_res != 1080:
             print(f"   🔄 Landscape detected - {target_w}x{target_h}")
         
-        intro_path = f"intro_user_{os.path.basename(input_path)}"
-        intro_created = False
-        
-        if add_intro:
-            intro_created = create_intro_video(title, intro_path)
+        # Cached intro rendered at the output frame size/fps (kept for the next video)
+        intro_path = await _profile_intro(title, "user", target_res) if add_intro else None
+        intro_created = intro_path is not None
         
         if intro_created:
             # ✅ With intro: re-encode needed for concat
             print(f"   🎞️ Intro created - re-encoding required...")
-            
-            # ✅ Auto-detect hardware encoder
-            encoder = detect_hw_encoder()
-            
-            process_cmd = [
-                "ffmpeg", "-y",
-                "-i", intro_path,
-                "-i", input_path,
-                "-filter_complex", 
-                f"[0:v:0]fps=25,scale={target_w}:{target_h}:force_original_aspect_ratio=decrease,pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2,setsar=1[v0];"
-                f"[1:v:0]fps=25,scale={target_w}:{target_h}:force_original_aspect_ratio=decrease,pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2,setsar=1[v1];"
-                f"[0:a:0]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo[a0];"
-                f"[1:a:0]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo[a1];"
-                f"[v0][a0][v1][a1]concat=n=2:v=1:a=1[outv][outa]",
-                "-map", "[outv]", "-map", "[outa]",
-                "-c:v", encoder,  # ✅ Auto hardware acceleration
-                "-c:a", "aac",
-            ]
-            # Encoder-specific options
-            if encoder in ['hevc_videotoolbox', 'libx265']:
-                process_cmd.extend(["-tag:v", "hvc1"])
-                if encoder == 'hevc_videotoolbox':
-                    process_cmd.extend(["-q:v", "60"])
-                else:
-                    process_cmd.extend(["-crf", "25", "-preset", "fast"])
-            elif encoder in ['hevc_videotoolbox', 'h264_videotoolbox', 'libx265']:
-                process_cmd.extend(["-q:v", "65"])
-            elif encoder == 'libx264':
-                process_cmd.extend(["-preset", "fast", "-crf", "23"])
-            else:
-                process_cmd.extend(["-preset", "fast"])
-            
-            process_cmd.extend([
-                "-pix_fmt", "yuv420p",
-                "-movflags", "+faststart",
-                output_path
-            ])
-        else:
-            # ✅ Without intro: Detect hardware encoder
-            encoder = detect_hw_encoder()
-            
-            process_cmd = [
-                "ffmpeg", "-y",
-                "-i", input_path,
-                "-vf", f"fps=25,scale={target_w}:{target_h}:force_original_aspect_ratio=decrease,pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2,setsar=1",
-                "-c:v", encoder,
-                "-af", "aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo",
-                "-c:a", "aac",
-            ]
-            
-            # Encoder-specific options
-            if encoder in ["hevc_videotoolbox", "libx265"]:
-                process_cmd.extend(["-tag:v", "hvc1"])
-                if encoder == "hevc_videotoolbox":
-                    process_cmd.extend(["-q:v", "60"])
-                else:
-                    process_cmd.extend(["-crf", "25", "-preset", "fast"])
-            elif encoder == "h264_videotoolbox":
-                process_cmd.extend(["-q:v", "65"])
-            elif encoder == "libx264":
-                process_cmd.extend(["-preset", "medium", "-crf", "23"])
-            else:
-                process_cmd.extend(["-preset", "fast"])
-
-            process_cmd.extend([
-                "-pix_fmt", "yuv420p",
-                "-movflags", "+faststart",
-                output_path
-            ])
-        
-        result = subprocess.run(
-            process_cmd, 
-            stdout=None,
-            stderr=None,
-            timeout=1800
+        
+        # ✅ Fastest available encoder, settings from the user profile
+        encoder = await asyncio.to_thread(detect_hw_encoder)
+        process_cmd = build_encode_command(
+            get_profile("user", target_res), input_path, output_path, encoder,
+            intro_path=intro_path if intro_created else None
         )
         
-        if intro_created and os.path.exists(intro_path):
-            os.remove(intro_path)
-            
-        if result.returncode != 0:
-            print(f"   ❌ ffmpeg error (code {result.returncode})")
+        source_info = get_video_info(input_path)
+        expected_duration = source_info['duration'] + (INTRO_SECONDS if intro_created else 0) if source_info else None
+        
+        use_two_pass = False
+        if max_size_mb and expected_duration:
+            video_bitrate = target_video_bitrate(expected_duration, max_size_mb)
+            if video_bitrate > 0:
+                use_two_pass = two_pass and encoder == "libx264"
+                print(f"   🎯 Size target {max_size_mb}MB - video {video_bitrate // 1000} kbps{' (two-pass)' if use_two_pass else ''}")
+                process_cmd = apply_size_target(process_cmd, encoder, video_bitrate, use_two_pass)
+        
+        # Long lessons: parallel keyframe-aligned chunks (falls back to one process)
+        if not intro_created and not use_two_pass and await encode_in_chunks(process_cmd, encoder, expected_duration):
+            returncode, stderr_tail = 0, []
+        else:
+            returncode, stderr_tail = await run_encode(
+                process_cmd,
+                encoder,
+                two_pass=use_two_pass,
+                timeout=1800,
+                duration=expected_duration
+            )
+        
+        if returncode != 0:
+            print(f"   ❌ ffmpeg error (code {returncode})")
             print(f"   DEBUG - CMD: {' '.join(process_cmd)}")
+            for line in stderr_tail[-5:]:
+                print(f"   DEBUG - {line}")
             return False
         
         if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
             new_size = os.path.getsize(output_path) / (1024 * 1024)
-            final_w, final_h, _ = get_video_info_detailed(output_path)
+            final_w, final_h, _ = get_video_info_detailed(output_path, use_cache=False)
             print(f"   ✅ Success - Size: {new_size:.2f}MB, Final: {final_w}x{final_h}")
             return True
         else:
@@ -567,13 +715,9 @@ async def process_video_for_user_safe(input_path, output_path, title, add_intro=
         
     except subprocess.TimeoutExpired:
         print(f"   ❌ Processing timeout (30 minutes exceeded)")
-        if 'intro_created' in locals() and intro_created and os.path.exists(intro_path):
-            os.remove(intro_path)
         return False
     except Exception as e:
         print(f"   ❌ Processing error: {str(e)}")
-        if 'intro_created' in locals() and intro_created and os.path.exists(intro_path):
-            os.remove(intro_path)
         return False
 
 
@@ -582,48 +726,133 @@ async def process_video_for_user_safe(input_path, output_path, title, add_intro=
     except:
         return 1280, 720, '1:1'
 
-def get_video_info_detailed(input_path):
+def get_video_info_detailed(input_path, use_cache=True):
     """
     Extract width, height, SAR for valid scaling.
     Includes ROTATION check to correctly identify landscape videos stored vertically.
     """
-    try:
+    probe = probe_video(input_path, use_cache)
+    if not probe or not probe['display_width'] or not probe['display_height']:
+        return 1280, 720, '1:1'
+    return probe['display_width'], probe['display_height'], probe['sar']
+
+# Share of the size limit planned for packet payload (the rest is MP4 container overhead)
+SPLIT_PAYLOAD_SHARE = 0.97
+# Planning passes: an over-limit part shrinks the budget and the file is cut again
+SPLIT_MAX_ATTEMPTS = 3
+
+def plan_split(keyframes, total_bytes, budget_bytes):
+    """
+    Greedy keyframe cut points: each part ends at the last keyframe that
+    keeps it within budget_bytes. Returns the part start times (first is 0),
+    or None when a single GOP is already larger than the budget.
+    """
+    starts = [0.0]
+    start_bytes = 0
+    cuts = [(t, b) for t, b in keyframes if t > 0]
+    i = 0
+    while total_bytes - start_bytes > budget_bytes:
+        best = None
+        while i < len(cuts) and cuts[i][1] - start_bytes <= budget_bytes:
+            best = cuts[i]
+            i += 1
+        if best is None or best[1] <= start_bytes:
+            return None
+        starts.append(best[0])
+        start_bytes = best[1]
+    return starts
+
+async def _encode_intro_part(intro_path, part_path, output_path, target_res, max_bytes, duration):
+    """Re-encodes intro + first part, bitrate-capped so the result stays under max_bytes."""
+    encoder = await asyncio.to_thread(detect_hw_encoder)
+    cmd = build_encode_command(get_profile("split-part", target_res), part_path, output_path, encoder,
+                               intro_path=intro_path)
+    # Budget spread over the part (+2s intro); the buffer keeps peaks in check
+    cmd = apply_size_target(cmd, encoder, target_video_bitrate(duration + INTRO_SECONDS, max_bytes / (1024 * 1024)))
+    returncode, _ = await run_ffmpeg_async(cmd, timeout=600, duration=duration + INTRO_SECONDS, label="Part 1 + intro")
+    return returncode == 0 and os.path.exists(output_path) and 1000 < os.path.getsize(output_path) <= max_bytes
+
+async def split_by_keyframes(input_path, output_dir, name_prefix, target_size_mb, intro_path=None, target_res=720):
+    """
+    Splits without re-encoding: cut points are keyframes chosen from the
+    cumulative packet sizes so every part stays under target_size_mb, and one
+    segment-muxer pass stream-copies all parts. Only an intro-bearing first
+    part is re-encoded. Returns the part paths, or None when stream-copy
+    splitting is not possible (codec not MP4-safe, unreadable, GOP > budget).
+    """
+    # Split inputs are mostly processed outputs: not worth a cache entry
+    probe = probe_video(input_path, use_cache=False)
+    if not probe or probe['codec'] not in COPY_VIDEO_CODECS:
+        return None
+    if probe['has_audio'] and probe['audio_codec'] not in COPY_AUDIO_CODECS:
+        return None
+    index = await asyncio.to_thread(keyframe_index, input_path, _video_stream_index(probe))
+    if not index or not index['keyframes']:
+        return None
+
+    max_bytes = int(target_size_mb * 1024 * 1024)
+    budget = int(max_bytes * SPLIT_PAYLOAD_SHARE)
+    pattern = os.path.join(output_dir, f"{name_prefix}%02d.mp4")
+
+    for attempt in range(SPLIT_MAX_ATTEMPTS):
+        starts = plan_split(index['keyframes'], index['total'], budget)
+        if not starts:
+            return None
+        print(f"   ✂️ Stream-copy split into {len(starts)} parts at keyframes (no re-encode)")
         cmd = [
-            "ffprobe", "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height,sample_aspect_ratio:stream_tags=rotate",
-            "-of", "json",
-            input_path
+            "ffmpeg", "-y",
+            "-i", input_path,
+            "-map", "0:v:0", "-map", "0:a:0?",
+            "-c", "copy",
+            "-f", "segment",
+            # Slightly before each keyframe: the muxer cuts at the first keyframe at/after the time
+            "-segment_times", ",".join(f"{max(0.0, t - 0.001):.6f}" for t in starts[1:]),
+            "-segment_start_number", "1",
+            "-reset_timestamps", "1",
+            "-segment_format", "mp4",
+            "-segment_format_options", "movflags=+faststart",
+            pattern
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        data = json.loads(result.stdout)
-        
-        if data['streams']:
-            stream = data['streams'][0]
-            w = int(stream.get('width', 1280))
-            h = int(stream.get('height', 720))
-            sar = stream.get('sample_aspect_ratio', '1:1')
-            
-            # Rotation Check (Critical for phone videos)
-            tags = stream.get('tags', {})
-            rotate = tags.get('rotate', '0')
-            try:
-                rotate = int(rotate)
-            except:
-                rotate = 0
-            
-            if abs(rotate) == 90 or abs(rotate) == 270:
-                w, h = h, w
-                
-            return w, h, sar
-        return 1280, 720, '1:1'
-    except:
-        return 1280, 720, '1:1'
-        
+        returncode, stderr_tail = await run_ffmpeg_async(cmd, timeout=1200, duration=probe['duration'], label="Splitting")
+        parts = [os.path.join(output_dir, f"{name_prefix}{i + 1:02d}.mp4") for i in range(len(starts))]
+        if returncode != 0 or not all(os.path.exists(p) for p in parts):
+            print(f"   ⚠️ Stream-copy split failed: {stderr_tail[-1][-200:] if stderr_tail else 'unknown'}")
+            _remove_files(parts)
+            return None
+        oversize = [p for p in parts if os.path.getsize(p) > max_bytes]
+        if not oversize:
+            break
+        # Container overhead was larger than planned: cut again with a smaller budget
+        print(f"   ⚠️ {len(oversize)} part(s) over {target_size_mb}MB - re-planning with a smaller budget")
+        _remove_files(parts)
+        budget = int(budget * 0.9)
+    else:
+        return None
+
+    if intro_path:
+        first_duration = (starts[1] if len(starts) > 1 else probe['duration'])
+        with_intro = parts[0] + ".intro.mp4"
+        if await _encode_intro_part(intro_path, parts[0], with_intro, target_res, max_bytes, first_duration):
+            os.replace(with_intro, parts[0])
+        else:
+            print(f"   ⚠️ Part 1 with intro would exceed {target_size_mb}MB - keeping it without intro")
+            _remove_files([with_intro])
+
+    for i, part in enumerate(parts):
+        print(f"   ✅ Part {i+1} ready - {os.path.getsize(part) / (1024 * 1024):.2f}MB")
+    return parts
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 async def split_video_for_bot_safe(input_path, output_dir, title, target_size_mb=40, add_intro=False, target_res=720):
     """Split video for bot + optional intro to the first part."""
     try:
-        video_info = get_video_info(input_path)
+        video_info = get_video_info(input_path, use_cache=False)
         if not video_info or video_info['duration'] <= 0:
             return []
         
@@ -631,17 +860,23 @@ async def split_video_for_bot_safe(input_path, output_dir, title, target_size_mb
         duration = video_info['duration']
         segments = calculate_optimal_segments(file_size_mb, target_size_mb)
         
-        print(f"✂️ Splitting for bot into {segments} parts...")
-        
         segment_duration = duration / segments
         output_files = []
         
         # Create main intro once
-        intro_created = False
-        intro_path = f"intro_split_{os.path.basename(input_path)}"
-
-        if add_intro:
-             intro_created = create_intro_video(title, intro_path)
+        intro_path = await _profile_intro(title, "split-part", target_res) if add_intro else None
+        intro_created = intro_path is not None
+        
+        # Fast path: keyframe cuts + stream copy (only an intro part is re-encoded)
+        safe_title = re.sub(r'[^\w\-_\s]', '_', title)
+        parts = await split_by_keyframes(input_path, output_dir, f"{safe_title}_bot_part", target_size_mb,
+                                         intro_path if intro_created else None, target_res)
+        if parts is not None:
+            return parts
+        
+        print(f"✂️ Splitting for bot into {segments} parts...")
+        encoder = await asyncio.to_thread(detect_hw_encoder)
+        split_profile = get_profile("split-part", target_res)
         
         for i in range(segments):
             start_time = i * segment_duration
@@ -651,67 +886,23 @@ async def split_video_for_bot_safe(input_path, output_dir, title, target_size_mb
             
             print(f"   📹 Part {i+1}/{segments}...")
             
-            # If first part AND we have intro -> Concat
-            if i == 0 and intro_created:
-                 # Need to trim first part, then concat with intro
-                 # Complex command needed.
-                 # Better to split video first, then attach intro to part 1?
-                 # Or do it in one command.
-                 
-                 # trim first part
-                 # [0:v] -> intro
-                 # [1:v] -> video (trimmed)
-                 
-                 if target_res == 1080:
-                     target_w, target_h = 1920, 1080
-                 else:
-                     target_w, target_h = 1280, 720
-                 
-                 split_cmd = [
-                    "ffmpeg", "-y",
-                    "-i", intro_path,
-                    "-ss", str(start_time), # seek in input 2 (index 1)
-                    "-i", input_path,
-                    "-t", str(segment_duration), # duration from seek point
-                    "-filter_complex",
-                    f"[0:v]fps=25[v0];"
-                    f"[1:v]fps=25[v1];"
-                    f"[0:a]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo[a0];"
-                    f"[1:a]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo[a1];"
-                    f"[v0][a0][v1][a1]concat=n=2:v=1:a=1[outv][outa]",
-                    "-map", "[outv]", "-map", "[outa]",
-                    "-c:v", "libx264",
-                    "-c:a", "aac",
-                    "-preset", "medium",
-                    "-crf", "23",
-                    "-movflags", "+faststart",
-                    output_path
-                 ]
-            else:
-                # Next parts without intro
-                # Just simple re-encode (or copy? No, re-encode is better for accurate split)
-                split_cmd = [
-                    "ffmpeg", "-y",
-                    "-ss", str(start_time),
-                    "-i", input_path,
-                    "-t", str(segment_duration),
-                    "-c:v", "libx264",
-                    "-c:a", "aac",
-                    "-preset", "medium",
-                    "-crf", "23",
-                    "-movflags", "+faststart",
-                    output_path
-                ]
+            # Re-encoded part (intro joined to the first one) with the split-part profile
+            split_cmd = build_encode_command(
+                split_profile, input_path, output_path, encoder,
+                intro_path=intro_path if i == 0 and intro_created else None,
+                start=start_time, duration=segment_duration
+            )
             
             try:
-                result = subprocess.run(split_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True, timeout=300)
+                part_duration = segment_duration + (INTRO_SECONDS if i == 0 and intro_created else 0)
+                returncode, stderr_tail = await run_ffmpeg_async(split_cmd, timeout=300, duration=part_duration, label=f"Part {i+1}")
                 
-                if result.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
+                if returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
                     part_size = os.path.getsize(output_path) / (1024 * 1024)
                     print(f"   ✅ Part {i+1} ready - {part_size:.2f}MB")
                     output_files.append(output_path)
                 else:
-                    print(f"   ❌ Error in part {i+1}: {result.stderr[-200:] if result.stderr else 'unknown'}")
+                    print(f"   ❌ Error in part {i+1}: {stderr_tail[-1][-200:] if stderr_tail else 'unknown'}")
                 
             except subprocess.TimeoutExpired:
                 print(f"   ⏰ Timeout in part {i+1}")
@@ -720,20 +911,16 @@ async def split_video_for_bot_safe(input_path, output_dir, title, target_size_mb
                 print(f"   ❌ Error in part {i+1}: {str(e)}")
                 continue
         
-        if intro_created and os.path.exists(intro_path):
-            os.remove(intro_path)
-            
         return output_files
         
     except Exception as e:
         print(f"❌ Error during split: {str(e)}")
-        if 'intro_path' in locals() and os.path.exists(intro_path): os.remove(intro_path)
         return []
 
 async def split_video_for_user_safe(input_path, output_dir, title, target_size_mb=1900, add_intro=False, target_res=720):
     """Split video for user account if > 2GB (or 4GB for Premium)."""
     try:
-        video_info = get_video_info(input_path)
+        video_info = get_video_info(input_path, use_cache=False)
         if not video_info or video_info['duration'] <= 0:
             return []
         
@@ -745,16 +932,21 @@ async def split_video_for_user_safe(input_path, output_dir, title, target_size_m
         if segments <= 1:
             return [] # No split needed
             
-        print(f"✂️ Splitting for user account into {segments} parts...")
-        
         segment_duration = duration / segments
         output_files = []
         
-        intro_created = False
-        intro_path = f"intro_user_split_{os.path.basename(input_path)}"
-        if add_intro:
-            intro_created = create_intro_video(title, intro_path)
+        intro_path = await _profile_intro(title, "split-part", target_res) if add_intro else None
+        intro_created = intro_path is not None
             
+        # Fast path: keyframe cuts + stream copy (only an intro part is re-encoded)
+        safe_title = re.sub(r'[^\w\-_\s]', '_', title)
+        parts = await split_by_keyframes(input_path, output_dir, f"{safe_title}_part", target_size_mb,
+                                         intro_path if intro_created else None, target_res)
+        if parts is not None:
+            return parts
+        
+        print(f"✂️ Splitting for user account into {segments} parts...")
+        
         for i in range(segments):
             start_time = i * segment_duration
             safe_title = re.sub(r'[^\w\-_\s]', '_', title)
@@ -764,30 +956,11 @@ async def split_video_for_user_safe(input_path, output_dir, title, target_size_m
             
             if i == 0 and intro_created:
                 # Need re-encode for concat with intro
-                if target_res == 1080:
-                    target_w, target_h = 1920, 1080
-                else:
-                    target_w, target_h = 1280, 720
-                split_cmd = [
-                    "ffmpeg", "-y",
-                    "-i", intro_path,
-                    "-ss", str(start_time),
-                    "-i", input_path,
-                    "-t", str(segment_duration),
-                    "-filter_complex",
-                    f"[0:v]fps=25[v0];"
-                    f"[1:v]fps=25[v1];"
-                    f"[0:a]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo[a0];"
-                    f"[1:a]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo[a1];"
-                    f"[v0][a0][v1][a1]concat=n=2:v=1:a=1[outv][outa]",
-                    "-map", "[outv]", "-map", "[outa]",
-                    "-c:v", "libx264",
-                    "-c:a", "aac",
-                    "-preset", "medium",
-                    "-crf", "23",
-                    "-movflags", "+faststart",
-                    output_path
-                ]
+                split_cmd = build_encode_command(
+                    get_profile("split-part", target_res), input_path, output_path,
+                    await asyncio.to_thread(detect_hw_encoder),
+                    intro_path=intro_path, start=start_time, duration=segment_duration
+                )
             else:
                 # Try "copy" for faster results if no intro needed
                 # Accurate splitting with copy (-ss before -i)
@@ -802,19 +975,19 @@ async def split_video_for_user_safe(input_path, output_dir, title, target_size_m
                 ]
             
             try:
-                result = subprocess.run(split_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True, timeout=600)
-                if result.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
+                part_duration = segment_duration + (INTRO_SECONDS if i == 0 and intro_created else 0)
+                returncode, stderr_tail = await run_ffmpeg_async(split_cmd, timeout=600, duration=part_duration, label=f"Part {i+1}")
+                if returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
                     part_size = os.path.getsize(output_path) / (1024 * 1024)
                     print(f"   ✅ Part {i+1} ready - {part_size:.2f}MB")
                     output_files.append(output_path)
                 else:
-                    print(f"   ❌ Error in part {i+1}: {result.stderr[-200:] if result.stderr else 'unknown'}")
+                    print(f"   ❌ Error in part {i+1}: {stderr_tail[-1][-200:] if stderr_tail else 'unknown'}")
+            except subprocess.TimeoutExpired:
+                print(f"   ⏰ Timeout in part {i+1}")
             except Exception as e:
                 print(f"   ❌ Error in part {i+1}: {str(e)}")
         
-        if intro_created and os.path.exists(intro_path):
-            os.remove(intro_path)
-            
         return output_files
         
     except Exception as e:
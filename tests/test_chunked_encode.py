@@ -0,0 +1,85 @@
+from unittest.mock import patch
+from src import chunked_encode
+
+SETTINGS = {"chunk_workers": 3, "chunk_seconds": 60, "chunk_min_duration": 600}
+CMD = ["ffmpeg", "-y", "-i", "in.mp4", "-vf", "fps=25", "-c:v", "libx264",
+       "-af", "aresample=44100", "-c:a", "aac", "-preset", "fast", "-crf", "23",
+       "-pix_fmt", "yuv420p", "-movflags", "+faststart", "out.mp4"]
+
+def _probe(duration, **overrides):
+    probe = {'codec': 'h264', 'width': 1280, 'height': 720, 'pix_fmt': 'yuv420p', 'fps': 25.0,
+             'duration': duration, 'size': int(duration * 100_000), 'has_audio': True, 'streams': []}
+    probe.update(overrides)
+    return probe
+
+def test_plan_chunks_cut_on_keyframes():
+    keyframes = [i * 4.0 for i in range(0, 50)]       # every 4s, 0..196
+    chunks = chunked_encode.plan_chunks(keyframes, 215.0, 60)
+    assert chunks == [(0.0, 60.0), (60.0, 120.0), (120.0, 180.0), (180.0, 215.0)]
+    # A tail shorter than half a chunk stays with the previous chunk
+    assert chunked_encode.plan_chunks(keyframes, 185.0, 60)[-1] == (120.0, 185.0)
+
+def test_chunk_and_audio_commands():
+    argv = chunked_encode.chunk_command(CMD, 60.0, 120.0, "c1.mp4", threads=8)
+    assert argv[:8] == ["ffmpeg", "-y", "-ss", "60.000000", "-i", "in.mp4", "-t", "60.000000"]
+    assert "-an" in argv and "-c:a" not in argv and "-af" not in argv and "-movflags" not in argv
+    assert argv[argv.index("-crf") + 1] == "23" and argv[-3:] == ["-threads", "8", "c1.mp4"]
+    assert "-t" not in chunked_encode.chunk_command(CMD, 180.0, 200.0, "c3.mp4", 8, last=True)
+    assert chunked_encode.audio_command(CMD, "a.m4a") == [
+        "ffmpeg", "-y", "-i", "in.mp4", "-vn", "-af", "aresample=44100", "-c:a", "aac", "a.m4a"]
+
+def test_check_chunks():
+    chunks = [(0.0, 60.0), (60.0, 120.0), (120.0, 140.0)]
+    assert chunked_encode.check_chunks([_probe(60), _probe(60.03), _probe(20)], chunks) == []
+    assert chunked_encode.check_chunks([_probe(60), _probe(60, width=1920)], chunks[:2])
+    assert chunked_encode.check_chunks([_probe(60), _probe(30)], chunks[:2])
+    assert chunked_encode.check_chunks([_probe(60), None], chunks[:2])
+    # Two frames short: the video would drift against the single audio track
+    assert chunked_encode.check_chunks([_probe(60), _probe(59.92)], chunks[:2]) == [
+        "chunk 2 lasts 59.920s, planned 60.000s"]
+
+def test_check_chunks_flags_quality_outliers():
+    chunks = [(0.0, 60.0), (60.0, 120.0), (120.0, 180.0)]
+    keyframes = [(0.0, 0), (60.0, 12_000_000), (120.0, 24_000_000)]
+    source = chunked_encode.source_bytes(keyframes, 36_000_000, chunks)
+    assert source == [12_000_000] * 3
+    assert chunked_encode.check_chunks([_probe(60)] * 3, chunks, source) == []
+    # Right parameters and length, but a third of the bits of its neighbours
+    starved = _probe(60, size=1_500_000)
+    assert chunked_encode.check_chunks([_probe(60), starved, _probe(60)], chunks, source) == [
+        "chunk 2 compresses at 0.12x the source, median 0.50x"]
+    # A busy span legitimately needs more bits: judged against its own source bytes
+    busy = [12_000_000, 30_000_000, 12_000_000]
+    assert chunked_encode.check_chunks([_probe(60), _probe(60, size=15_000_000), _probe(60)], chunks, busy) == []
+
+async def test_encode_in_chunks_joins_parallel_chunks(tmp_path):
+    out = str(tmp_path / "out.mp4")
+    cmd = CMD[:-1] + [out]
+    commands = []
+
+    async def fake_ffmpeg(argv, timeout=None, duration=None, label=""):
+        commands.append(argv)
+        with open(argv[-1], "wb") as f:
+            f.write(b"x" * 2000)
+        return 0, []
+
+    def fake_probe(path, use_cache=True):
+        if path == "in.mp4" or path == out:
+            return _probe(700.0)
+        return _probe(40.0 if path.endswith("chunk_0011.mp4") else 60.0)
+
+    keyframes = {"keyframes": [(i * 2.0, 0) for i in range(350)], "total": 0}
+    with patch('src.chunked_encode.probe_video', side_effect=fake_probe), \
+         patch('src.chunked_encode.keyframe_index', return_value=keyframes), \
+         patch('src.chunked_encode.run_ffmpeg_async', side_effect=fake_ffmpeg):
+        assert await chunked_encode.encode_in_chunks(cmd, "libx264", 700.0, SETTINGS)
+
+    encodes, join = commands[:-1], commands[-1]
+    assert len(encodes) == 13                         # 12 video chunks + audio
+    assert join[join.index("-f") + 1] == "concat" and join[join.index("-c") + 1] == "copy"
+    assert join[-1] == out and not (tmp_path / "out.mp4.chunks").exists()
+
+async def test_encode_in_chunks_not_applicable():
+    assert not await chunked_encode.encode_in_chunks(CMD, "libx264", 300.0, SETTINGS)
+    assert not await chunked_encode.encode_in_chunks(CMD, "h264_videotoolbox", 7200.0, SETTINGS)
+    assert not await chunked_encode.encode_in_chunks(CMD, "libx264", 7200.0, dict(SETTINGS, chunk_workers=1))
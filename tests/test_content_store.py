@@ -0,0 +1,64 @@
+import os
+import json
+from src.content_store import ContentStore, ContentJournal
+
+def test_indexed_lookups_and_rebuild(tmp_path):
+    content = tmp_path / "scraped_content.json"
+    content.write_text(json.dumps({
+        "https://site/lesson-1": {"title": "One", "video_url": "https://fast.wistia.net/1", "course_url": "https://site/lesson-1", "html": "<p>x</p>"},
+        "https://fast.wistia.net/2": {"title": "Two", "description": "d2"},
+    }), encoding="utf-8")
+    store = ContentStore(str(content))
+
+    assert store.get("https://fast.wistia.net/2")["title"] == "Two"
+    assert store.get("https://fast.wistia.net/1")["title"] == "One"
+    assert store.get("https://site/lesson-1")["title"] == "One"
+    assert store.get("https://missing") is None
+    assert not store.sync()  # unchanged file: no rebuild
+
+    content.write_text(json.dumps({"https://fast.wistia.net/3": {"title": "Three"}}), encoding="utf-8")
+    st = os.stat(content)
+    os.utime(content, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert store.get("https://fast.wistia.net/3")["title"] == "Three"
+    assert store.get("https://fast.wistia.net/2") is None
+    assert len(store) == 1
+
+def test_journal_compaction_and_recovery(tmp_path):
+    content = tmp_path / "scraped_content.json"
+    content.write_text(json.dumps({"https://site/old": {"title": "Old"}}), encoding="utf-8")
+
+    journal = ContentJournal(str(content))
+    for i in range(3):
+        journal.put(f"https://site/{i}", {"title": f"L{i}", "video_url": f"https://v/{i}"})
+    # Not compacted yet, but readers already see the journaled records
+    assert len(json.loads(content.read_text(encoding="utf-8"))) == 1
+    assert ContentStore(str(content)).get("https://v/2")["title"] == "L2"
+
+    # Interrupted run: a new writer folds the leftover journal in on open
+    ContentJournal(str(content))
+    data = json.loads(content.read_text(encoding="utf-8"))
+    assert set(data) == {"https://site/old", "https://site/0", "https://site/1", "https://site/2"}
+    assert not os.path.exists(journal.journal_file)
+
+def test_journal_applied_incrementally_without_reloading(tmp_path, monkeypatch):
+    import src.content_store as content_store
+    content = tmp_path / "scraped_content.json"
+    content.write_text(json.dumps({"https://site/old": {"title": "Old", "html": "<p>big</p>"}}), encoding="utf-8")
+    store = ContentStore(str(content))
+    assert store.get("https://site/old") == {"title": "Old"}  # html is not mirrored
+
+    loads = []
+    real_load = json.load
+    monkeypatch.setattr(content_store.json, "load", lambda f, *a, **k: loads.append(f.name) or real_load(f, *a, **k))
+    monkeypatch.setattr(content_store, "COMPACT_MIN_RECORDS", 2)
+
+    journal = ContentJournal(str(content))
+    journal.put("https://site/0", {"title": "L0", "video_url": "https://v/0", "html": "<p>0</p>"})
+    assert store.get("https://v/0") == {"title": "L0", "video_url": "https://v/0"}
+    journal.put("https://site/1", {"title": "L1", "video_url": "https://v/1"})  # compacts
+    assert not os.path.exists(journal.journal_file)
+    journal.put("https://site/2", {"title": "L2", "video_url": "https://v/2"})
+    assert store.get("https://v/2")["title"] == "L2"
+    assert store.get("https://v/1")["title"] == "L1"
+    # Only the writer read the base file; the store followed the journal and the compaction
+    assert [n for n in loads if n == str(content)] == [str(content)] * 2
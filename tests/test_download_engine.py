@@ -0,0 +1,101 @@
+import threading
+import time
+from src.download_engine import BandwidthLimiter, DownloadEngine
+
+SETTINGS = {"max_concurrent": 4, "per_host_limit": 2, "fragment_concurrency": 8, "rate_limit_mb": 1, "retries": 5}
+
+def test_ydl_opts_resume_fragments_and_cap():
+    engine = DownloadEngine(SETTINGS)
+    opts = engine.ydl_opts("out.mp4")
+    assert opts["continuedl"] and not opts["overwrites"]
+    assert opts["concurrent_fragment_downloads"] == 8
+    assert opts["ratelimit"] == 1024 * 1024
+    assert opts["fragment_retries"] == 5
+    assert not engine.ydl_opts("out.mp4", force=True)["continuedl"]
+
+def test_per_host_limit():
+    engine = DownloadEngine(SETTINGS)
+    running = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def job(url):
+        with engine.host_slot(url):
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            time.sleep(0.05)
+            with lock:
+                running["now"] -= 1
+
+    threads = [threading.Thread(target=job, args=("https://fast.wistia.net/embed/iframe/x",)) for _ in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert running["max"] == 2
+
+def test_bandwidth_limiter_shared_budget():
+    limiter = BandwidthLimiter(rate=1000, burst_seconds=0.1)
+    assert limiter.consume(100) == 0
+    waited = limiter.consume(200)
+    assert 0.15 < waited < 0.3
+
+    engine = DownloadEngine(SETTINGS)
+    charged = []
+    engine.limiter.consume = charged.append
+    hook = engine.throttle_hook()
+    # a.part resumed at 500 bytes: only new bytes are charged
+    hook({"status": "downloading", "tmpfilename": "a.part", "downloaded_bytes": 500})
+    hook({"status": "downloading", "tmpfilename": "a.part", "downloaded_bytes": 800})
+    hook({"status": "downloading", "tmpfilename": "b.part", "downloaded_bytes": 0})
+    hook({"status": "downloading", "tmpfilename": "b.part", "downloaded_bytes": 100})
+    assert charged == [300, 100]
+
+def test_download_stats_counts_and_eta():
+    from src.download_engine import DownloadStats
+    stats = DownloadStats(total=4)
+    stats.start_time -= 10
+    stats.job_started(); stats.job_started(); stats.job_started()
+    stats.job_finished(True); stats.job_finished(False)
+    stats.add_bytes(5 * 1024 * 1024)
+
+    snap = stats.snapshot()
+    assert (snap["active"], snap["queued"], snap["done"], snap["failed"]) == (1, 1, 1, 1)
+    assert 9 < snap["eta"] < 11
+    assert 0.4 < snap["mb_per_sec"] < 0.6
+    assert "1 active, 1 queued, 1 failed" in stats.summary()
+
+def test_streaming_scheduler_bounds_in_flight_jobs(tmp_path, monkeypatch):
+    import threading
+    from scripts import scraper
+    from src.manifest_parser import parse_manifest_file
+
+    manifest = tmp_path / "downloaded_video.txt"
+    manifest.write_text("".join(f"{i:03d}_Video {i} | https://example.com/{i}\n" for i in range(1, 21)), encoding="utf-8")
+    state = {"running": 0, "peak": 0, "calls": 0}
+    lock = threading.Lock()
+
+    def fake_download(url, title, index_str, course, section, pbar, force, media_lib, engine):
+        with lock:
+            state["calls"] += 1
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.01)
+        pbar.close()
+        with lock:
+            state["running"] -= 1
+        return index_str != "007"
+
+    monkeypatch.setattr(scraper, "MANIFEST_FILE", str(manifest))
+    monkeypatch.setattr(scraper, "OUTPUT_DIR", str(tmp_path / "downloads"))
+    monkeypatch.setattr(scraper, "FAILED_LOG", str(tmp_path / "failed.txt"))
+    monkeypatch.setattr(scraper, "load_manifest", parse_manifest_file)
+    monkeypatch.setattr(scraper, "MediaLibrary", lambda: type("Lib", (), {"build_index": lambda self: None})())
+    monkeypatch.setattr(scraper, "DownloadEngine", lambda: DownloadEngine(SETTINGS))
+    monkeypatch.setattr(scraper, "_download_single", fake_download)
+    marked = []
+    monkeypatch.setattr(scraper.manifest_mgr, "mark_video_completed", lambda idx, url=None: marked.append(idx))
+    monkeypatch.setattr(scraper.manifest_mgr, "flush", lambda: None)
+
+    scraper.download_videos()
+    assert state["calls"] == 20 and state["peak"] <= SETTINGS["max_concurrent"]
+    assert len(marked) == 19 and "007" not in marked
+    assert "007 | Video 7" in (tmp_path / "failed.txt").read_text(encoding="utf-8")
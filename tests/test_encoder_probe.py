@@ -0,0 +1,46 @@
+from unittest.mock import patch, MagicMock
+from src import encoder_probe, video_utils
+
+ENCODERS_OUTPUT = """Encoders:
+ V....D h264_nvenc           NVIDIA NVENC H.264 encoder (codec h264)
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10 (codec h264)
+ V....D libx265              libx265 H.265 / HEVC (codec hevc)
+"""
+
+def _fake_run(calls):
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        if cmd[:2] == ["ffmpeg", "-version"]:
+            return MagicMock(returncode=0, stdout="ffmpeg version 6.1.1 Copyright (c)\nbuilt with gcc")
+        if "-encoders" in cmd:
+            return MagicMock(returncode=0, stdout=ENCODERS_OUTPUT)
+        encoder = cmd[cmd.index("-c:v") + 1]
+        if encoder == "h264_nvenc":
+            return MagicMock(returncode=1, stderr="Cannot load libcuda.so.1")
+        return MagicMock(returncode=0, stderr="")
+    return run
+
+def test_probe_picks_fastest_working_encoder_and_caches(tmp_path):
+    cache_file = str(tmp_path / "encoders.json")
+    calls = []
+    clock = iter([0.0, 1.0, 10.0, 12.0, 20.0, 20.5])   # nvenc (fails), libx265: 2s, libx264: 0.5s
+    with patch('src.encoder_probe.shutil.which', return_value="/usr/bin/ffmpeg"), \
+         patch('src.encoder_probe.subprocess.run', side_effect=_fake_run(calls)), \
+         patch('src.encoder_probe.time.monotonic', side_effect=lambda: next(clock)):
+        results = encoder_probe.probe_encoders(cache_file=cache_file)
+        assert not results["h264_nvenc"]["ok"] and "libcuda" in results["h264_nvenc"]["error"]
+        assert results["libx264"]["fps"] == 100.0 and results["libx265"]["fps"] == 25.0
+        assert encoder_probe.fastest_encoder(results) == "libx264"
+
+        # Same ffmpeg build: answered from the cache, only the version is asked
+        calls.clear()
+        assert encoder_probe.probe_encoders(cache_file=cache_file) == results
+        assert calls == [["ffmpeg", "-version"]]
+
+def test_fallbacks():
+    assert encoder_probe.fastest_encoder({}) == "libx264"
+    with patch('src.encoder_probe.shutil.which', return_value=None):
+        assert encoder_probe.probe_encoders() == {}
+    with patch('src.video_utils._hw_encoder_cache', None), \
+         patch('src.encoder_probe.probe_encoders', return_value={"h264_nvenc": {"ok": False, "fps": 0.0}}):
+        assert video_utils.detect_hw_encoder() == "libx264"
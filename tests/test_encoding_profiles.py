@@ -0,0 +1,40 @@
+from src.encoding_profiles import build_encode_command, dedupe_options, get_profile
+
+SETTINGS = {"encoding_preset": "veryfast", "crf_quality": 21, "profiles": {"bot-720p": {"crf": 26}}}
+
+def _opt(argv, flag):
+    return argv[argv.index(flag) + 1]
+
+def test_profiles_take_config_and_overrides():
+    bot = get_profile("bot", 720, SETTINGS)
+    assert (bot.width, bot.height, bot.preset, bot.crf) == (1280, 720, "veryfast", 26)
+    user = get_profile("user", 1080, SETTINGS)
+    assert (user.width, user.height, user.crf, user.max_size_mb) == (1920, 1080, 21, 1900)
+    split = get_profile("split-part", 1080, SETTINGS)
+    assert (split.width, split.height) == (1920, 1080)
+
+def test_build_encode_command_per_encoder():
+    profile = get_profile("user", 720, SETTINGS)
+    x264 = build_encode_command(profile, "in.mp4", "out.mp4", "libx264")
+    assert x264[:4] == ["ffmpeg", "-y", "-i", "in.mp4"] and x264[-1] == "out.mp4"
+    assert _opt(x264, "-preset") == "veryfast" and _opt(x264, "-crf") == "21"
+    assert _opt(x264, "-vf").startswith("fps=25,scale=1280:720")
+
+    x265 = build_encode_command(profile, "in.mp4", "out.mp4", "libx265")
+    assert _opt(x265, "-crf") == "23" and _opt(x265, "-tag:v") == "hvc1"
+    vt = build_encode_command(profile, "in.mp4", "out.mp4", "h264_videotoolbox")
+    assert _opt(vt, "-q:v") == "71" and "-crf" not in vt
+
+def test_intro_part_command():
+    profile = get_profile("split-part", 720, SETTINGS)
+    argv = build_encode_command(profile, "in.mp4", "p1.mp4", "libx264", intro_path="intro.mp4", start=0, duration=300)
+    # Seek/length cut the source only
+    assert argv[:10] == ["ffmpeg", "-y", "-i", "intro.mp4", "-ss", "0", "-t", "300", "-i", "in.mp4"]
+    assert "concat=n=2" in _opt(argv, "-filter_complex") and argv.count("-map") == 2
+    assert "-vf" not in argv
+
+def test_dedupe_keeps_last_value():
+    argv = ["ffmpeg", "-y", "-i", "in.mp4", "-preset", "fast", "-crf", "23", "-an",
+            "-map", "0:v", "-map", "0:a", "-crf", "28", "out.mp4"]
+    assert dedupe_options(argv) == ["ffmpeg", "-y", "-i", "in.mp4", "-preset", "fast", "-an",
+                                    "-map", "0:v", "-map", "0:a", "-crf", "28", "out.mp4"]
@@ -0,0 +1,59 @@
+from src.fuzzy_matcher import TrigramIndex, similarity, STRICT_MIN_SCORE
+
+def test_exact_and_fuzzy_lookups():
+    index = TrigramIndex([
+        ("welcometothecourse", "a.mp4"),
+        ("settingupyourworkspace", "b.mp4"),
+        ("colorgradingpart1", "c1.mp4"),
+        ("colorgradingpart2", "c2.mp4"),
+    ])
+    assert index.get("welcometothecourse") == "a.mp4"
+    assert index.best("welcometothecourse") == "a.mp4"
+    # Retitled / typo'd lesson still finds its file
+    assert index.best("welcometothiscourse") == "a.mp4"
+    assert index.best("settingupyourworkspaces") == "b.mp4"
+    # Digits have to agree
+    assert index.best("colorgradingpart2") == "c2.mp4"
+    assert index.best("colorgradingpart3") is None
+    assert index.best("somethingelseentirely") is None
+
+    value, score, key = index.search("settingupworkspace", limit=1, min_score=0.5)[0]
+    assert (value, key) == ("b.mp4", "settingupyourworkspace") and 0.5 < score < 1.0
+
+def test_add_replaces_and_similarity():
+    index = TrigramIndex()
+    index.add("intro", 1)
+    index.add("intro", 2)
+    index.add("", 3)
+    assert len(index) == 1 and index.get("intro") == 2
+    assert similarity("abc", "abc") == 1.0
+    assert similarity("abc", "") == 0.0
+
+def test_media_library_find_is_exact(monkeypatch):
+    from src.media_library import MediaLibrary
+    lib = MediaLibrary.__new__(MediaLibrary)
+    lib.index = TrigramIndex([("masteringthecameraangles", "/m/001_Mastering the Camera Angles.mp4")])
+    assert lib.find_file("Mastering the Camera Angles") == "/m/001_Mastering the Camera Angles.mp4"
+    assert lib.find_file("Mastering The Camera Angles!") == "/m/001_Mastering the Camera Angles.mp4"
+    assert lib.find_file("Mastering the Lighting") is None
+    # A near-identical title can be a different lesson: never skipped, only reported
+    lib.index.add("editingworkflowinpremierepro", "/m/002_Editing Workflow in Premiere Pro.mp4")
+    assert lib.find_file("Editing Workflow in Premiere Pro CC") is None
+    path, score = lib.find_similar("Editing Workflow in Premiere Pro CC")
+    assert path == "/m/002_Editing Workflow in Premiere Pro.mp4" and score >= 0.85
+    assert lib.find_similar("Mastering the Lighting") is None
+
+def test_unique_match_for_rewrites():
+    index = TrigramIndex([
+        ("settinguptheprojectstructure", "012"),
+        ("exportingforyoutube", "020"),
+        ("exportingforyoutubepart", "021"),
+    ])
+    assert index.unique("settinguptheprojectstructure") == "012"
+    # Close enough for a loose lookup, but not for renumbering a lesson
+    assert index.best("settinguptheteststructure") == "012"
+    assert index.unique("settinguptheteststructure", STRICT_MIN_SCORE) is None
+    assert index.unique("settinguptheproject", STRICT_MIN_SCORE) is None
+    assert index.unique("settinguptheprojectstructures", STRICT_MIN_SCORE) == "012"
+    # Two candidates above the threshold: ambiguous
+    assert index.unique("exportingforyoutubeparts", 0.8) is None
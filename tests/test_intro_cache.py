@@ -0,0 +1,77 @@
+import os
+from unittest.mock import patch
+from src import video_utils
+
+def _fake_render(calls):
+    def render(title, path, *args):
+        calls.append((title, args))
+        with open(path, "wb") as f:
+            f.write(b"intro")
+        return True
+    return render
+
+def test_intro_clip_is_rendered_once(tmp_path):
+    calls = []
+    with patch('src.video_utils.get_path', return_value=str(tmp_path)), \
+         patch('src.video_utils.create_intro_video', side_effect=_fake_render(calls)):
+        first = video_utils.intro_clip("Lesson 1", 1280, 720, 25)
+        again = video_utils.intro_clip("Lesson 1", 1280, 720, 25)
+        other_res = video_utils.intro_clip("Lesson 1", 1920, 1080, 25)
+        other_title = video_utils.intro_clip("Lesson 2", 1280, 720, 25)
+    assert first == again and os.path.exists(first)
+    assert len({first, other_res, other_title}) == 3
+    assert len(calls) == 3
+    # Only finished clips are left in the cache
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in (first, other_res, other_title))
+
+def test_failed_render_is_not_cached(tmp_path):
+    with patch('src.video_utils.get_path', return_value=str(tmp_path)), \
+         patch('src.video_utils.create_intro_video', return_value=False):
+        assert video_utils.intro_clip("Lesson 1", 1280, 720, 25) is None
+    assert os.listdir(tmp_path) == []
+
+def _source_probe(**video):
+    stream = {'codec_type': 'video', 'codec_name': 'h264', 'profile': 'High', 'level': 31, 'refs': 1,
+              'has_b_frames': 2, 'pix_fmt': 'yuv420p', 'width': 1280, 'height': 720,
+              'r_frame_rate': '30000/1001', 'is_avc': 'true', 'nal_length_size': '4'}
+    stream.update(video)
+    return {
+        'width': 1280, 'height': 720, 'duration': 600.0,
+        'streams': [stream, {'codec_type': 'audio', 'codec_name': 'aac', 'profile': 'LC',
+                             'sample_rate': '48000', 'channels': 1}],
+    }
+
+def test_intro_matching_uses_source_stream_format():
+    source = _source_probe()
+    with patch('src.video_utils.intro_clip', return_value="intro.mp4") as clip, \
+         patch('src.video_utils.probe_video', return_value=_source_probe()):
+        assert video_utils.intro_matching("Lesson", source) == "intro.mp4"
+    args, kwargs = clip.call_args
+    assert args[:5] == ("Lesson", 1280, 720, '30000/1001', "libx264")
+    assert args[5] == ["-profile:v", "high", "-level:v", "3.1", "-refs", "1"]
+    assert args[6:] == (48000, 1) and kwargs == {'pix_fmt': 'yuv420p'}
+
+def test_intro_not_joined_when_codec_parameters_differ():
+    # x264 could not honour the source's level/profile: joining would corrupt the decode
+    for intro in (_source_probe(level=40), _source_probe(profile='Main'), _source_probe(pix_fmt='yuvj420p')):
+        with patch('src.video_utils.intro_clip', return_value="intro.mp4"), \
+             patch('src.video_utils.probe_video', return_value=intro):
+            assert video_utils.intro_matching("Lesson", _source_probe()) is None
+    # Not H.264 or level unknown: no attempt at all
+    with patch('src.video_utils.intro_clip') as clip:
+        assert video_utils.intro_matching("Lesson", _source_probe(level=None)) is None
+    clip.assert_not_called()
+
+async def test_join_with_decode_errors_is_discarded(tmp_path):
+    output = tmp_path / "out.mp4"
+
+    async def fake_ffmpeg(cmd, timeout=None, duration=None, label=""):
+        if "concat" in cmd:
+            output.write_bytes(b"x" * 5000)
+            return 0, []
+        return 0, ["[h264 @ 0x1] non-existing PPS 0 referenced"]
+
+    with patch('src.video_utils.run_ffmpeg_async', side_effect=fake_ffmpeg), \
+         patch('src.video_utils.probe_video', return_value={'duration': 602.0}):
+        ok = await video_utils.concat_copy([str(tmp_path / "intro.mp4"), "in.mp4"], str(output), 602.0)
+    assert not ok and not output.exists()
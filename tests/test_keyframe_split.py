@@ -0,0 +1,54 @@
+from unittest.mock import patch, MagicMock
+from src import ffmpeg_tools, video_utils
+
+MB = 1024 * 1024
+
+def _keyframes(seconds=100, gop=10, bytes_per_sec=100_000):
+    return [(float(t), t * bytes_per_sec) for t in range(0, seconds, gop)], seconds * bytes_per_sec
+
+def test_plan_split_respects_budget():
+    keyframes, total = _keyframes()
+    starts = video_utils.plan_split(keyframes, total, budget_bytes=3_500_000)
+    assert starts == [0.0, 30.0, 60.0, 90.0]
+    bounds = [int(t * 100_000) for t in starts] + [total]
+    assert all(b - a <= 3_500_000 for a, b in zip(bounds, bounds[1:]))
+    # Fits already: a single part
+    assert video_utils.plan_split(keyframes, total, budget_bytes=total) == [0.0]
+    # One GOP (1MB) is larger than the budget: cannot cut by copy
+    assert video_utils.plan_split(keyframes, total, budget_bytes=500_000) is None
+
+def test_keyframe_index_counts_all_streams():
+    out = "\n".join([
+        "stream_index=0|pts_time=0.000000|dts_time=0.000000|size=1000|flags=K__",
+        "stream_index=1|pts_time=0.000000|dts_time=0.000000|size=200|flags=K__",
+        "stream_index=0|pts_time=0.040000|dts_time=0.040000|size=300|flags=___",
+        "stream_index=0|pts_time=2.000000|dts_time=2.000000|size=900|flags=K__",
+    ])
+    with patch('src.ffmpeg_tools.subprocess.run', return_value=MagicMock(returncode=0, stdout=out)):
+        index = ffmpeg_tools.keyframe_index("in.mp4")
+    assert index == {"keyframes": [(0.0, 0), (2.0, 1500)], "total": 2400}
+
+async def test_split_by_keyframes_stream_copies(tmp_path):
+    keyframes, total = _keyframes(bytes_per_sec=int(0.5 * MB))
+    probe = {'codec': 'h264', 'has_audio': True, 'audio_codec': 'aac', 'duration': 100.0, 'streams': []}
+    commands = []
+
+    async def fake_ffmpeg(cmd, timeout=None, duration=None, label=""):
+        commands.append(cmd)
+        for i in range(len(cmd[cmd.index("-segment_times") + 1].split(",")) + 1):
+            (tmp_path / f"Lesson_part{i + 1:02d}.mp4").write_bytes(b"x" * 2000)
+        return 0, []
+
+    with patch('src.video_utils.probe_video', return_value=probe), \
+         patch('src.video_utils.keyframe_index', return_value={"keyframes": keyframes, "total": total}), \
+         patch('src.video_utils.run_ffmpeg_async', side_effect=fake_ffmpeg):
+        parts = await video_utils.split_by_keyframes("in.mp4", str(tmp_path), "Lesson_part", target_size_mb=30)
+
+    assert [p.rsplit("/", 1)[1] for p in parts] == ["Lesson_part01.mp4", "Lesson_part02.mp4"]
+    cmd = commands[0]
+    assert len(commands) == 1 and cmd[cmd.index("-c") + 1] == "copy"
+    assert cmd[cmd.index("-segment_times") + 1] == "49.999000"
+
+    # Not MP4-safe: caller falls back to the re-encoding splitter
+    with patch('src.video_utils.probe_video', return_value=dict(probe, codec='vp9')):
+        assert await video_utils.split_by_keyframes("in.mkv", str(tmp_path), "x", 20) is None
@@ -0,0 +1,48 @@
+import os
+from src.manifest_parser import load_manifest, parse_manifest_file
+
+MANIFEST = """# Index_Title | URL
+# To skip a video, delete the line or put a '#' at the start
+
+# === Course A (4 videos) ===
+
+## --- Basics ---
+001_Intro | https://example.com/a/1
+# [DONE] 002 | Setup | https://example.com/a/2 | ✅ UPLOADED (msg_id: 7)
+### Extras
+039_1_Bonus | https://example.com/a/3/
+# 040_Skipped | https://example.com/a/4
+
+# === Course B (1 videos) ===
+005 | Other | https://example.com/b/5 | Course B | Advanced
+"""
+
+def test_parse_formats_and_maps(tmp_path):
+    path = tmp_path / "downloaded_video.txt"
+    path.write_text(MANIFEST, encoding="utf-8")
+    manifest = parse_manifest_file(str(path))
+
+    assert [e.index for e in manifest.entries] == ["001", "002", "039_1", "040", "005"]
+    first, done, bonus, skipped, other = manifest.entries
+    assert (first.course, first.section, first.title) == ("Course A", "Basics", "Intro")
+    assert done.is_done and done.status == "UPLOADED" and done.msg_id == 7
+    assert bonus.subsection == "Extras" and bonus.number == "039"
+    assert skipped.skipped and "040" not in manifest.by_index
+    assert (other.course, other.section) == ("Course B", "Advanced")
+
+    assert manifest.find("039") is bonus
+    assert manifest.get_by_url("https://example.com/a/3") is bonus
+    assert manifest.course_counts["Course A"] == 4
+
+def test_load_manifest_cached_by_mtime(tmp_path):
+    path = tmp_path / "downloaded_video.txt"
+    path.write_text(MANIFEST, encoding="utf-8")
+    first = load_manifest(str(path))
+    assert load_manifest(str(path)) is first
+
+    path.write_text(MANIFEST + "006_New | https://example.com/b/6\n", encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    reloaded = load_manifest(str(path))
+    assert reloaded is not first
+    assert reloaded.find("006").title == "New"
@@ -0,0 +1,110 @@
+import concurrent.futures
+from src.manifest_manager import ManifestManager
+from src.manifest_store import ManifestStore
+
+VIDEOS = [
+    {"url": f"https://example.com/lesson/{i}/", "title": f"Lesson {i}", "course_title": "Course A", "section": "Intro"}
+    for i in range(1, 6)
+]
+
+def _write_manifest(path):
+    path.write_text(
+        "# Index_Title | URL\n"
+        "\n# === Course A (3 videos) ===\n"
+        "\n## --- Intro ---\n"
+        "001_Lesson 1 | https://example.com/lesson/1\n"
+        "# [DONE] 002_Lesson 2 | https://example.com/lesson/2\n"
+        "# 003_Lesson 3 | https://example.com/lesson/3\n",
+        encoding="utf-8"
+    )
+
+def test_import_and_indexed_updates(tmp_path):
+    manifest = tmp_path / "downloaded_video.txt"
+    _write_manifest(manifest)
+    store = ManifestStore(str(manifest), render_interval=0)
+
+    entries = store.all()
+    assert [e['index'] for e in entries] == ["001", "002", "003"]
+    assert entries[0]['course_title'] == "Course A"
+    assert entries[1]['is_done'] and entries[2]['skipped']
+    assert store.get_by_url("https://example.com/lesson/1/")['index'] == "001"
+
+    assert store.mark_done("001")
+    assert store.set_status("002", "UPLOADED", msg_id=42)
+    assert not store.mark_done("999")
+    text = manifest.read_text(encoding="utf-8")
+    assert "# [DONE] 001_Lesson 1 | https://example.com/lesson/1" in text
+    assert "# 003_Lesson 3" in text
+    assert store.get("002")['msg_id'] == 42
+
+    # Manual edit of the text file is picked up; upload status survives the import
+    manifest.write_text(text.replace("# [DONE] 001_Lesson 1", "001_Lesson 1"), encoding="utf-8")
+    assert not store.get("001")['is_done']
+    assert store.get("002")['status'] == "UPLOADED"
+
+def test_manager_concurrent_marks(tmp_path):
+    mgr = ManifestManager(storage_dir=str(tmp_path))
+    mgr.save_manifest(VIDEOS)
+    entries = mgr.store.all()
+    assert len(entries) == 5
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(lambda e: mgr.mark_video_completed("999", url=e['url']), entries))
+    mgr.flush()
+
+    text = (tmp_path / "downloaded_video.txt").read_text(encoding="utf-8")
+    assert text.count("# [DONE]") == 5
+    assert len(list(tmp_path.glob("downloaded_video_backup_*.txt"))) <= 1
+
+def test_rendered_status_round_trips(tmp_path):
+    from src.manifest_parser import load_manifest
+    manifest = tmp_path / "downloaded_video.txt"
+    _write_manifest(manifest)
+    store = ManifestStore(str(manifest), render_interval=0)
+    assert store.set_status("001", "UPLOADED", msg_id=42)
+    assert store.set_status("002", "FAILED")
+
+    text = manifest.read_text(encoding="utf-8")
+    assert "001_Lesson 1 | https://example.com/lesson/1 | ✅ UPLOADED (msg_id: 42)" in text
+    parsed = load_manifest(str(manifest))
+    assert (parsed.find("001").status, parsed.find("001").msg_id) == ("UPLOADED", 42)
+    assert parsed.find("002").status == "FAILED" and parsed.find("002").is_done
+    assert parsed.get_by_url("https://example.com/lesson/3").status is None
+
+def test_hand_edit_keeps_unrendered_marks(tmp_path):
+    manifest = tmp_path / "downloaded_video.txt"
+    _write_manifest(manifest)
+    store = ManifestStore(str(manifest), render_interval=3600)
+    store.replace_all(store.all())     # rendered now: the next render is an hour away
+
+    # Inside the render debounce: marks are only in the database
+    assert store.mark_done("001")
+    assert store.set_status("002", "UPLOADED", msg_id=7)
+    assert "# [DONE] 001_" not in manifest.read_text(encoding="utf-8")
+
+    with open(manifest, "a", encoding="utf-8") as f:
+        f.write("004_Lesson 4 | https://example.com/lesson/4\n")
+    entries = {e['index']: e for e in store.all()}
+    assert set(entries) == {"001", "002", "003", "004"}
+    assert entries["001"]['is_done']
+    assert (entries["002"]['status'], entries["002"]['msg_id']) == ("UPLOADED", 7)
+
+    store.flush()
+    text = manifest.read_text(encoding="utf-8")
+    assert "# [DONE] 001_Lesson 1" in text and "004_Lesson 4" in text
+
+def test_checkpoint_upserts_only_new_lessons(tmp_path):
+    mgr = ManifestManager(storage_dir=str(tmp_path))
+    mgr.save_manifest(VIDEOS[:3])
+    mgr.store.mark_done(url=VIDEOS[0]['url'])
+
+    calls = []
+    real_replace_all = mgr.store.replace_all
+    mgr.store.replace_all = lambda entries: calls.append(len(entries)) or real_replace_all(entries)
+    renamed = dict(VIDEOS[0], title="Lesson 1 (renamed)")
+    assert mgr.checkpoint([renamed] + VIDEOS[3:]) == 3
+    assert calls == []  # no whole-manifest rewrite
+
+    entries = mgr.store.all()
+    assert [e['title'] for e in entries] == ["Lesson 1 (renamed)", "Lesson 2", "Lesson 3", "Lesson 4", "Lesson 5"]
+    assert entries[0]['is_done']
@@ -0,0 +1,46 @@
+import os
+from unittest.mock import patch
+from src.media_index import MediaIndex
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x")
+
+def test_incremental_refresh_and_lookups(tmp_path):
+    root = tmp_path / "drive"
+    _touch(root / "Course A" / "Intro" / "001_Welcome Video.mp4")
+    _touch(root / "Course A" / "processed" / "001_Welcome Video.mp4")
+    _touch(root / "Course B" / "002_Other.mkv")
+    _touch(root / "Course B" / "._002_Other.mkv")
+    _touch(root / "Course B" / "notes.txt")
+
+    index = MediaIndex(str(tmp_path / "media.db"))
+    names = [name for name, _ in index.videos([str(root)], exclude_dirs=("processed",))]
+    assert names == ["001_Welcome Video.mp4", "002_Other.mkv"]
+    assert index.find_by_title("Welcome Video", [str(root)]).endswith(os.path.join("Intro", "001_Welcome Video.mp4"))
+
+    # Only the directory that changed is listed again
+    _touch(root / "Course B" / "003_New.mp4")
+    scanned = []
+    original = MediaIndex._scan_dir
+    with patch.object(MediaIndex, "_scan_dir", staticmethod(lambda d, r: scanned.append(d) or original(d, r))):
+        index.refresh([str(root)], max_age=0)
+    assert scanned == [str(root / "Course B")]
+    assert index.find_by_name("003_New.mp4", [str(root)])
+
+    # A fresh process reuses the stored index; a removed directory drops its files
+    for f in (root / "Course A" / "processed").iterdir():
+        f.unlink()
+    (root / "Course A" / "processed").rmdir()
+    reopened = MediaIndex(str(tmp_path / "media.db"))
+    assert len(reopened.videos([str(root)])) == 3
+
+def test_miss_picks_up_new_file(tmp_path):
+    root = tmp_path / "drive"
+    _touch(root / "001_A.mp4")
+    index = MediaIndex(str(tmp_path / "media.db"))
+    assert index.videos([str(root)])
+    _touch(root / "002_B.mp4")
+    with patch("src.media_index.MISS_REFRESH_INTERVAL", 0):
+        assert index.find_by_name("002_B.mp4", [str(root)])
+    assert index.find_by_name("404.mp4", [str(root)]) is None
@@ -0,0 +1,114 @@
+import os
+from src.asset_downloader import AssetDownloader, AssetJob
+from src.blob_store import BlobStore
+from src.http_client import ResponseCache
+from src.page_archiver import archive_page
+
+class FakeResponse:
+    def __init__(self, content=b"", status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+        self.text = content.decode("utf-8")
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        self.calls.append((url, headers or {}))
+        return self.responses[url](headers or {})
+
+def test_archive_uses_prefetched_html(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    html = ('<html><title>T</title><img src="/a.png"><img src="https://cdn.example.com/a.png">'
+            '<a href="/notes.pdf">Notes</a></html>')
+    session = FakeSession({
+        "https://example.com/a.png": lambda h: FakeResponse(b"png"),
+        "https://cdn.example.com/a.png": lambda h: FakeResponse(b"cdn-png"),
+        "https://example.com/notes.pdf": lambda h: FakeResponse(b"pdf"),
+    })
+    result = archive_page("https://example.com/lesson", "Lesson", output_dir=str(tmp_path / "out"),
+                          html=html, session=session)
+
+    assert result['success']
+    assert len(session.calls) == 3
+    # Same basename from two URLs: both kept
+    first, second = [img['local_path'] for img in result['images']]
+    assert first == "images/a.png" and second.startswith("images/a_") and second.endswith(".png")
+    assert (tmp_path / "out" / second).read_bytes() == b"cdn-png"
+    assert (tmp_path / "out" / "index.html").read_text(encoding="utf-8") == html
+    assert (tmp_path / "out" / "attachments" / "notes.pdf").read_bytes() == b"pdf"
+
+def test_response_cache_revalidates(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    url = "https://example.com/page"
+
+    def respond(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return FakeResponse(status_code=304)
+        return FakeResponse(b"<html>v1</html>", headers={"ETag": '"v1"'})
+
+    session = FakeSession({url: respond})
+    assert cache.get(session, url) == (b"<html>v1</html>", "utf-8", False)
+    assert cache.get(session, url) == (b"<html>v1</html>", "utf-8", True)
+    assert session.calls[1][1]["If-None-Match"] == '"v1"'
+
+def test_asset_downloader_reuses_and_dedupes(tmp_path):
+    def logo(headers):
+        if headers.get("If-None-Match") == '"logo"':
+            return FakeResponse(status_code=304)
+        return FakeResponse(b"logo-bytes", headers={"ETag": '"logo"'})
+
+    session = FakeSession({
+        "https://cdn.example.com/logo.png": logo,
+        "https://other.example.com/copy.png": lambda h: FakeResponse(b"logo-bytes"),
+    })
+    store = BlobStore(str(tmp_path / "blobs"))
+    downloader = AssetDownloader(store=store, session=session)
+    jobs = [
+        AssetJob("https://cdn.example.com/logo.png", str(tmp_path / "p1" / "logo.png")),
+        AssetJob("https://cdn.example.com/logo.png", str(tmp_path / "p2" / "logo.png")),
+        AssetJob("https://other.example.com/copy.png", str(tmp_path / "p3" / "copy.png")),
+    ]
+    statuses = sorted(r.status for r in downloader.download_all(jobs))
+    assert statuses == ["deduped", "downloaded", "reused"]
+    assert len(session.calls) == 2
+    assert os.stat(tmp_path / "p1" / "logo.png").st_ino == os.stat(tmp_path / "p3" / "copy.png").st_ino
+    assert len(list((tmp_path / "blobs").glob("??/*"))) == 1
+
+    # Next run: the known URL is revalidated and its blob relinked
+    fresh = AssetDownloader(store=BlobStore(str(tmp_path / "blobs")), session=session)
+    result = fresh.download(AssetJob("https://cdn.example.com/logo.png", str(tmp_path / "p4" / "logo.png")))
+    assert result.status == "unchanged"
+    assert (tmp_path / "p4" / "logo.png").read_bytes() == b"logo-bytes"
+
+def test_page_charset_comes_from_the_document(tmp_path):
+    # text/html without a charset header: requests would guess ISO-8859-1
+    html = '<html><head><meta charset="utf-8"><title>درس اول</title></head><body></body></html>'.encode("utf-8")
+
+    def page(headers):
+        response = FakeResponse(html)
+        response.encoding = "ISO-8859-1"
+        response.text = html.decode("ISO-8859-1")
+        return response
+
+    session = FakeSession({"https://example.com/lesson": page})
+    result = archive_page("https://example.com/lesson", output_dir=str(tmp_path / "out"),
+                          session=session, use_cache=False)
+
+    assert result['title'] == "درس اول"
+    assert (tmp_path / "out" / "index.html").read_bytes() == html
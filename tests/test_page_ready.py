@@ -0,0 +1,38 @@
+import time
+from selenium.common.exceptions import NoSuchElementException
+from src.scrapers.page_ready import wait_for_page, page_stats
+
+class FakeDriver:
+    """Renders the selector match `delay` seconds after creation."""
+    def __init__(self, delay, source="<html></html>"):
+        self.ready_at = time.monotonic() + delay
+        self.page_source = source
+        self.queries = []
+
+    def execute_script(self, script):
+        return "complete"
+
+    def find_element(self, by, selector):
+        self.queries.append(selector)
+        if time.monotonic() < self.ready_at:
+            raise NoSuchElementException(selector)
+        return object()
+
+def test_returns_as_soon_as_ready():
+    page_stats.reset()
+    driver = FakeDriver(delay=0.2)
+    start = time.monotonic()
+    assert wait_for_page(driver, "lesson", timeout=5)
+    assert time.monotonic() - start < 1.5
+    assert ".post-body" in driver.queries[0]
+    assert "lesson: 1 pages" in page_stats.summary()
+
+def test_timeout_and_optional_condition():
+    page_stats.reset()
+    assert not wait_for_page(FakeDriver(delay=60), "section", timeout=0.3)
+    assert "1 timeouts" in page_stats.summary()
+
+    # No wistia on the page: the video condition is skipped without waiting
+    driver = FakeDriver(delay=60, source="<html>no video</html>")
+    assert wait_for_page(driver, "lesson_video")
+    assert driver.queries == []
@@ -0,0 +1,105 @@
+import json
+import random
+import time
+from unittest.mock import patch
+from src.scrapers import primary_scraper
+from src.scrapers.primary_scraper import PrimaryScraper
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.current_url = "about:blank"
+
+    def quit(self):
+        self.alive = False
+
+def _structure(n):
+    lessons = [{"title": f"Lesson {i}", "url": f"https://example.com/l/{i}", "subsection": None} for i in range(n)]
+    return [{"title": "Course A", "url": "https://example.com/c", "category": "Cat",
+             "sections": [{"title": "Intro", "lessons": lessons}]}]
+
+def test_parallel_scan_ordered_with_crash_recovery(tmp_path, monkeypatch):
+    monkeypatch.setenv("TARGET_SITE_BASE_URL", "https://example.com")
+    structure_file = tmp_path / "course_structure.json"
+    structure_file.write_text(json.dumps(_structure(12)), encoding="utf-8")
+    crashed = []
+
+    def extract(self, driver, url, default_title=None):
+        time.sleep(random.random() * 0.01)
+        if url.endswith("/5") and not crashed:
+            crashed.append(url)
+            driver.alive = False
+            del driver.current_url  # a dead browser raises on every call
+            raise RuntimeError("chrome not reachable")
+        return {"title": default_title, "url": url}
+
+    seen = []
+    with patch.object(primary_scraper, "STRUCTURE_FILE", str(structure_file)), \
+         patch.object(PrimaryScraper, "_shared_cookies", lambda self: []), \
+         patch.object(PrimaryScraper, "_fetch_lesson_http", lambda self, url, default_title=None: None), \
+         patch.object(PrimaryScraper, "_create_worker_driver", lambda self, cookies: FakeDriver()), \
+         patch.object(PrimaryScraper, "_extract_lesson_content", extract):
+        scraper = PrimaryScraper()
+        lessons = scraper.scan_content(offset=1, workers=4, callback=lambda d: seen.append(d["title"]))
+
+    expected = [f"Lesson {i}" for i in range(1, 12)]
+    assert [d["title"] for d in lessons] == expected
+    assert seen == expected
+    assert crashed and lessons[0]["course_title"] == "Course A"
+
+LESSON_HTML = """<html><head><title>Lesson | Site</title></head><body>
+<h1 class="post-title">Real Title</h1>
+<div class="post-body">Hello <a href="/files/notes.pdf">Notes</a></div>
+<iframe src="https://fast.wistia.net/embed/iframe/abc123"></iframe>
+</body></html>"""
+
+class FakeResponse:
+    def __init__(self, text, status_code=200, url="https://example.com/l/1"):
+        self.text, self.status_code, self.url = text, status_code, url
+
+def test_http_first_with_browser_fallback(monkeypatch):
+    monkeypatch.setenv("TARGET_SITE_BASE_URL", "https://example.com")
+    scraper = PrimaryScraper()
+    scraper.cookies = [{"name": "session", "value": "x", "domain": "example.com"}]
+    scraper.http_first = True
+    pages = {"https://example.com/l/1": LESSON_HTML, "https://example.com/l/2": "<html><div id='app'></div></html>"}
+    session = scraper._get_http_session()
+    assert session.cookies.get("session") == "x"
+
+    browser_calls = []
+    with patch.object(session, "get", lambda url, timeout=None: FakeResponse(pages[url], url=url)), \
+         patch.object(PrimaryScraper, "_extract_lesson_content",
+                      lambda self, driver, url, default_title=None: browser_calls.append(url) or {"title": default_title}):
+        data = scraper.fetch_lesson("https://example.com/l/1", "Default", get_driver=lambda: None)
+        assert data["title"] == "Real Title"
+        assert data["url"] == "https://fast.wistia.net/embed/iframe/abc123"
+        assert data["links"] == [{"text": "Notes", "url": "https://example.com/files/notes.pdf"}]
+        assert not browser_calls
+
+        # Client-rendered page: no content container in the HTML, so Chrome renders it
+        assert scraper.fetch_lesson("https://example.com/l/2", "Two", get_driver=lambda: None) == {"title": "Two"}
+        assert browser_calls == ["https://example.com/l/2"]
+    assert scraper.fetch_counts == {"http": 1, "browser": 1}
+
+def test_http_errors_do_not_retire_workers(tmp_path, monkeypatch):
+    monkeypatch.setenv("TARGET_SITE_BASE_URL", "https://example.com")
+    structure_file = tmp_path / "course_structure.json"
+    structure_file.write_text(json.dumps(_structure(3 * (primary_scraper.MAX_WORKER_RESTARTS + 2))), encoding="utf-8")
+
+    def fetch_http(self, url, default_title=None):
+        if int(url.rsplit("/", 1)[1]) % 3 == 0:
+            raise ConnectionError("connection reset")
+        return {"title": default_title, "url": url}
+
+    drivers = []
+    with patch.object(primary_scraper, "STRUCTURE_FILE", str(structure_file)), \
+         patch.object(PrimaryScraper, "_shared_cookies", lambda self: []), \
+         patch.object(PrimaryScraper, "_fetch_lesson_http", fetch_http), \
+         patch.object(PrimaryScraper, "_create_worker_driver", lambda self, cookies: drivers.append(1) or FakeDriver()):
+        scraper = PrimaryScraper()
+        lessons = scraper.scan_content(workers=2)
+
+    # Every third lesson fails over HTTP; the workers keep going and no browser is started
+    total = 3 * (primary_scraper.MAX_WORKER_RESTARTS + 2)
+    assert [d["url"] for d in lessons] == [f"https://example.com/l/{i}" for i in range(total) if i % 3]
+    assert not drivers
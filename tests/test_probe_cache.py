@@ -0,0 +1,70 @@
+import os
+import json
+from unittest.mock import patch, MagicMock
+from src import ffmpeg_tools
+from src.probe_cache import ProbeCache
+
+FFPROBE_OUTPUT = json.dumps({
+    "format": {"duration": "12.5", "bit_rate": "800000", "format_name": "mov,mp4", "tags": {"title": "Lesson"}},
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080,
+         "r_frame_rate": "30000/1001", "side_data_list": [{"rotation": -90}]},
+        {"index": 1, "codec_type": "audio", "codec_name": "aac"}
+    ]
+})
+
+def _run_probe(path, cache_file, use_cache=True):
+    result = MagicMock(returncode=0, stdout=FFPROBE_OUTPUT)
+    # A fresh ProbeCache per run: the second and later runs read from disk
+    with patch('src.ffmpeg_tools.get_probe_cache', return_value=ProbeCache(str(cache_file))), \
+         patch('src.ffmpeg_tools.subprocess.run', return_value=result) as run:
+        probe = ffmpeg_tools.probe_video(str(path), use_cache)
+        again = ffmpeg_tools.probe_video(str(path), use_cache)
+    return probe, again, run
+
+def test_probe_video_structured_and_cached(tmp_path):
+    video = tmp_path / "a.mp4"
+    video.write_bytes(b"x" * 2000)
+    cache_file = tmp_path / "probe_cache.db"
+
+    probe, again, run = _run_probe(video, cache_file)
+    assert run.call_count == 1
+    assert again == probe
+    assert probe['duration'] == 12.5
+    assert probe['codec'] == 'h264' and probe['audio_codec'] == 'aac'
+    assert (probe['display_width'], probe['display_height']) == (1080, 1920)
+    assert round(probe['fps'], 2) == 29.97
+    assert os.path.exists(cache_file)
+
+    # Reloaded from disk: no new ffprobe process
+    _, _, run = _run_probe(video, cache_file)
+    assert run.call_count == 0
+
+    # File changed: probed again
+    video.write_bytes(b"y" * 3000)
+    _, _, run = _run_probe(video, cache_file)
+    assert run.call_count == 1
+
+def test_temporary_outputs_are_not_cached(tmp_path):
+    video = tmp_path / "processed.mp4"
+    video.write_bytes(b"x" * 2000)
+    cache_file = tmp_path / "probe_cache.db"
+    _, _, run = _run_probe(video, cache_file, use_cache=False)
+    assert run.call_count == 2
+    assert len(ProbeCache(str(cache_file))) == 0
+
+def test_missing_files_are_pruned_unless_the_drive_is_gone(tmp_path):
+    import shutil
+    drive = tmp_path / "drive" / "Course"
+    drive.mkdir(parents=True)
+    kept, removed, unplugged = tmp_path / "a.mp4", tmp_path / "b.mp4", drive / "c.mp4"
+    for video in (kept, removed, unplugged):
+        video.write_bytes(b"x" * 2000)
+        _run_probe(video, tmp_path / "probe_cache.db")
+    removed.unlink()
+    shutil.rmtree(tmp_path / "drive")     # Media drive not mounted this run
+    cache = ProbeCache(str(tmp_path / "probe_cache.db"))
+    assert len(cache) == 2
+    assert cache.get(str(kept), os.stat(kept)) is not None
+    paths = [row[0] for row in cache.conn.execute("SELECT path FROM probes")]
+    assert str(unplugged) in paths and str(removed) not in paths
@@ -0,0 +1,41 @@
+from unittest.mock import patch
+from src import video_utils
+
+BASE = ["ffmpeg", "-y", "-i", "in.mp4", "-c:v", "libx264", "-preset", "medium", "-crf", "23", "out.mp4"]
+
+def test_target_video_bitrate_fits_budget():
+    rate = video_utils.target_video_bitrate(600, 45)
+    total_bytes = (rate + video_utils.TARGET_AUDIO_BITRATE) * 600 / 8
+    assert total_bytes <= 45 * 1024 * 1024 * 0.96
+    assert video_utils.target_video_bitrate(0, 45) == 0
+    # 10 minutes fit the bot limit at 720p, an hour does not
+    assert video_utils.fits_size_target(600, 45, 720)
+    assert not video_utils.fits_size_target(3600, 45, 720)
+    assert video_utils.fits_size_target(3600, 1900, 1080)
+
+def test_apply_size_target_modes():
+    capped = video_utils.apply_size_target(BASE, "libx264", 500_000)
+    assert capped[-1] == "out.mp4" and "-crf" in capped
+    assert capped[capped.index("-maxrate") + 1] == "500000"
+
+    two_pass = video_utils.apply_size_target(BASE, "libx264", 500_000, two_pass=True)
+    assert "-crf" not in two_pass and two_pass[two_pass.index("-b:v") + 1] == "500000"
+
+    hw = ["ffmpeg", "-i", "in.mp4", "-c:v", "h264_videotoolbox", "-q:v", "65", "out.mp4"]
+    hw = video_utils.apply_size_target(hw, "h264_videotoolbox", 500_000)
+    assert "-q:v" not in hw and hw[hw.index("-b:v") + 1] == "500000"
+
+async def test_run_encode_two_pass(tmp_path):
+    out = str(tmp_path / "out.mp4")
+    cmd = video_utils.apply_size_target(BASE[:-1] + [out], "libx264", 500_000, two_pass=True)
+    calls = []
+
+    async def fake_ffmpeg(argv, timeout=None, duration=None, label=""):
+        calls.append(argv)
+        return 0, []
+
+    with patch('src.video_utils.run_ffmpeg_async', side_effect=fake_ffmpeg):
+        assert await video_utils.run_encode(cmd, "libx264", two_pass=True) == (0, [])
+    first, second = calls
+    assert first[first.index("-pass") + 1] == "1" and "-an" in first and first[-1] != out
+    assert second[second.index("-pass") + 1] == "2" and second[-1] == out
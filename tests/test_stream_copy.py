@@ -0,0 +1,70 @@
+from unittest.mock import patch, AsyncMock
+from src import video_utils
+
+def _probe(**overrides):
+    probe = {
+        'path': 'in.mp4', 'size': 300 * 1024 * 1024, 'duration': 600.0, 'bitrate': 4_000_000,
+        'codec': 'h264', 'pix_fmt': 'yuv420p', 'width': 1280, 'height': 720,
+        'display_width': 1280, 'display_height': 720, 'rotation': 0, 'sar': '1:1',
+        'fps': 29.97, 'audio_codec': 'aac', 'has_audio': True, 'title': '',
+    }
+    probe.update(overrides)
+    return probe
+
+def test_stream_copy_blockers():
+    assert video_utils.stream_copy_blockers(_probe()) == []
+    assert video_utils.stream_copy_blockers(_probe(display_width=1920, display_height=1080, width=1920, height=1080),
+                                            target_res=1080) == []
+    assert video_utils.stream_copy_blockers(None) == ["source could not be probed"]
+
+    blocked = video_utils.stream_copy_blockers(_probe(codec='hevc', fps=60.0, audio_codec='opus', bitrate=9_000_000))
+    assert any("hevc" in b for b in blocked) and any("fps" in b for b in blocked)
+    assert any("opus" in b for b in blocked) and any("bitrate" in b for b in blocked)
+    assert video_utils.stream_copy_blockers(_probe(display_width=1920, display_height=1080))
+    # Fine for a user account, too big for the bot
+    assert video_utils.stream_copy_blockers(_probe(), max_size_mb=video_utils.BOT_MAX_SIZE_MB) == ["size over 45MB"]
+
+async def test_process_remuxes_when_source_fits(tmp_path):
+    output = tmp_path / "out.mp4"
+
+    async def fake_ffmpeg(cmd, timeout=None, duration=None, label=""):
+        output.write_bytes(b"x" * 5000)
+        return 0, []
+
+    with patch('src.video_utils.probe_video', return_value=_probe()), \
+         patch('src.video_utils.os.path.getsize', side_effect=lambda p: 5000), \
+         patch('src.video_utils.run_ffmpeg_async', side_effect=fake_ffmpeg) as run, \
+         patch('src.video_utils.detect_hw_encoder') as encoder:
+        ok = await video_utils.process_video_for_user_safe("in.mp4", str(output), "Lesson")
+    assert ok
+    cmd = run.call_args[0][0]
+    assert cmd[cmd.index("-c") + 1] == "copy" and "+faststart" in cmd
+    assert "-vf" not in cmd
+    encoder.assert_not_called()
+
+async def test_process_encodes_when_source_does_not_fit(tmp_path):
+    run = AsyncMock(return_value=(1, ["boom"]))
+    with patch('src.video_utils.probe_video', return_value=_probe(codec='mpeg4')), \
+         patch('src.video_utils.os.path.getsize', return_value=5000), \
+         patch('src.video_utils.run_ffmpeg_async', run), \
+         patch('src.video_utils.detect_hw_encoder', return_value='libx264'):
+        ok = await video_utils.process_video_for_bot_safe("in.mp4", str(tmp_path / "out.mp4"), "Lesson")
+    assert not ok
+    assert "-vf" in run.call_args[0][0]
+
+async def test_intro_is_joined_without_reencode(tmp_path):
+    output = tmp_path / "out.mp4"
+    intro = tmp_path / "intro.mp4"
+    concat = AsyncMock(return_value=True)
+    with patch('src.video_utils.probe_video', return_value=_probe()), \
+         patch('src.video_utils.intro_matching', return_value=str(intro)) as matching, \
+         patch('src.video_utils.concat_copy', concat), \
+         patch('src.video_utils.os.path.getsize', return_value=5000), \
+         patch('src.video_utils.detect_hw_encoder') as encoder:
+        ok = await video_utils.process_video_for_user_safe("in.mp4", str(output), "Lesson", add_intro=True)
+    assert ok
+    assert matching.call_args[0][0] == "Lesson"
+    paths, out, duration = concat.call_args[0]
+    assert paths == [str(intro), "in.mp4"] and out == str(output)
+    assert duration == 600.0 + video_utils.INTRO_SECONDS
+    encoder.assert_not_called()
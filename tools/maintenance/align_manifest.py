@@ -1,7 +1,11 @@
 import os
 import re
+import sys
 import shutil
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.fuzzy_matcher import TrigramIndex, STRICT_MIN_SCORE
+
 FILES_TXT = ".storage/files.txt"
 MANIFEST_FILE = ".storage/downloaded_video.txt"
 
@@ -22,7 +26,7 @@ def main():
 
     # 1. Build Map from files.txt
     print("Reading files.txt...")
-    file_map = {} # norm_title -> index_str
+    file_map = TrigramIndex() # norm_title -> index_str
     
     with open(FILES_TXT, 'r') as f:
         for line in f:
@@ -34,42 +38,66 @@ def main():
                 idx = match.group(1)
                 raw_title = match.group(2)
                 norm = normalize_title(raw_title)
-                file_map[norm] = idx
+                file_map.add(norm, idx)
                 # print(f"Mapped: {norm} -> {idx}")
     
     print(f"Found {len(file_map)} files to align.")
     
     # 2. Update Manifest
+    with open(MANIFEST_FILE, 'r') as f:
+        lines = f.readlines()
+    
+    def _fields(line):
+        if line.strip().startswith("#") or "|" not in line:
+            return None
+        parts = [p.strip() for p in line.split("|")]
+        return parts if len(parts) >= 3 else None
+    
+    # Exact titles first: the indices they resolve to are taken
+    exact = {}
+    for n, line in enumerate(lines):
+        parts = _fields(line)
+        if parts:
+            idx = file_map.get(normalize_title(parts[1]))
+            if idx:
+                exact[n] = idx
+    claimed = set(exact.values())
+    
     new_lines = []
     updated_count = 0
+    skipped = []
+    for n, line in enumerate(lines):
+        parts = _fields(line)
+        if not parts:
+            new_lines.append(line)
+            continue
+        current_idx, title = parts[0], parts[1]
+        
+        new_idx = exact.get(n)
+        if not new_idx:
+            # Renamed/retitled lessons: only a single, near-identical file name
+            # whose index no other line resolved to (never renumber on a guess)
+            norm = normalize_title(title)
+            candidates = file_map.search(norm, limit=2, min_score=STRICT_MIN_SCORE)
+            new_idx = file_map.unique(norm, STRICT_MIN_SCORE)
+            if new_idx in claimed:
+                skipped.append(f"{title}: index {new_idx} already taken")
+                new_idx = None
+            elif candidates and not new_idx:
+                skipped.append(f"{title}: ambiguous ({', '.join(c[2] for c in candidates)})")
+            if new_idx:
+                claimed.add(new_idx)
+        
+        if new_idx and new_idx != current_idx:
+            # Update index
+            parts[0] = new_idx
+            new_lines.append(" | ".join(parts) + "\n")
+            updated_count += 1
+        else:
+            new_lines.append(line)
     
-    with open(MANIFEST_FILE, 'r') as f:
-        for line in f:
-            if line.strip().startswith("#") or "|" not in line:
-                new_lines.append(line)
-                continue
-                
-            parts = [p.strip() for p in line.split("|")]
-            if len(parts) >= 3:
-                current_idx = parts[0]
-                title = parts[1]
-                
-                norm = normalize_title(title)
-                
-                if norm in file_map:
-                    new_idx = file_map[norm]
-                    if new_idx != current_idx:
-                        # Update index
-                        parts[0] = new_idx
-                        new_lines.append(" | ".join(parts) + "\n")
-                        updated_count += 1
-                        # print(f"Updated {title}: {current_idx} -> {new_idx}")
-                    else:
-                        new_lines.append(line)
-                else:
-                    new_lines.append(line)
-            else:
-                new_lines.append(line)
+    for reason in skipped:
+        print(f"   ⚠️ Not aligned - {reason}")
                 
     # 3. Save
     shutil.copy(MANIFEST_FILE, MANIFEST_FILE + ".bak")
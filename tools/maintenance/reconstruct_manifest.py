@@ -2,6 +2,10 @@
 import json
 import os
 import re
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.fuzzy_matcher import TrigramIndex, STRICT_MIN_SCORE
 
 CONTENT_FILE = ".storage/scraped_content.json"
 MANIFEST_FILE = ".storage/downloaded_video.txt"
@@ -53,7 +57,7 @@ def reconstruct():
     # Load Backup for Metadata (Titles, Sections)
     backup_file = ".storage/downloaded_video_bak.txt"
     backup_map = {} # norm_url -> info
-    title_map = {} # norm_title -> info
+    title_map = TrigramIndex() # norm_title -> info
     
     if os.path.exists(backup_file):
         print(f"📖 Loading backup manifest: {backup_file}")
@@ -97,7 +101,7 @@ def reconstruct():
                         }
                         
                         backup_map[_norm_url(url_part)] = info
-                        title_map[_norm_title(raw_title)] = info
+                        title_map.add(_norm_title(raw_title), info)
         print(f"   Mapped information for {len(backup_map)} records from backup.")
 
     print("📖 Loading content database...")
@@ -141,12 +145,10 @@ def reconstruct():
         if not match:
             match = title_map.get(n_json_title)
             
-        # Priority 3: Fuzzy "Title Contains" match
+        # Priority 3: Fuzzy (trigram similarity) title match - restores course,
+        # section and index, so only a single near-identical title counts
         if not match:
-            for b_norm_title, b_info in title_map.items():
-                if b_norm_title and (b_norm_title in n_json_title or n_json_title in b_norm_title):
-                    match = b_info
-                    break
+            match = title_map.unique(n_json_title, STRICT_MIN_SCORE)
             
         if match:
             # RESTORE EVERYTHING FROM BACKUP